@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+"""
+Code Blobs
+Content-addressed storage of submitted code: every distinct program is
+stored once, keyed by its SHA-256, and submissions reference it by
+code_hash. Resubmissions of the same code and the best_result copy of a
+submission then cost a 64-character reference instead of the full code.
+
+The backends resolve the references when reading, so callers keep seeing
+submission["code"] (plus submission["code_hash"]). Stored data written
+before code blobs existed (inline code, no code_hash) is read as-is and
+converted on its next write.
+"""
+import hashlib
+from typing import Dict, Tuple
+
+import payload_codec
+
+
+def code_hash(code: str) -> str:
+    """Content address of a piece of code"""
+    return hashlib.sha256((code or "").encode("utf-8")).hexdigest()
+
+
+def _pack_submission(submission: dict, blobs: Dict[str, str]) -> dict:
+    """Copy of a submission referencing its code by hash (code added to blobs)"""
+    if "code" not in submission:
+        return submission
+    packed = dict(submission)
+    code = packed.pop("code")
+    digest = packed.get("code_hash") or code_hash(payload_codec.decode_value(code))
+    packed["code_hash"] = digest
+    blobs[digest] = code
+    return packed
+
+
+def _unpack_submission(submission: dict, blobs: Dict[str, str]):
+    """Resolve the code of a packed submission in place"""
+    if "code" not in submission and submission.get("code_hash") in blobs:
+        submission["code"] = blobs[submission["code_hash"]]
+
+
+def pack_competitors(competitors: Dict[str, dict]) -> Tuple[Dict[str, dict], Dict[str, str]]:
+    """
+    Storage form of competitor documents: (competitors with code replaced by
+    code_hash, {code_hash: code}). The input is not modified.
+    """
+    blobs = {}
+    packed = {}
+    for name, competitor in competitors.items():
+        problems = {}
+        for problem_id, problem_data in competitor.get("problems", {}).items():
+            problem_data = dict(problem_data)
+            problem_data["submissions"] = [_pack_submission(submission, blobs)
+                                           for submission in problem_data.get("submissions", [])]
+            if problem_data.get("best_result"):
+                problem_data["best_result"] = _pack_submission(problem_data["best_result"], blobs)
+            problems[problem_id] = problem_data
+        packed[name] = dict(competitor, problems=problems)
+    return packed, blobs
+
+
+def unpack_competitors(competitors: Dict[str, dict], blobs: Dict[str, str]) -> Dict[str, dict]:
+    """Resolve code references of stored competitor documents in place (identical code shares one string)"""
+    for competitor in competitors.values():
+        for problem_data in competitor.get("problems", {}).values():
+            for submission in problem_data.get("submissions", []):
+                _unpack_submission(submission, blobs)
+            if problem_data.get("best_result"):
+                _unpack_submission(problem_data["best_result"], blobs)
+    return competitors
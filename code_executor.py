@@ -0,0 +1,732 @@
+# -*- coding: utf-8 -*-
+"""
+Code Executor
+Runs competitor code against test cases on a pool of warm workers.
+
+On Python 3.12+ the workers are subinterpreters with their own GIL, so several
+students' tests run in parallel inside one process. Older Pythons, builds
+without the subinterpreter modules, and installs where an allowed library
+(e.g. numpy) cannot be imported in a subinterpreter fall back to a process pool. A test that
+runs past its timeout costs only its own worker, which is replaced.
+"""
+import atexit
+import builtins
+import contextlib
+import io
+import json
+import multiprocessing
+import os
+import queue
+import subprocess
+import sys
+import tempfile
+import shutil
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from typing import Dict, List, Optional
+
+try:
+    # Python 3.13+
+    import _interpreters as _subinterpreters
+    import _interpchannels as _channels
+except ImportError:
+    try:
+        # Python 3.12
+        import _xxsubinterpreters as _subinterpreters
+        import _xxinterpchannels as _channels
+    except ImportError:
+        _subinterpreters = None
+        _channels = None
+
+
+# Seconds to wait for a single test case before reporting a timeout
+DEFAULT_TIMEOUT = 30
+
+SUBINTERPRETERS_AVAILABLE = _subinterpreters is not None and sys.version_info >= (3, 12)
+
+
+def preload_libraries() -> dict:
+    """
+    Import the libraries competitors are allowed to use.
+    Returns the names to inject into the execution globals.
+    """
+    libs = {}
+
+    try:
+        from textblob import TextBlob
+        libs['TextBlob'] = TextBlob
+    except Exception:
+        pass
+
+    try:
+        import numpy as np
+        libs['np'] = np
+        libs['numpy'] = np
+    except Exception:
+        # Not installed, or inside an isolated subinterpreter (see SubinterpreterPool.missing_libraries)
+        pass
+
+    try:
+        import requests
+        libs['requests'] = requests
+    except Exception:
+        pass
+
+    import math
+    import re
+    from collections import Counter, defaultdict, deque
+    libs['math'] = math
+    libs['re'] = re
+    libs['Counter'] = Counter
+    libs['defaultdict'] = defaultdict
+    libs['deque'] = deque
+
+    return libs
+
+
+def compile_solution(code: str):
+    """Compile competitor code so tracebacks and profiles show '<solution>'"""
+    return compile(code, '<solution>', 'exec')
+
+
+def run_single_test(code: str, test: dict, test_num: int, libraries: Optional[dict] = None) -> dict:
+    """
+    Run one test case against the competitor's code.
+    Mirrors the Streamlit competitor page: input() is fed from the test input,
+    and either a solution() function or printed output is compared.
+    """
+    try:
+        stdout_capture = io.StringIO()
+
+        exec_globals = {'__builtins__': builtins, '__name__': '__main__'}
+        exec_globals.update(libraries if libraries is not None else preload_libraries())
+
+        # Mock input() function for entry-level programmers
+        input_lines = str(test['input']).strip().split('\n')
+        input_index = [0]
+
+        def mock_input(prompt=''):
+            """Mock input function that returns test case inputs"""
+            if input_index[0] < len(input_lines):
+                value = input_lines[input_index[0]]
+                input_index[0] += 1
+                return value
+            return ''
+
+        exec_globals['input'] = mock_input
+
+        with contextlib.redirect_stdout(stdout_capture):
+            exec(compile_solution(code), exec_globals)
+
+        printed_output = stdout_capture.getvalue().strip()
+
+        if 'solution' in exec_globals:
+            solution_func = exec_globals['solution']
+            input_val = test['input']
+            if isinstance(input_val, list):
+                output = solution_func(*input_val)
+            else:
+                output = solution_func(input_val)
+            output = str(output).strip()
+        elif printed_output:
+            output = printed_output
+        else:
+            return {
+                'test_num': test_num,
+                'passed': False,
+                'input': test['input'],
+                'expected': test['output'],
+                'output': 'Error: No output produced (no solution function or print statements)',
+                'error': 'No output'
+            }
+
+        expected = str(test['output']).strip()
+        passed = (output == expected) or (str(output).strip() == str(expected).strip())
+
+        return {
+            'test_num': test_num,
+            'passed': passed,
+            'input': str(test['input']),
+            'expected': expected,
+            'output': output,
+            'error': None
+        }
+    except Exception as e:
+        return {
+            'test_num': test_num,
+            'passed': False,
+            'input': str(test.get('input', '')),
+            'expected': str(test.get('output', '')),
+            'output': f"Error: {str(e)}",
+            'error': str(e)
+        }
+
+
+def _timeout_result(test: dict, test_num: int, timeout: float) -> dict:
+    """Result entry for a test that did not finish in time"""
+    return {
+        'test_num': test_num,
+        'passed': False,
+        'input': str(test.get('input', '')),
+        'expected': str(test.get('output', '')),
+        'output': f"Error: Execution timeout ({timeout}s)",
+        'error': 'Timeout'
+    }
+
+
+# ===== SUBINTERPRETER ENGINE =====
+
+# Runs once per subinterpreter: make this module importable and warm the libraries
+_BOOTSTRAP_SCRIPT = """
+import sys
+for _path in reversed(SYS_PATH.split(PATHSEP)):
+    if _path not in sys.path:
+        sys.path.insert(0, _path)
+import json
+import code_executor as _executor
+try:
+    import _interpchannels as _result_channels
+except ImportError:
+    import _xxinterpchannels as _result_channels
+_libraries = _executor.preload_libraries()
+
+def _send_result(cid, payload):
+    try:
+        _result_channels.send(cid, payload, blocking=False)
+    except TypeError:
+        _result_channels.send(cid, payload)
+"""
+
+# Reports which libraries a subinterpreter could preload
+_LIBRARIES_SCRIPT = """
+_send_result(CID, json.dumps(sorted(_libraries)))
+"""
+
+# Runs once per test case inside a warm subinterpreter
+_TASK_SCRIPT = """
+_result = _executor.run_single_test(CODE, json.loads(TEST_JSON), TEST_NUM, _libraries)
+_send_result(CID, json.dumps(_result))
+"""
+
+
+class TaskTimeout(Exception):
+    """A task did not finish before its deadline (its worker was replaced)"""
+
+
+class SubinterpreterPool:
+    """
+    Pool of warm subinterpreters, each driven by its own worker thread.
+
+    A running subinterpreter cannot be interrupted, so a worker whose task
+    passes its deadline is marked dead: its future fails with TaskTimeout,
+    it never receives another task, and a replacement worker is started.
+    The stuck thread is a daemon and is abandoned.
+    """
+
+    # Seconds between deadline checks of running tasks
+    MONITOR_INTERVAL = 0.1
+
+    def __init__(self, workers: int):
+        self.tasks = queue.Queue()
+        self.workers = []
+        self.lock = threading.Lock()
+        self.closed = False
+        self._started = 0
+        self._stop = threading.Event()
+        with self.lock:
+            for _ in range(workers):
+                self._start_worker()
+        self._monitor = threading.Thread(target=self._monitor_loop, name="subinterpreter-monitor", daemon=True)
+        self._monitor.start()
+
+    def _start_worker(self):
+        """Start a worker thread (caller holds the lock)"""
+        state = {'current': None, 'dead': False, 'thread': None}
+        state['thread'] = threading.Thread(target=self._worker, args=(state,),
+                                           name=f"subinterpreter-{self._started}", daemon=True)
+        self._started += 1
+        self.workers.append(state)
+        state['thread'].start()
+
+    @staticmethod
+    def _create_interpreter():
+        """Create an isolated interpreter with its own GIL"""
+        try:
+            return _subinterpreters.create(isolated=True)
+        except TypeError:
+            return _subinterpreters.create('isolated')
+
+    @staticmethod
+    def _create_channel():
+        """Create the channel results are sent back on"""
+        try:
+            return _channels.create()
+        except TypeError:
+            # Python 3.13 requires an "unbound" policy; 1 == remove unbound items
+            return _channels.create(1)
+
+    @staticmethod
+    def _run(interp_id, script: str, shared: Optional[dict] = None):
+        """Run a script, raising on failure on every Python version"""
+        failure = _subinterpreters.run_string(interp_id, script, shared)
+        if failure is not None:
+            raise RuntimeError(getattr(failure, 'formatted', str(failure)))
+
+    @classmethod
+    def missing_libraries(cls) -> List[str]:
+        """Allowed library names this process can preload but a subinterpreter cannot"""
+        interp_id = cls._create_interpreter()
+        channel_id = cls._create_channel()
+        try:
+            cls._run(interp_id, _BOOTSTRAP_SCRIPT, cls._bootstrap_globals())
+            cls._run(interp_id, _LIBRARIES_SCRIPT, {'CID': int(channel_id)})
+            payload = _channels.recv(channel_id)
+            if isinstance(payload, tuple):
+                payload = payload[0]
+            return sorted(set(preload_libraries()) - set(json.loads(payload)))
+        finally:
+            try:
+                _channels.destroy(channel_id)
+                _subinterpreters.destroy(interp_id)
+            except Exception:
+                pass
+
+    @staticmethod
+    def _bootstrap_globals() -> dict:
+        """Shared names for _BOOTSTRAP_SCRIPT"""
+        return {
+            'SYS_PATH': os.pathsep.join([os.path.dirname(os.path.abspath(__file__))] + sys.path),
+            'PATHSEP': os.pathsep,
+        }
+
+    def _worker(self, state: dict):
+        interp_id = self._create_interpreter()
+        channel_id = self._create_channel()
+        try:
+            self._run(interp_id, _BOOTSTRAP_SCRIPT, self._bootstrap_globals())
+        except Exception as e:
+            print(f"[ERROR] Failed to start subinterpreter: {e}")
+            self._drain_with_error(e)
+            return
+
+        try:
+            while True:
+                task = self.tasks.get()
+                if task is None:
+                    break
+                code, test, test_num, deadline, future = task
+                if not future.set_running_or_notify_cancel():
+                    continue
+                if time.monotonic() >= deadline:
+                    future.set_exception(TaskTimeout())
+                    continue
+                with self.lock:
+                    state['current'] = (future, deadline)
+                try:
+                    self._run(interp_id, _TASK_SCRIPT, {
+                        'CODE': code,
+                        'TEST_JSON': json.dumps(test),
+                        'TEST_NUM': test_num,
+                        'CID': int(channel_id),
+                    })
+                    payload = _channels.recv(channel_id)
+                    if isinstance(payload, tuple):
+                        payload = payload[0]
+                    outcome = (True, json.loads(payload))
+                except Exception as e:
+                    outcome = (False, e)
+                with self.lock:
+                    state['current'] = None
+                    if state['dead']:
+                        # The monitor already failed this task and replaced the worker
+                        break
+                if outcome[0]:
+                    future.set_result(outcome[1])
+                else:
+                    future.set_exception(outcome[1])
+        finally:
+            try:
+                _channels.destroy(channel_id)
+                _subinterpreters.destroy(interp_id)
+            except Exception:
+                pass
+
+    def _monitor_loop(self):
+        """Retire workers stuck past their task's deadline and start replacements"""
+        while not self._stop.wait(self.MONITOR_INTERVAL):
+            now = time.monotonic()
+            with self.lock:
+                for state in list(self.workers):
+                    current = state['current']
+                    if current is None or now < current[1]:
+                        continue
+                    state['dead'] = True
+                    self.workers.remove(state)
+                    if not current[0].done():
+                        current[0].set_exception(TaskTimeout())
+                    print(f"[WARNING] {state['thread'].name} timed out, starting a replacement")
+                    if not self.closed:
+                        self._start_worker()
+
+    def _drain_with_error(self, error: Exception):
+        """Fail queued tasks when a worker could not start"""
+        while True:
+            try:
+                task = self.tasks.get_nowait()
+            except queue.Empty:
+                return
+            if task is None:
+                return
+            future = task[-1]
+            if future.set_running_or_notify_cancel():
+                future.set_exception(error)
+
+    def submit(self, code: str, test: dict, test_num: int, deadline: float) -> Future:
+        """Queue one test case (to finish by the time.monotonic() deadline) and return a future for its result"""
+        future = Future()
+        self.tasks.put((code, test, test_num, deadline, future))
+        return future
+
+    def shutdown(self):
+        """Stop all workers and destroy their interpreters (stuck workers are abandoned)"""
+        with self.lock:
+            if self.closed:
+                return
+            self.closed = True
+            workers = list(self.workers)
+        self._stop.set()
+        for _ in workers:
+            self.tasks.put(None)
+        for state in workers:
+            state['thread'].join(timeout=5)
+
+
+# ===== PROCESS FALLBACK ENGINE =====
+
+_process_libraries = None
+
+
+def _init_process_worker():
+    """Warm the allowed libraries once per worker process"""
+    global _process_libraries
+    _process_libraries = preload_libraries()
+
+
+def _run_test_in_process(code: str, test: dict, test_num: int) -> dict:
+    """Process-pool entry point"""
+    return run_single_test(code, test, test_num, _process_libraries)
+
+
+def _process_worker_main(conn):
+    """Worker process loop: receive (function, args), send back (ok, result or error text)"""
+    _init_process_worker()
+    while True:
+        try:
+            task = conn.recv()
+        except EOFError:
+            return
+        if task is None:
+            return
+        func, args = task
+        try:
+            conn.send((True, func(*args)))
+        except Exception as e:
+            conn.send((False, f"{type(e).__name__}: {e}"))
+
+
+class _WorkerProcess:
+    """One warm worker process and the pipe its tasks go through"""
+
+    def __init__(self):
+        self.conn, child_conn = multiprocessing.Pipe()
+        self.process = multiprocessing.Process(target=_process_worker_main, args=(child_conn,), daemon=True)
+        self.process.start()
+        child_conn.close()
+
+    def kill(self):
+        """Terminate the process (also when it is stuck in a task)"""
+        try:
+            self.process.kill()
+            self.process.join(timeout=5)
+        except Exception:
+            pass
+        self.conn.close()
+
+
+class ProcessPool:
+    """
+    Pool of warm worker processes, for Pythons without subinterpreters and for
+    work that must be isolated from the calling process (profiling).
+
+    Each process is driven by a thread that waits for its result until the
+    task's deadline; a process that misses it (or dies) is killed and
+    replaced, so a runaway submission never blocks later ones.
+    """
+
+    def __init__(self, workers: int):
+        self.tasks = queue.Queue()
+        self.lock = threading.Lock()
+        self.closed = False
+        self.processes = [None] * workers
+        self.threads = []
+        for slot in range(workers):
+            thread = threading.Thread(target=self._worker, args=(slot,), name=f"process-worker-{slot}", daemon=True)
+            thread.start()
+            self.threads.append(thread)
+
+    def _start_process(self, slot: int) -> Optional[_WorkerProcess]:
+        """Start the process of a slot (None once the pool is shut down)"""
+        with self.lock:
+            if self.closed:
+                return None
+            process = _WorkerProcess()
+            self.processes[slot] = process
+            return process
+
+    def _worker(self, slot: int):
+        process = self._start_process(slot)
+        while process is not None:
+            task = self.tasks.get()
+            if task is None:
+                break
+            func, args, deadline, future = task
+            if not future.set_running_or_notify_cancel():
+                continue
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                future.set_exception(TaskTimeout())
+                continue
+
+            try:
+                process.conn.send((func, args))
+                if process.conn.poll(remaining):
+                    ok, value = process.conn.recv()
+                    if ok:
+                        future.set_result(value)
+                    else:
+                        future.set_exception(RuntimeError(value))
+                    continue
+                future.set_exception(TaskTimeout())
+            except (EOFError, OSError) as e:
+                future.set_exception(RuntimeError(f"Worker process exited: {e}"))
+
+            # Timed out or died: replace the process
+            process.kill()
+            process = self._start_process(slot)
+        self._drain_with_error(RuntimeError("Executor was shut down"))
+
+    def _drain_with_error(self, error: Exception):
+        """Fail tasks still queued after shutdown"""
+        while True:
+            try:
+                task = self.tasks.get_nowait()
+            except queue.Empty:
+                return
+            if task is not None and task[-1].set_running_or_notify_cancel():
+                task[-1].set_exception(error)
+
+    def submit_call(self, func, args: tuple, deadline: float) -> Future:
+        """Run func(*args) (a module-level function) in a worker process by the time.monotonic() deadline"""
+        future = Future()
+        self.tasks.put((func, args, deadline, future))
+        return future
+
+    def submit(self, code: str, test: dict, test_num: int, deadline: float) -> Future:
+        """Queue one test case and return a future for its result"""
+        return self.submit_call(_run_test_in_process, (code, test, test_num), deadline)
+
+    def shutdown(self):
+        """Stop all workers and kill their processes, including stuck ones"""
+        with self.lock:
+            if self.closed:
+                return
+            self.closed = True
+            processes = [process for process in self.processes if process is not None]
+        for _ in self.threads:
+            self.tasks.put(None)
+        for process in processes:
+            process.kill()
+        for thread in self.threads:
+            thread.join(timeout=5)
+
+
+class CodeExecutor:
+    """
+    Executes competitor code with the same interface as the Streamlit
+    run_code_with_tests(code, test_cases) helper.
+
+    A test that times out does not keep its worker: worker processes are
+    killed and replaced, stuck subinterpreters are retired and replaced.
+    """
+
+    # Extra seconds to wait for a worker to report a timed-out task
+    RESULT_GRACE = 1.0
+
+    def __init__(self, workers: Optional[int] = None, engine: Optional[str] = None):
+        """
+        Args:
+            workers: Pool size (defaults to the CPU count, capped at 8)
+            engine: 'subinterpreter' or 'process' (auto-detected if omitted)
+        """
+        self.workers = workers or min(os.cpu_count() or 1, 8)
+
+        if engine is None:
+            engine = 'subinterpreter' if SUBINTERPRETERS_AVAILABLE else 'process'
+        if engine == 'subinterpreter' and not SUBINTERPRETERS_AVAILABLE:
+            print("[WARNING] Subinterpreters not available on this Python, using processes")
+            engine = 'process'
+        if engine == 'subinterpreter':
+            # Submissions must see the same libraries on every engine
+            try:
+                missing = SubinterpreterPool.missing_libraries()
+                if missing:
+                    print(f"[WARNING] Libraries unavailable in subinterpreters: {', '.join(missing)}, using processes")
+            except Exception as e:
+                print(f"[WARNING] Could not check subinterpreter libraries ({e}), using processes")
+                missing = True
+            if missing:
+                engine = 'process'
+
+        self.engine = engine
+        if engine == 'subinterpreter':
+            self.pool = SubinterpreterPool(self.workers)
+        else:
+            self.pool = ProcessPool(self.workers)
+
+    def run_code_with_tests(self, code: str, test_cases: List[dict],
+                            timeout: float = DEFAULT_TIMEOUT) -> List[dict]:
+        """Execute code and run all test cases in parallel"""
+        deadline = time.monotonic() + timeout
+        futures = [self.pool.submit(code, test, i + 1, deadline) for i, test in enumerate(test_cases)]
+
+        results = []
+        for i, (test, future) in enumerate(zip(test_cases, futures)):
+            try:
+                remaining = max(0, deadline - time.monotonic())
+                results.append(future.result(timeout=remaining + self.RESULT_GRACE))
+            except (TaskTimeout, FutureTimeoutError):
+                results.append(_timeout_result(test, i + 1, timeout))
+            except Exception as e:
+                results.append({
+                    'test_num': i + 1,
+                    'passed': False,
+                    'input': str(test.get('input', '')),
+                    'expected': str(test.get('output', '')),
+                    'output': f"Error: {str(e)}",
+                    'error': str(e)
+                })
+        return results
+
+    def shutdown(self):
+        """Release all workers"""
+        self.pool.shutdown()
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor() -> CodeExecutor:
+    """Get the process-wide executor, creating it on first use"""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = CodeExecutor()
+                atexit.register(_executor.shutdown)
+    return _executor
+
+
+def run_code_with_tests(code: str, test_cases: List[dict]) -> List[dict]:
+    """Drop-in replacement for the Streamlit page's run_code_with_tests"""
+    return get_executor().run_code_with_tests(code, test_cases)
+
+
+# ===== BENCHMARK =====
+
+def run_tests_with_subprocess(code: str, test_cases: List[dict], timeout: float = DEFAULT_TIMEOUT) -> List[dict]:
+    """
+    Reference implementation of the approach in
+    competitor_interface._run_tests_thread: one fresh interpreter per test case.
+    """
+    temp_dir = tempfile.mkdtemp()
+    results = []
+    try:
+        for i, test_case in enumerate(test_cases):
+            temp_file = os.path.join(temp_dir, f"test_{i}.py")
+            input_path = os.path.join(temp_dir, 'input.txt')
+            with open(temp_file, "w", encoding='utf-8') as f:
+                f.write("import sys\n")
+                f.write(f"sys.stdin = open(r'{input_path}', 'r', encoding='utf-8')\n\n")
+                f.write(code)
+                if not code.endswith('\n'):
+                    f.write("\n")
+            with open(input_path, 'w', encoding='utf-8') as f:
+                f.write(test_case['input'])
+
+            env = os.environ.copy()
+            env['PYTHONIOENCODING'] = 'utf-8'
+            try:
+                process = subprocess.run(
+                    [sys.executable, temp_file],
+                    capture_output=True, text=True, encoding='utf-8', errors='replace',
+                    cwd=temp_dir, env=env, timeout=timeout
+                )
+                output = process.stdout.strip()
+                expected = test_case['output'].strip()
+                results.append({'test_num': i + 1, 'passed': output == expected,
+                                'expected': expected, 'output': output})
+            except subprocess.TimeoutExpired:
+                results.append({'test_num': i + 1, 'passed': False, 'error': 'Timeout'})
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+    return results
+
+
+def benchmark(submissions: int = 20, tests_per_submission: int = 5, workers: Optional[int] = None) -> Dict[str, float]:
+    """
+    Compare the pooled engine against subprocess-per-test execution.
+    Returns seconds taken by each approach.
+    """
+    code = (
+        "n = int(input())\n"
+        "total = 0\n"
+        "for i in range(n):\n"
+        "    total += i * i\n"
+        "print(total)\n"
+    )
+    test_cases = [
+        {'input': str(10000 * (k + 1)), 'output': str(sum(i * i for i in range(10000 * (k + 1))))}
+        for k in range(tests_per_submission)
+    ]
+
+    timings = {}
+
+    start = time.perf_counter()
+    for _ in range(submissions):
+        run_tests_with_subprocess(code, test_cases)
+    timings['subprocess'] = time.perf_counter() - start
+
+    executor = CodeExecutor(workers=workers)
+    try:
+        # Warm-up so pool start-up is reported separately
+        start = time.perf_counter()
+        executor.run_code_with_tests(code, test_cases[:1])
+        timings[f'{executor.engine}_startup'] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for _ in range(submissions):
+            results = executor.run_code_with_tests(code, test_cases)
+            assert all(r['passed'] for r in results), results
+        timings[executor.engine] = time.perf_counter() - start
+    finally:
+        executor.shutdown()
+
+    return timings
+
+
+if __name__ == "__main__":
+    print(f"Python {sys.version.split()[0]} - subinterpreters available: {SUBINTERPRETERS_AVAILABLE}")
+    for approach, seconds in benchmark().items():
+        print(f"  {approach:<24} {seconds:8.3f}s")
@@ -2,93 +2,377 @@
 """
 Competition Data Manager
 Handles shared data storage and synchronization for the competition system
+
+Storage layout:
+- competition_data.json: snapshot of the full competition state
+- competition_data.journal: append-only JSON lines, one event per submission
+
+A submit appends one line (with a single fsync) instead of rewriting the
+snapshot. State is rebuilt from the snapshot plus the journal tail, and a
+background compactor periodically folds the journal into a new snapshot,
+written atomically (temp file + rename). The snapshot is indented JSON by
+default; any data_serialization format (e.g. "json-compact+zlib") can be
+selected with the serialization argument or COMPETITION_DATA_FORMAT, and
+reads detect the format of the existing file.
+
+Submitted code is stored once per distinct program in the snapshot's
+"code_blobs" table and referenced from submissions (and best results) by
+code_hash (see code_blobs); the in-memory state has the code resolved.
+Large code and test_results values are kept zlib/zstd-compressed, on disk
+and in memory, and decompressed only when a submission field is read
+(see payload_codec).
+
+The competitor, judge and spectator run as separate processes, so access is
+also guarded by a file lock (competition_data.json.lock): readers take it
+shared and can proceed in parallel, writers and the compactor take it
+exclusive. Because the snapshot is only ever replaced by rename, a reader
+never sees a half-written file.
 """
+import atexit
+import copy
 import json
 import os
 import threading
+from contextlib import contextmanager
 from datetime import datetime
 from typing import Dict, List, Optional
 
+import code_blobs
+import data_serialization
+import payload_codec
+from data_manager import competitor_summary
+from file_lock import FileLock
+
 
 class CompetitionDataManager:
     """Manages competition data with thread-safe operations"""
     
-    def __init__(self, data_file="competition_data.json"):
+    # Seconds between background journal compactions (0 disables the compactor)
+    COMPACT_INTERVAL = 5.0
+    
+    def __init__(self, data_file="competition_data.json", compact_interval: float = None,
+                 serialization: str = None):
         self.data_file = data_file
-        self.lock = threading.Lock()
+        self.serialization = serialization or data_serialization.default_format("json")
+        data_serialization.parse_format(self.serialization)
+        self.journal_file = os.path.splitext(data_file)[0] + ".journal"
+        self.lock = threading.RLock()
+        self.file_lock = FileLock(data_file + ".lock")
+        
+        # Parsed snapshot plus applied journal events, revalidated by file signature
+        self._state = None
+        self._state_version = 0
+        self._snapshot_signature = None
+        self._journal_position = 0
+        self._derived_cache = {}
+        
         self.initialize_data()
+        
+        self.compact_interval = self.COMPACT_INTERVAL if compact_interval is None else compact_interval
+        self._stop_compactor = threading.Event()
+        self._compactor = None
+        if self.compact_interval > 0:
+            self._compactor = threading.Thread(target=self._compactor_loop, daemon=True)
+            self._compactor.start()
+            atexit.register(self.close)
+    
+    @staticmethod
+    def _initial_data() -> dict:
+        """Empty competition state"""
+        return {
+            "competition_started": False,
+            "start_time": None,
+            "competitors": {},
+            "problems_loaded": []
+        }
     
     def initialize_data(self):
         """Initialize the data file if it doesn't exist"""
-        if not os.path.exists(self.data_file):
-            initial_data = {
-                "competition_started": False,
-                "start_time": None,
-                "competitors": {},
-                "problems_loaded": []
+        with self._writing():
+            if not os.path.exists(self.data_file):
+                self._write_snapshot(self._initial_data())
+    
+    @contextmanager
+    def _reading(self):
+        """Hold the thread lock and the shared file lock"""
+        with self.lock, self.file_lock.shared():
+            yield
+    
+    @contextmanager
+    def _writing(self):
+        """Hold the thread lock and the exclusive file lock"""
+        with self.lock, self.file_lock.exclusive():
+            yield
+    
+    @staticmethod
+    def _file_signature(path: str):
+        """Identify a file version by inode, size and modification time"""
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            return None
+        return (st.st_ino, st.st_size, st.st_mtime_ns)
+    
+    def _read_snapshot(self) -> dict:
+        """
+        Parse the snapshot file. A missing file reads as an empty competition
+        (the next write creates it); a corrupt file is an error and is never
+        silently replaced, since that would wipe the competition.
+        """
+        try:
+            return self._from_storage(data_serialization.load_file(self.data_file))
+        except FileNotFoundError:
+            return self._initial_data()
+        except data_serialization.SerializationError as e:
+            if self._state is not None:
+                print(f"[ERROR] {self.data_file} is corrupt ({e}); keeping the last good state")
+                return self._state
+            raise
+    
+    @staticmethod
+    def _to_storage(data: dict) -> dict:
+        """Snapshot form of a state: submission code moved into the code_blobs table"""
+        competitors, blobs = code_blobs.pack_competitors(data["competitors"])
+        return dict(data, competitors=competitors, code_blobs=blobs)
+    
+    @staticmethod
+    def _from_storage(data: dict) -> dict:
+        """
+        State from a snapshot: code references resolved (older snapshots have inline code)
+        and submissions wrapped to decompress their payload fields on access
+        """
+        competitors = code_blobs.unpack_competitors(data.get("competitors", {}), data.pop("code_blobs", {}))
+        for competitor in competitors.values():
+            for problem_data in competitor.get("problems", {}).values():
+                problem_data["submissions"] = [payload_codec.encode_record(submission)
+                                               for submission in problem_data.get("submissions", [])]
+                if problem_data.get("best_result"):
+                    problem_data["best_result"] = payload_codec.encode_record(problem_data["best_result"])
+        return data
+    
+    def _refresh_state(self) -> dict:
+        """
+        Bring the in-memory state up to date: re-read the snapshot if it was
+        replaced, then apply any journal lines appended since the last call.
+        """
+        signature = self._file_signature(self.data_file)
+        if self._state is None or signature != self._snapshot_signature:
+            self._state = self._read_snapshot()
+            self._state_version += 1
+            self._snapshot_signature = self._file_signature(self.data_file)
+            self._journal_position = 0
+        self._tail_journal()
+        return self._state
+    
+    def _tail_journal(self):
+        """Apply complete journal lines written after the last read position"""
+        try:
+            size = os.path.getsize(self.journal_file)
+        except FileNotFoundError:
+            self._journal_position = 0
+            return
+        
+        if size < self._journal_position:
+            # Journal was truncated by a compaction; the snapshot holds those events
+            self._state = self._read_snapshot()
+            self._state_version += 1
+            self._snapshot_signature = self._file_signature(self.data_file)
+            self._journal_position = 0
+        if size == self._journal_position:
+            return
+        
+        with open(self.journal_file, 'rb') as f:
+            f.seek(self._journal_position)
+            chunk = f.read()
+        
+        # Only consume complete lines; a writer may be mid-append
+        end = chunk.rfind(b'\n') + 1
+        for line in chunk[:end].splitlines():
+            if line.strip():
+                self._apply_event(self._state, json.loads(line.decode('utf-8')))
+        self._journal_position += end
+    
+    def _apply_event(self, data: dict, event: dict):
+        """Apply one journal event to the state (skips events already in the snapshot)"""
+        if event["seq"] <= data.get("journal_seq", 0):
+            return
+        if event["type"] == "submit":
+            self._apply_submission(data, event["name"], event["problem_id"], event["submission"])
+        data["journal_seq"] = event["seq"]
+        self._state_version += 1
+    
+    @staticmethod
+    def _apply_submission(data: dict, name: str, problem_id: str, submission: dict):
+        """
+        Add a submission to a competitor and update their best result.
+        Copy-on-write: objects already handed out to readers are never modified.
+        """
+        if name not in data["competitors"]:
+            return
+        
+        submission = payload_codec.encode_record(submission)
+        competitor = dict(data["competitors"][name])
+        competitor["problems"] = dict(competitor["problems"])
+        
+        # Keep submission history
+        if problem_id in competitor["problems"]:
+            problem_data = dict(competitor["problems"][problem_id])
+        else:
+            problem_data = {
+                "submissions": [],
+                "best_result": None
             }
-            self.save_data(initial_data)
+        problem_data["submissions"] = problem_data["submissions"] + [submission]
+        
+        # Update best result if this is better
+        current_best = problem_data["best_result"]
+        if current_best is None or submission["passed_tests"] > current_best.get("passed_tests", 0):
+            problem_data["best_result"] = submission
+        
+        competitor["problems"][problem_id] = problem_data
+        competitor["last_activity"] = submission["submitted_at"]
+        
+        data["competitors"] = dict(data["competitors"])
+        data["competitors"][name] = competitor
+    
+    def _append_event(self, event: dict):
+        """Durably append one event to the journal"""
+        line = (json.dumps(event, ensure_ascii=False) + "\n").encode('utf-8')
+        with open(self.journal_file, 'ab') as f:
+            f.write(line)
+            f.flush()
+            os.fsync(f.fileno())
+        # Our own append is already applied to the state
+        if self._journal_position == os.path.getsize(self.journal_file) - len(line):
+            self._journal_position += len(line)
+    
+    def _write_snapshot(self, data: dict):
+        """Atomically replace the snapshot (temp file + rename) and clear the journal"""
+        data_serialization.dump_file(self.data_file, self._to_storage(data), self.serialization)
+        
+        # Every journal event is now part of the snapshot
+        with open(self.journal_file, 'wb'):
+            pass
+        
+        self._state = data
+        self._state_version += 1
+        self._snapshot_signature = self._file_signature(self.data_file)
+        self._journal_position = 0
     
     def load_data(self) -> dict:
-        """Load competition data from file"""
-        with self.lock:
-            try:
-                with open(self.data_file, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-            except (FileNotFoundError, json.JSONDecodeError):
-                self.initialize_data()
-                with open(self.data_file, 'r', encoding='utf-8') as f:
-                    return json.load(f)
+        """Load competition data (snapshot plus journal)"""
+        with self._reading():
+            return copy.deepcopy(self._refresh_state())
     
     def save_data(self, data: dict):
         """Save competition data to file"""
-        with self.lock:
-            with open(self.data_file, 'w', encoding='utf-8') as f:
-                json.dump(data, f, indent=2, ensure_ascii=False)
+        with self._writing():
+            self._write_snapshot(copy.deepcopy(data))
+    
+    def compact(self) -> bool:
+        """Fold the journal into a new snapshot. Returns True if anything was compacted."""
+        if not os.path.exists(self.journal_file) or os.path.getsize(self.journal_file) == 0:
+            return False
+        with self._writing():
+            # Another process may have compacted while we waited for the lock
+            if not os.path.exists(self.journal_file) or os.path.getsize(self.journal_file) == 0:
+                return False
+            self._write_snapshot(self._refresh_state())
+            return True
+    
+    def _compactor_loop(self):
+        """Background thread that compacts the journal periodically"""
+        while not self._stop_compactor.wait(self.compact_interval):
+            try:
+                self.compact()
+            except Exception as e:
+                print(f"[WARNING] Journal compaction failed: {e}")
+    
+    def close(self):
+        """Stop the compactor and write a final snapshot"""
+        self._stop_compactor.set()
+        try:
+            self.compact()
+        except Exception as e:
+            print(f"[WARNING] Final journal compaction failed: {e}")
+    
+    def _read_state(self) -> dict:
+        """
+        Current state for read-only use. Costs two stat() calls when nothing
+        changed; the returned objects must not be modified by callers.
+        """
+        with self._reading():
+            return self._refresh_state()
+    
+    def _derived(self, key: str, compute):
+        """Memoize a value computed from the state until the state changes"""
+        with self._reading():
+            data = self._refresh_state()
+            cached = self._derived_cache.get(key)
+            if cached is not None and cached[0] == self._state_version:
+                return cached[1]
+            value = compute(data)
+            self._derived_cache[key] = (self._state_version, value)
+            return value
+    
+    @staticmethod
+    def _with_competitor(data: dict, name: str, competitor: dict) -> dict:
+        """Copy-on-write: new state sharing everything except the changed competitor"""
+        new_data = dict(data)
+        new_data["competitors"] = dict(data["competitors"])
+        new_data["competitors"][name] = competitor
+        return new_data
     
     def start_competition(self):
         """Mark competition as started"""
-        data = self.load_data()
-        data["competition_started"] = True
-        data["start_time"] = datetime.now().isoformat()
-        self.save_data(data)
+        with self._writing():
+            data = dict(self._refresh_state())
+            data["competition_started"] = True
+            data["start_time"] = datetime.now().isoformat()
+            self._write_snapshot(data)
     
-    def register_competitor(self, name: str) -> bool:
+    def register_competitor(self, name: str, week: int = None, level: int = None) -> bool:
         """Register a new competitor"""
-        data = self.load_data()
-        
-        if name in data["competitors"]:
-            return False  # Competitor already exists
-        
-        data["competitors"][name] = {
-            "name": name,
-            "joined_at": datetime.now().isoformat(),
-            "current_problem": 1,
-            "problems": {},
-            "last_activity": datetime.now().isoformat()
-        }
-        self.save_data(data)
+        with self._writing():
+            data = self._refresh_state()
+            
+            if name in data["competitors"]:
+                return False  # Competitor already exists
+            
+            competitor = {
+                "name": name,
+                "joined_at": datetime.now().isoformat(),
+                "current_problem": 1,
+                "problems": {},
+                "last_activity": datetime.now().isoformat()
+            }
+            
+            # Add week and level if provided
+            if week is not None:
+                competitor["week"] = week
+            if level is not None:
+                competitor["level"] = level
+            
+            self._write_snapshot(self._with_competitor(data, name, competitor))
         return True
     
     def update_competitor_problem(self, name: str, problem_id: int):
         """Update which problem the competitor is currently viewing"""
-        data = self.load_data()
-        
-        if name in data["competitors"]:
-            data["competitors"][name]["current_problem"] = problem_id
-            data["competitors"][name]["last_activity"] = datetime.now().isoformat()
-            self.save_data(data)
+        with self._writing():
+            data = self._refresh_state()
+            
+            if name in data["competitors"]:
+                competitor = dict(data["competitors"][name])
+                competitor["current_problem"] = problem_id
+                competitor["last_activity"] = datetime.now().isoformat()
+                self._write_snapshot(self._with_competitor(data, name, competitor))
     
     def submit_solution(self, name: str, problem_id: int, code: str, 
                        test_results: List[dict], all_passed: bool):
-        """Record a solution submission"""
-        data = self.load_data()
-        
-        if name not in data["competitors"]:
-            return False
-        
+        """Record a solution submission (appended to the journal)"""
         submission = {
             "code": code,
+            "code_hash": code_blobs.code_hash(code),
             "submitted_at": datetime.now().isoformat(),
             "test_results": test_results,
             "all_passed": all_passed,
@@ -96,37 +380,44 @@ class CompetitionDataManager:
             "passed_tests": sum(1 for t in test_results if t.get("passed", False))
         }
         
-        # Keep submission history
-        if str(problem_id) not in data["competitors"][name]["problems"]:
-            data["competitors"][name]["problems"][str(problem_id)] = {
-                "submissions": [],
-                "best_result": None
+        with self._writing():
+            data = self._refresh_state()
+            
+            if name not in data["competitors"]:
+                return False
+            
+            event = {
+                "seq": data.get("journal_seq", 0) + 1,
+                "type": "submit",
+                "name": name,
+                "problem_id": str(problem_id),
+                "submission": submission
             }
-        
-        data["competitors"][name]["problems"][str(problem_id)]["submissions"].append(submission)
-        
-        # Update best result if this is better
-        current_best = data["competitors"][name]["problems"][str(problem_id)]["best_result"]
-        if current_best is None or submission["passed_tests"] > current_best.get("passed_tests", 0):
-            data["competitors"][name]["problems"][str(problem_id)]["best_result"] = submission
-        
-        data["competitors"][name]["last_activity"] = datetime.now().isoformat()
-        self.save_data(data)
+            self._append_event(event)
+            self._apply_event(data, copy.deepcopy(event))
         return True
     
     def get_competitor_data(self, name: str) -> Optional[dict]:
-        """Get data for a specific competitor"""
-        data = self.load_data()
-        return data["competitors"].get(name)
+        """Get data for a specific competitor (shared cached copy - do not modify)"""
+        return self._read_state()["competitors"].get(name)
     
     def get_all_competitors(self) -> Dict[str, dict]:
-        """Get data for all competitors"""
-        data = self.load_data()
-        return data["competitors"]
+        """Get data for all competitors (shared cached copy - do not modify)"""
+        return self._read_state()["competitors"]
     
     def get_leaderboard(self) -> List[dict]:
         """Generate leaderboard data"""
-        data = self.load_data()
+        leaderboard = self._derived("leaderboard", self._compute_leaderboard)
+        return [dict(entry) for entry in leaderboard]
+    
+    def get_problem_statistics(self) -> dict:
+        """Get statistics for each problem"""
+        stats = self._derived("problem_statistics", self._compute_problem_statistics)
+        return {problem_id: dict(problem_stats) for problem_id, problem_stats in stats.items()}
+    
+    @staticmethod
+    def _compute_leaderboard(data: dict) -> List[dict]:
+        """Generate leaderboard data from a state"""
         leaderboard = []
         
         for name, competitor in data["competitors"].items():
@@ -165,9 +456,9 @@ class CompetitionDataManager:
         leaderboard.sort(key=lambda x: (-x["approved_problems"], -x["problems_solved"], -x["total_tests_passed"]))
         return leaderboard
     
-    def get_problem_statistics(self) -> dict:
-        """Get statistics for each problem"""
-        data = self.load_data()
+    @staticmethod
+    def _compute_problem_statistics(data: dict) -> dict:
+        """Get statistics for each problem from a state"""
         stats = {}
         
         for name, competitor in data["competitors"].items():
@@ -187,6 +478,41 @@ class CompetitionDataManager:
         
         return stats
     
+    @staticmethod
+    def _compute_competitor_summaries(data: dict) -> Dict[str, dict]:
+        """List-view projections of every competitor in a state"""
+        return {name: competitor_summary(competitor) for name, competitor in data["competitors"].items()}
+    
+    def get_competitor_summaries(self) -> Dict[str, dict]:
+        """Competitors without submission code/test output (shared cached copy - do not modify)"""
+        return self._derived("competitor_summaries", self._compute_competitor_summaries)
+    
+    @staticmethod
+    def _compute_secondary_indexes(data: dict) -> dict:
+        """week -> names, level -> names and (name, problem_id) pairs awaiting review"""
+        indexes = {"week": {}, "level": {}, "pending": []}
+        for name, competitor in data["competitors"].items():
+            for key in ("week", "level"):
+                if competitor.get(key) is not None:
+                    indexes[key].setdefault(competitor[key], []).append(name)
+            for problem_id, problem_data in competitor["problems"].items():
+                if ((problem_data.get("best_result") or {}).get("all_passed", False) and
+                        problem_data.get("judge_approval") not in ("approved", "rejected")):
+                    indexes["pending"].append((name, problem_id))
+        return indexes
+    
+    def get_competitors_by_week(self, week: int) -> List[str]:
+        """Names of competitors assigned to a week"""
+        return list(self._derived("secondary_indexes", self._compute_secondary_indexes)["week"].get(week, []))
+    
+    def get_competitors_by_level(self, level: int) -> List[str]:
+        """Names of competitors assigned to a level"""
+        return list(self._derived("secondary_indexes", self._compute_secondary_indexes)["level"].get(level, []))
+    
+    def get_pending_approvals(self) -> List[tuple]:
+        """(name, problem_id) pairs that passed all tests and await judge review"""
+        return list(self._derived("secondary_indexes", self._compute_secondary_indexes)["pending"])
+    
     def reset_competition(self):
         """Reset all competition data"""
         initial_data = {
@@ -200,33 +526,33 @@ class CompetitionDataManager:
     def set_judge_approval(self, name: str, problem_id: int, status: str):
         """Set judge approval status for a problem (approved/rejected)"""
         try:
-            data = self.load_data()
-            
-            if name not in data["competitors"]:
-                print(f"[ERROR] Competitor {name} not found")
-                return False
-            
-            problem_id_str = str(problem_id)
-            if "problems" not in data["competitors"][name]:
-                data["competitors"][name]["problems"] = {}
-            
-            # Check if problem has been submitted
-            if problem_id_str not in data["competitors"][name]["problems"]:
-                print(f"[WARNING] Problem {problem_id_str} not found for {name}. Available: {list(data['competitors'][name]['problems'].keys())}")
-                return False
-            
-            data["competitors"][name]["problems"][problem_id_str]["judge_approval"] = status
-            data["competitors"][name]["problems"][problem_id_str]["judge_approval_time"] = datetime.now().isoformat()
+            with self._writing():
+                data = self._refresh_state()
+                
+                if name not in data["competitors"]:
+                    print(f"[ERROR] Competitor {name} not found")
+                    return False
+                
+                problem_id_str = str(problem_id)
+                problems = data["competitors"][name].get("problems", {})
+                
+                # Check if problem has been submitted
+                if problem_id_str not in problems:
+                    print(f"[WARNING] Problem {problem_id_str} not found for {name}. Available: {list(problems.keys())}")
+                    return False
+                
+                # Copy only the path being changed
+                problem_data = dict(problems[problem_id_str])
+                problem_data["judge_approval"] = status
+                problem_data["judge_approval_time"] = datetime.now().isoformat()
+                competitor = dict(data["competitors"][name])
+                competitor["problems"] = dict(problems)
+                competitor["problems"][problem_id_str] = problem_data
+                
+                self._write_snapshot(self._with_competitor(data, name, competitor))
             
-            self.save_data(data)
             print(f"[OK] Set judge approval for {name} - Problem {problem_id}: {status}")
-            
-            # Verify
-            verify_data = self.load_data()
-            verify_status = verify_data["competitors"][name]["problems"][problem_id_str].get("judge_approval")
-            print(f"[VERIFY] Judge approval status is now: {verify_status}")
-            
-            return verify_status == status
+            return True
         except Exception as e:
             print(f"[ERROR] Failed to set judge approval: {e}")
             import traceback
@@ -235,5 +561,4 @@ class CompetitionDataManager:
     
     def is_name_taken(self, name: str) -> bool:
         """Check if a competitor name is already taken"""
-        data = self.load_data()
-        return name in data["competitors"]
+        return name in self._read_state()["competitors"]
@@ -4,6 +4,7 @@ Improved Competitor Interface
 Enhanced UI with better layout and visual feedback
 """
 import json
+import multiprocessing
 import os
 import sys
 import zipfile
@@ -13,6 +14,7 @@ import tempfile
 import shutil
 import subprocess
 from data_manager import create_data_manager
+from solution_profiler import describe_test_case, format_report, profile_solution
 
 
 class ImprovedCompetitorApp:
@@ -361,6 +363,12 @@ class ImprovedCompetitorApp:
                                   state=tk.DISABLED)
         self.run_btn.pack(side=tk.LEFT, padx=5, ipadx=25, ipady=8)
         
+        self.profile_btn = ttk.Button(left_frame, text="⏱ Profile",
+                                      style='Nav.TButton',
+                                      command=self.profile_current_solution,
+                                      state=tk.DISABLED)
+        self.profile_btn.pack(side=tk.LEFT, padx=5, ipadx=10, ipady=8)
+        
         ttk.Label(left_frame, text="← Compare your code with test cases",
                  font=('Segoe UI', 9, 'italic'),
                  foreground='#6c757d').pack(side=tk.LEFT, padx=(5, 20))
@@ -446,6 +454,7 @@ class ImprovedCompetitorApp:
         self.name_entry.config(state=tk.DISABLED)
         self.start_btn.config(state=tk.DISABLED)
         self.run_btn.config(state=tk.NORMAL)
+        self.profile_btn.config(state=tk.NORMAL)
         self.submit_btn.config(state=tk.NORMAL)
         self.next_btn.config(state=tk.NORMAL)
         self.export_btn.config(state=tk.NORMAL)
@@ -800,6 +809,61 @@ class ImprovedCompetitorApp:
             self.status_var.set(f"⚠ Solution submitted for Problem {problem_id} (incomplete)")
             self.update_status_color(self.colors['warning'])
     
+    def profile_current_solution(self):
+        """Profile the solution on the selected test case (or the first one)"""
+        self.save_current_code()
+        
+        problem = self.problems[self.current_problem]
+        student_code = self.code_editor.get(1.0, tk.END).strip()
+        test_cases = problem.get('test_cases', [])
+        
+        if not student_code:
+            messagebox.showwarning("Warning", "Please write some code first!")
+            return
+        if not test_cases:
+            messagebox.showwarning("Warning", "This problem has no test cases to profile.")
+            return
+        
+        selection = self.test_tree.selection()
+        test_idx = self.test_tree.index(selection[0]) if selection else 0
+        test_idx = min(test_idx, len(test_cases) - 1)
+        
+        self.status_var.set(f"⏳ Profiling {describe_test_case(test_cases[test_idx], test_idx)}...")
+        self.profile_btn.config(state=tk.DISABLED)
+        
+        import threading
+        thread = threading.Thread(target=self._profile_thread,
+                                  args=(student_code, test_cases[test_idx], test_idx),
+                                  daemon=True)
+        thread.start()
+    
+    def _profile_thread(self, student_code, test_case, test_idx):
+        """Run the profiler in a background thread"""
+        try:
+            report_text = format_report(profile_solution(student_code, test_case, redirect_stdin=True))
+        except Exception as e:
+            report_text = f"Failed to profile solution:\n{e}"
+        
+        def show_report():
+            self.profile_btn.config(state=tk.NORMAL)
+            self.status_var.set(f"✓ Profile ready for test {test_idx + 1}")
+            
+            popup = tk.Toplevel(self.root)
+            popup.title(f"Profile - {describe_test_case(test_case, test_idx)}")
+            popup.geometry("800x500")
+            popup.transient(self.root)
+            
+            text_area = scrolledtext.ScrolledText(popup, wrap=tk.NONE,
+                                                 font=('Consolas', 10),
+                                                 padx=15, pady=15)
+            text_area.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+            text_area.insert(tk.END, report_text)
+            text_area.config(state=tk.DISABLED)
+            
+            ttk.Button(popup, text="Close", command=popup.destroy).pack(pady=10)
+        
+        self.root.after(0, show_report)
+    
     def show_test_details(self, event):
         """Show full test case details in a popup"""
         region = self.test_tree.identify("region", event.x, event.y)
@@ -916,4 +980,6 @@ def main():
 
 
 if __name__ == "__main__":
+    # Worker processes of the frozen exe re-run it; let them run the worker instead of the app
+    multiprocessing.freeze_support()
     main()
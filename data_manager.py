@@ -1,52 +1,162 @@
 # -*- coding: utf-8 -*-
 """
 Unified Data Manager
-Automatically uses Firebase if configured, falls back to local JSON storage
+Automatically uses Firebase if configured, falls back to local storage
+(JSON file by default, SQLite for single-host deployments, or a sharded
+directory with one file per competitor)
+
+With Firebase, the SDK import and the connection (including its first RPC)
+run in a background thread; the backend is only waited for on first use,
+so user interfaces can paint before Firestore answers.
 """
+import atexit
 import os
-from typing import Dict, List, Optional
+import threading
+from bisect import bisect_right
+from typing import Dict, Iterator, List, Optional, Tuple
 from firebase_config import FirebaseConfig
+import startup_timing
+
+
+# Environment variable selecting the local backend when Firebase is not configured
+LOCAL_BACKEND_ENV = "COMPETITION_LOCAL_BACKEND"
+LOCAL_BACKENDS = ("json", "sqlite", "sharded")
+# Set to 1 to use the asyncio Firestore client for concurrent multi-document reads
+FIREBASE_ASYNC_ENV = "COMPETITION_FIREBASE_ASYNC"
+
+
+def submission_count(problem_data: dict) -> int:
+    """
+    Number of submissions for a problem. Works for full problem data and for
+    the compact per-problem summaries Firebase returns from get_all_competitors
+    (which carry 'submission_count' instead of the submissions list).
+    """
+    if 'submission_count' in problem_data:
+        return problem_data['submission_count']
+    return len(problem_data.get('submissions', []))
+
+
+def competitor_summary(competitor: dict) -> dict:
+    """
+    List-view projection of a competitor: profile fields plus, per problem,
+    submission_count, judge_approval and best_result (if any) without code or test output
+    """
+    summary = {key: competitor[key] for key in ('name', 'week', 'level', 'current_problem', 'last_activity')
+               if key in competitor}
+    summary['problems'] = {}
+    for problem_id, problem_data in competitor.get('problems', {}).items():
+        problem_summary = {
+            'submission_count': submission_count(problem_data),
+            'judge_approval': problem_data.get('judge_approval')
+        }
+        best = problem_data.get('best_result')
+        if best:
+            problem_summary['best_result'] = {
+                'all_passed': best.get('all_passed', False),
+                'passed_tests': best.get('passed_tests', 0),
+                'total_tests': best.get('total_tests', 0)
+            }
+        summary['problems'][problem_id] = problem_summary
+    return summary
 
 
 class DataManager:
     """
-    Unified data manager that automatically chooses between Firebase and local JSON.
+    Unified data manager that automatically chooses between Firebase and local storage.
     
     Priority:
     1. Firebase (if credentials are configured)
-    2. Local JSON (fallback)
+    2. Local storage (fallback): JSON file, or SQLite / sharded directory if selected
+       via local_backend="sqlite"/"sharded" or COMPETITION_LOCAL_BACKEND
     """
     
-    def __init__(self):
-        """Initialize the appropriate data manager"""
-        self.backend = None
+    def __init__(self, local_backend: Optional[str] = None, use_mirror: bool = False):
+        """
+        Initialize the appropriate data manager.
+        use_mirror: with Firebase, serve competitor reads, leaderboard and statistics
+        from the process-wide listener-fed mirror (for long-running dashboard servers)
+        """
+        self._backend = None
+        self._backend_ready = None  # Event while Firebase connects in the background
         self.backend_type = None
+        self._snapshot_publisher = None
+        self._mirror = None
+        self.use_mirror = use_mirror
+        self.local_backend = (local_backend or os.environ.get(LOCAL_BACKEND_ENV, "json")).lower()
+        if self.local_backend not in LOCAL_BACKENDS:
+            print(f"[WARNING] Unknown local backend '{self.local_backend}', using json")
+            self.local_backend = "json"
         self._initialize_backend()
     
     def _initialize_backend(self):
-        """Choose and initialize the appropriate backend"""
+        """Choose the appropriate backend (Firebase connects in the background)"""
         # Try Firebase first
         if FirebaseConfig.is_configured():
-            try:
+            self.backend_type = "firebase"
+            self._backend_ready = threading.Event()
+            threading.Thread(target=self._connect_firebase, daemon=True).start()
+            startup_timing.mark("Backend selected: firebase (connecting in background)")
+            return
+        
+        print(f"[INFO] Firebase not configured, using local {self.local_backend.upper()} storage")
+        print("  To use Firebase: Create 'firebase_credentials.json' with your service account key")
+        self._initialize_local_backend()
+        startup_timing.mark(f"Backend ready: {self.backend_type}")
+    
+    def _connect_firebase(self):
+        """Import the Firebase SDK and connect (background thread), or fall back to local storage"""
+        try:
+            if os.environ.get(FIREBASE_ASYNC_ENV) == "1":
+                from firebase_async_data_manager import AsyncFirebaseDataManager as FirebaseDataManager
+            else:
                 from firebase_data_manager import FirebaseDataManager
-                self.backend = FirebaseDataManager()
-                self.backend_type = "firebase"
-                print("[OK] Connected to Firebase Firestore")
-                return
-            except Exception as e:
-                print(f"[WARNING] Firebase initialization failed: {e}")
-                print("[INFO] Falling back to local JSON storage")
-        else:
-            print("[INFO] Firebase not configured, using local JSON storage")
-            print("  To use Firebase: Create 'firebase_credentials.json' with your service account key")
+            self._backend = FirebaseDataManager()
+            print("[OK] Connected to Firebase Firestore")
+            startup_timing.mark("Backend ready: firebase")
+        except Exception as e:
+            print(f"[WARNING] Firebase initialization failed: {e}")
+            print(f"[INFO] Falling back to local {self.local_backend.upper()} storage")
+            self._initialize_local_backend()
+            startup_timing.mark(f"Backend ready: {self.backend_type} (fallback)")
+            return
+        finally:
+            self._backend_ready.set()
+        
+        if self.use_mirror:
+            # Reads go to Firestore directly until the mirror has its initial snapshot
+            self._mirror = self._backend.get_mirror()
+    
+    @property
+    def backend(self):
+        """The storage backend (waits for a Firebase connection still in progress)"""
+        if self._backend_ready is not None:
+            self._backend_ready.wait()
+        return self._backend
+    
+    def is_ready(self) -> bool:
+        """True once the backend can be used without waiting"""
+        return self._backend_ready is None or self._backend_ready.is_set()
+    
+    def _initialize_local_backend(self):
+        """Initialize the selected local backend"""
+        if self.local_backend == "sqlite":
+            from sqlite_data_manager import SqliteDataManager
+            self._backend = SqliteDataManager()
+            self.backend_type = "sqlite"
+            return
+        
+        if self.local_backend == "sharded":
+            from sharded_data_manager import ShardedDataManager
+            self._backend = ShardedDataManager()
+            self.backend_type = "sharded"
+            return
         
-        # Fallback to JSON
         from competition_data_manager import CompetitionDataManager
-        self.backend = CompetitionDataManager()
+        self._backend = CompetitionDataManager()
         self.backend_type = "json"
     
     def get_backend_type(self) -> str:
-        """Get the current backend type"""
+        """Get the current backend type (the selected one while Firebase is still connecting)"""
         return self.backend_type
     
     def is_firebase(self) -> bool:
@@ -57,44 +167,166 @@ class DataManager:
         """Check if using JSON backend"""
         return self.backend_type == "json"
     
+    def is_sqlite(self) -> bool:
+        """Check if using SQLite backend"""
+        return self.backend_type == "sqlite"
+    
+    def is_sharded(self) -> bool:
+        """Check if using the sharded directory backend"""
+        return self.backend_type == "sharded"
+    
+    # ===== FIRESTORE MIRROR =====
+    
+    def _mirror_ready(self) -> bool:
+        """True if reads can be served by the Firestore mirror"""
+        return self._mirror is not None and self._mirror.is_ready()
+    
+    def _before_write(self, name: str):
+        """Read a competitor from Firestore until the mirror has seen this process's write"""
+        if self._mirror is not None:
+            self._mirror.mark_stale(name)
+    
+    # ===== SHARED SNAPSHOT (local backends) =====
+    
+    def _after_write(self):
+        """Republish the shared dashboard snapshot after a local write"""
+        if self.is_firebase():
+            return
+        if self._snapshot_publisher is None:
+            from shared_snapshot import SnapshotPublisher
+            self._snapshot_publisher = SnapshotPublisher(self.backend)
+            atexit.register(self.close)
+        self._snapshot_publisher.mark_dirty()
+    
+    def get_snapshot_reader(self):
+        """
+        Reader for the memory-mapped leaderboard snapshot published by the
+        processes that write (local backends only, None for Firebase)
+        """
+        if self.is_firebase():
+            return None
+        from shared_snapshot import SnapshotReader
+        return SnapshotReader(self.backend)
+    
+    def close(self):
+        """Flush the local backend, then publish the final shared snapshot synchronously"""
+        if self._backend is not None and hasattr(self._backend, 'close'):
+            self._backend.close()
+        if self._snapshot_publisher is not None:
+            self._snapshot_publisher.close()
+            self._snapshot_publisher = None
+    
     # Proxy all methods to the backend
     
     def start_competition(self):
         """Mark competition as started"""
-        return self.backend.start_competition()
+        result = self.backend.start_competition()
+        self._after_write()
+        return result
     
     def register_competitor(self, name: str, week: int = None, level: int = None) -> bool:
         """Register a new competitor"""
-        return self.backend.register_competitor(name, week=week, level=level)
+        self._before_write(name)
+        result = self.backend.register_competitor(name, week=week, level=level)
+        self._after_write()
+        return result
     
     def update_competitor_problem(self, name: str, problem_id: int):
         """Update which problem the competitor is currently viewing"""
-        return self.backend.update_competitor_problem(name, problem_id)
+        self._before_write(name)
+        result = self.backend.update_competitor_problem(name, problem_id)
+        self._after_write()
+        return result
     
     def submit_solution(self, name: str, problem_id: int, code: str, 
                        test_results: List[dict], all_passed: bool):
         """Record a solution submission"""
-        return self.backend.submit_solution(name, problem_id, code, test_results, all_passed)
+        self._before_write(name)
+        result = self.backend.submit_solution(name, problem_id, code, test_results, all_passed)
+        self._after_write()
+        return result
     
     def get_competitor_data(self, name: str) -> Optional[dict]:
         """Get data for a specific competitor"""
+        if self._mirror_ready():
+            competitor = self._mirror.get_competitor_data(name)
+            if competitor is not None:
+                return competitor
         return self.backend.get_competitor_data(name)
     
     def get_all_competitors(self) -> Dict[str, dict]:
         """Get data for all competitors"""
+        if self._mirror_ready():
+            return self._mirror.get_all_competitors()
         return self.backend.get_all_competitors()
     
+    def get_competitor_summaries(self) -> Dict[str, dict]:
+        """
+        Competitors projected for list views (see competitor_summary): counters
+        and statuses only, no submission code or test output
+        """
+        if self._mirror_ready():
+            return self._mirror.get_competitor_summaries()
+        if hasattr(self.backend, 'get_competitor_summaries'):
+            return self.backend.get_competitor_summaries()
+        return {name: competitor_summary(data) for name, data in self.backend.get_all_competitors().items()}
+
+    def get_presence(self) -> Dict[str, dict]:
+        """current_problem and last_activity of every competitor (who is active)"""
+        if self._mirror_ready():
+            return self._mirror.get_presence()
+        if hasattr(self.backend, 'get_presence'):
+            return self.backend.get_presence()
+        return {
+            name: {'current_problem': summary.get('current_problem', 1), 'last_activity': summary.get('last_activity', '')}
+            for name, summary in self.get_competitor_summaries().items()
+        }
+
+    def get_competitor_page(self, page_size: int = 100, start_after: Optional[str] = None,
+                            summaries: bool = True) -> Tuple[Dict[str, dict], Optional[str]]:
+        """
+        One page of competitors in name order, starting after the competitor
+        named start_after. Returns (page, cursor for the next page or None).
+        summaries=True returns list-view summaries (see get_competitor_summaries).
+        """
+        if not self._mirror_ready() and hasattr(self.backend, 'get_competitor_page'):
+            return self.backend.get_competitor_page(page_size=page_size, start_after=start_after, summaries=summaries)
+        
+        # Everything is already in memory (local backends, Firestore mirror)
+        source = self.get_competitor_summaries() if summaries else self.get_all_competitors()
+        names = sorted(source)
+        start = bisect_right(names, start_after) if start_after is not None else 0
+        page_names = names[start:start + page_size]
+        next_cursor = page_names[-1] if start + page_size < len(names) else None
+        return {name: source[name] for name in page_names}, next_cursor
+    
+    def iter_competitors(self, page_size: int = 100, summaries: bool = True) -> Iterator[Tuple[str, dict]]:
+        """(name, data) for every competitor in name order, fetched one page at a time"""
+        if not self._mirror_ready() and hasattr(self.backend, 'iter_competitors'):
+            yield from self.backend.iter_competitors(page_size=page_size, summaries=summaries)
+            return
+        
+        source = self.get_competitor_summaries() if summaries else self.get_all_competitors()
+        for name in sorted(source):
+            yield name, source[name]
+    
     def get_leaderboard(self) -> List[dict]:
         """Generate leaderboard data"""
+        if self._mirror_ready():
+            return self._mirror.get_leaderboard()
         return self.backend.get_leaderboard()
     
     def get_problem_statistics(self) -> dict:
         """Get statistics for each problem"""
+        if self._mirror_ready():
+            return self._mirror.get_problem_statistics()
         return self.backend.get_problem_statistics()
     
     def reset_competition(self):
         """Reset all competition data"""
-        return self.backend.reset_competition()
+        result = self.backend.reset_competition()
+        self._after_write()
+        return result
     
     def is_name_taken(self, name: str) -> bool:
         """Check if a competitor name is already taken"""
@@ -102,7 +334,52 @@ class DataManager:
     
     def set_judge_approval(self, name: str, problem_id: int, status: str):
         """Set judge approval status for a problem (approved/rejected)"""
-        return self.backend.set_judge_approval(name, problem_id, status)
+        self._before_write(name)
+        result = self.backend.set_judge_approval(name, problem_id, status)
+        self._after_write()
+        return result
+    
+    def set_judge_approvals(self, approvals: List[Tuple[str, int, str]]) -> int:
+        """
+        Set several judge approvals, given as (name, problem_id, status), in one
+        round-trip where the backend supports it. Returns the number applied.
+        """
+        for name, _, _ in approvals:
+            self._before_write(name)
+        if hasattr(self.backend, 'set_judge_approvals'):
+            result = self.backend.set_judge_approvals(approvals)
+        else:
+            result = sum(1 for name, problem_id, status in approvals
+                         if self.backend.set_judge_approval(name, problem_id, status))
+        self._after_write()
+        return result
+    
+    # ===== SECONDARY INDEX QUERIES =====
+    
+    def get_competitors_by_week(self, week: int) -> List[str]:
+        """Names of competitors assigned to a week"""
+        if not self._mirror_ready() and hasattr(self.backend, 'get_competitors_by_week'):
+            return self.backend.get_competitors_by_week(week)
+        return [name for name, summary in self.get_competitor_summaries().items() if summary.get('week') == week]
+    
+    def get_competitors_by_level(self, level: int) -> List[str]:
+        """Names of competitors assigned to a level"""
+        if not self._mirror_ready() and hasattr(self.backend, 'get_competitors_by_level'):
+            return self.backend.get_competitors_by_level(level)
+        return [name for name, summary in self.get_competitor_summaries().items() if summary.get('level') == level]
+    
+    def get_pending_approvals(self) -> List[Tuple[str, str]]:
+        """(name, problem_id) pairs that passed all tests and await judge review"""
+        if not self._mirror_ready() and hasattr(self.backend, 'get_pending_approvals'):
+            return self.backend.get_pending_approvals()
+        # Summaries carry best_result.all_passed and judge_approval: no code or test output is read
+        return [
+            (name, problem_id)
+            for name, summary in self.get_competitor_summaries().items()
+            for problem_id, problem_data in summary.get('problems', {}).items()
+            if (problem_data.get('best_result') or {}).get('all_passed', False) and
+            problem_data.get('judge_approval') not in ('approved', 'rejected')
+        ]
     
     def add_listener(self, callback):
         """
@@ -149,6 +426,14 @@ class DataManager:
 
 
 # Convenience function for creating data manager
-def create_data_manager():
+def create_data_manager(local_backend: Optional[str] = None, use_mirror: bool = False):
     """Create and return a data manager instance"""
-    return DataManager()
+    return DataManager(local_backend=local_backend, use_mirror=use_mirror)
+
+
+def configured_backend_type(local_backend: Optional[str] = None) -> str:
+    """Backend a data manager would use, without connecting to it or opening any files"""
+    if FirebaseConfig.is_configured():
+        return "firebase"
+    backend = (local_backend or os.environ.get(LOCAL_BACKEND_ENV, "json")).lower()
+    return backend if backend in LOCAL_BACKENDS else "json"
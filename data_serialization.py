@@ -0,0 +1,424 @@
+# -*- coding: utf-8 -*-
+"""
+Data Serialization
+Encodes competition data for the file backends and the migration tools.
+
+Formats (optionally followed by "+zlib" or "+zstd" compression):
+- json: indented JSON, human-readable (the original competition_data.json format)
+- json-compact: JSON without whitespace
+- msgpack: MessagePack (requires the msgpack package)
+- binary: built-in length-prefixed binary format, no dependencies
+
+Plain JSON is written as-is so existing files stay readable. Every other
+combination starts with a small header (magic, format, compression), so
+load_file() detects the format of any file it is given.
+
+Usage:
+    python data_serialization.py convert competition_data.json backup.bin --format binary+zlib
+    python data_serialization.py benchmark --competitors 500
+"""
+import argparse
+import json
+import os
+import random
+import struct
+import tempfile
+import time
+import zlib
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+# Environment variable selecting the on-disk format of the file backends
+FORMAT_ENV = "COMPETITION_DATA_FORMAT"
+
+MAGIC = b"OJTD\x01"
+
+_FORMAT_IDS = {"json": 1, "json-compact": 1, "msgpack": 2, "binary": 3}
+_COMPRESSION_IDS = {None: 0, "zlib": 1, "zstd": 2}
+
+FORMATS = tuple(_FORMAT_IDS)
+COMPRESSIONS = ("zlib", "zstd")
+
+
+class SerializationError(ValueError):
+    """Raised for unknown formats, missing optional packages and corrupt data"""
+
+
+def parse_format(spec: str):
+    """Split a format spec such as "binary+zlib" into (format, compression)"""
+    name, _, compression = (spec or "json").lower().partition("+")
+    compression = compression or None
+    if name not in _FORMAT_IDS:
+        raise SerializationError(f"Unknown format '{name}' (choose from {', '.join(FORMATS)})")
+    if compression not in _COMPRESSION_IDS:
+        raise SerializationError(f"Unknown compression '{compression}' (choose from {', '.join(COMPRESSIONS)})")
+    if name == "msgpack" and msgpack is None:
+        raise SerializationError("msgpack format requires the msgpack package (pip install msgpack)")
+    if compression == "zstd" and zstandard is None:
+        raise SerializationError("zstd compression requires the zstandard package (pip install zstandard)")
+    return name, compression
+
+
+def default_format(fallback: str = "json") -> str:
+    """Format spec from COMPETITION_DATA_FORMAT, or the fallback"""
+    spec = os.environ.get(FORMAT_ENV) or fallback
+    try:
+        parse_format(spec)
+    except SerializationError as e:
+        print(f"[WARNING] {e}; using {fallback}")
+        return fallback
+    return spec
+
+
+def available_formats() -> list:
+    """Every format spec usable with the installed packages"""
+    specs = []
+    for name in FORMATS:
+        for compression in (None,) + COMPRESSIONS:
+            spec = name if compression is None else f"{name}+{compression}"
+            try:
+                parse_format(spec)
+            except SerializationError:
+                continue
+            specs.append(spec)
+    return specs
+
+
+# ===== BUILT-IN BINARY FORMAT =====
+# Each value is a one-byte tag followed by its payload; strings, lists and
+# dicts are prefixed with a uint32 length, dict keys are stored as strings.
+
+_U32 = struct.Struct("<I")
+_I64 = struct.Struct("<q")
+_F64 = struct.Struct("<d")
+
+
+def _pack_str(value: str, out: bytearray):
+    encoded = value.encode("utf-8")
+    out += _U32.pack(len(encoded))
+    out += encoded
+
+
+def _pack(value, out: bytearray):
+    if value is None:
+        out += b"N"
+    elif value is True:
+        out += b"T"
+    elif value is False:
+        out += b"F"
+    elif isinstance(value, int):
+        if -(1 << 63) <= value < (1 << 63):
+            out += b"i"
+            out += _I64.pack(value)
+        else:
+            out += b"I"
+            _pack_str(str(value), out)
+    elif isinstance(value, float):
+        out += b"d"
+        out += _F64.pack(value)
+    elif isinstance(value, str):
+        out += b"s"
+        _pack_str(value, out)
+    elif isinstance(value, (list, tuple)):
+        out += b"l"
+        out += _U32.pack(len(value))
+        for item in value:
+            _pack(item, out)
+    elif isinstance(value, dict):
+        out += b"m"
+        out += _U32.pack(len(value))
+        for key, item in value.items():
+            _pack_str(str(key), out)
+            _pack(item, out)
+    else:
+        raise SerializationError(f"Cannot serialize {type(value).__name__}")
+
+
+def _unpack_str(buf: memoryview, pos: int):
+    (length,) = _U32.unpack_from(buf, pos)
+    pos += 4
+    return str(buf[pos:pos + length], "utf-8"), pos + length
+
+
+def _unpack(buf: memoryview, pos: int):
+    tag = buf[pos]
+    pos += 1
+    if tag == 0x4E:  # N
+        return None, pos
+    if tag == 0x54:  # T
+        return True, pos
+    if tag == 0x46:  # F
+        return False, pos
+    if tag == 0x69:  # i
+        return _I64.unpack_from(buf, pos)[0], pos + 8
+    if tag == 0x49:  # I
+        text, pos = _unpack_str(buf, pos)
+        return int(text), pos
+    if tag == 0x64:  # d
+        return _F64.unpack_from(buf, pos)[0], pos + 8
+    if tag == 0x73:  # s
+        return _unpack_str(buf, pos)
+    if tag == 0x6C:  # l
+        (count,) = _U32.unpack_from(buf, pos)
+        pos += 4
+        items = []
+        for _ in range(count):
+            item, pos = _unpack(buf, pos)
+            items.append(item)
+        return items, pos
+    if tag == 0x6D:  # m
+        (count,) = _U32.unpack_from(buf, pos)
+        pos += 4
+        result = {}
+        for _ in range(count):
+            key, pos = _unpack_str(buf, pos)
+            result[key], pos = _unpack(buf, pos)
+        return result, pos
+    raise SerializationError(f"Unknown type tag {tag!r} at offset {pos - 1}")
+
+
+def pack_binary(data) -> bytes:
+    """Encode with the built-in binary format"""
+    out = bytearray()
+    _pack(data, out)
+    return bytes(out)
+
+
+def unpack_binary(raw: bytes):
+    """Decode the built-in binary format"""
+    value, pos = _unpack(memoryview(raw), 0)
+    if pos != len(raw):
+        raise SerializationError(f"{len(raw) - pos} trailing bytes after binary payload")
+    return value
+
+
+# ===== PUBLIC API =====
+
+def dumps(data, spec: str = "json") -> bytes:
+    """Serialize data with a format spec such as "json" or "msgpack+zstd" """
+    name, compression = parse_format(spec)
+
+    if name == "json":
+        payload = json.dumps(data, indent=2, ensure_ascii=False).encode("utf-8")
+    elif name == "json-compact":
+        payload = json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    elif name == "msgpack":
+        payload = msgpack.packb(data, use_bin_type=True)
+    else:
+        payload = pack_binary(data)
+
+    if name in ("json", "json-compact") and compression is None:
+        return payload  # Plain JSON, no header
+
+    if compression == "zlib":
+        payload = zlib.compress(payload, 6)
+    elif compression == "zstd":
+        payload = zstandard.ZstdCompressor(level=3).compress(payload)
+
+    header = MAGIC + bytes((_FORMAT_IDS[name], _COMPRESSION_IDS[compression]))
+    return header + payload
+
+
+def loads(raw: bytes):
+    """Deserialize data written by dumps(), detecting the format"""
+    try:
+        if not raw.startswith(MAGIC):
+            return json.loads(raw.decode("utf-8"))
+
+        format_id, compression_id = raw[len(MAGIC)], raw[len(MAGIC) + 1]
+        payload = raw[len(MAGIC) + 2:]
+
+        if compression_id == 1:
+            payload = zlib.decompress(payload)
+        elif compression_id == 2:
+            if zstandard is None:
+                raise SerializationError("File is zstd-compressed but zstandard is not installed")
+            payload = zstandard.ZstdDecompressor().decompress(payload)
+        elif compression_id != 0:
+            raise SerializationError(f"Unknown compression id {compression_id}")
+
+        if format_id == 1:
+            return json.loads(payload.decode("utf-8"))
+        if format_id == 2:
+            if msgpack is None:
+                raise SerializationError("File is msgpack-encoded but msgpack is not installed")
+            return msgpack.unpackb(payload, raw=False, strict_map_key=False)
+        if format_id == 3:
+            return unpack_binary(payload)
+        raise SerializationError(f"Unknown format id {format_id}")
+    except SerializationError:
+        raise
+    except (ValueError, zlib.error, struct.error, IndexError) as e:
+        raise SerializationError(f"Corrupt data: {e}") from e
+    except Exception as e:
+        # msgpack and zstandard raise their own exception types
+        raise SerializationError(f"Corrupt data: {e}") from e
+
+
+def load_file(path: str):
+    """Read and deserialize a file in any supported format"""
+    with open(path, "rb") as f:
+        return loads(f.read())
+
+
+def dump_file(path: str, data, spec: str = "json"):
+    """Serialize data to a file atomically (temp file + rename)"""
+    raw = dumps(data, spec)
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temp_path = tempfile.mkstemp(prefix=".serialize.", suffix=".tmp", dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(raw)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
+
+
+def convert(source: str, destination: str, spec: str) -> dict:
+    """Convert a data file to another format. Returns the before/after sizes."""
+    data = load_file(source)
+    dump_file(destination, data, spec)
+    return {"source_size": os.path.getsize(source), "destination_size": os.path.getsize(destination)}
+
+
+# ===== BENCHMARK =====
+
+def synthetic_competition(competitors: int = 500, problems: int = 5, submissions: int = 3,
+                          tests: int = 10) -> dict:
+    """Competition data shaped like the JSON backend, for benchmarking"""
+    rng = random.Random(42)
+    code = (
+        "def solution(n):\n"
+        "    result = []\n"
+        "    for i in range(int(n)):\n"
+        "        if i % 3 == 0 and i % 5 == 0:\n"
+        "            result.append('FizzBuzz')\n"
+        "        elif i % 3 == 0:\n"
+        "            result.append('Fizz')\n"
+        "        else:\n"
+        "            result.append(str(i))\n"
+        "    return ' '.join(result)\n"
+    )
+    data = {
+        "competition_started": True,
+        "start_time": "2025-01-01T10:00:00",
+        "competitors": {},
+        "problems_loaded": list(range(1, problems + 1))
+    }
+    for c in range(competitors):
+        name = f"Competitor {c:04d}"
+        competitor = {
+            "name": name,
+            "joined_at": "2025-01-01T10:00:00",
+            "current_problem": problems,
+            "problems": {},
+            "last_activity": "2025-01-01T11:30:00",
+            "week": 1 + c % 4,
+            "level": 1 + c % 2
+        }
+        for p in range(1, problems + 1):
+            history = []
+            for s in range(submissions):
+                test_results = [{
+                    "test_num": t + 1,
+                    "passed": s == submissions - 1 or t % 2 == 0,
+                    "input": str(rng.randint(1, 10 ** 6)),
+                    "expected": str(rng.randint(1, 10 ** 9)),
+                    "output": str(rng.randint(1, 10 ** 9)),
+                    "error": None
+                } for t in range(tests)]
+                history.append({
+                    "code": code.replace("n", rng.choice("nxkm")) + f"# {name} attempt {s} {rng.random()}\n",
+                    "submitted_at": f"2025-01-01T10:{10 + s:02d}:{rng.randint(0, 59):02d}",
+                    "test_results": test_results,
+                    "all_passed": s == submissions - 1,
+                    "total_tests": tests,
+                    "passed_tests": sum(1 for t in test_results if t["passed"])
+                })
+            competitor["problems"][str(p)] = {
+                "submissions": history,
+                "best_result": history[-1],
+                "judge_approval": "pending"
+            }
+        data["competitors"][name] = competitor
+    return data
+
+
+def benchmark(competitors: int = 500, repeat: int = 3) -> list:
+    """Compare save/load time and size of every available format"""
+    data = synthetic_competition(competitors)
+    temp_dir = tempfile.mkdtemp()
+    results = []
+    try:
+        for spec in available_formats():
+            path = os.path.join(temp_dir, "data.bin")
+            save_times, load_times = [], []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                dump_file(path, data, spec)
+                save_times.append(time.perf_counter() - start)
+
+                start = time.perf_counter()
+                loaded = load_file(path)
+                load_times.append(time.perf_counter() - start)
+            assert loaded == data, f"{spec} did not round-trip"
+            results.append({
+                "format": spec,
+                "size": os.path.getsize(path),
+                "save_time": min(save_times),
+                "load_time": min(load_times)
+            })
+    finally:
+        for filename in os.listdir(temp_dir):
+            os.remove(os.path.join(temp_dir, filename))
+        os.rmdir(temp_dir)
+    return results
+
+
+def _print_benchmark(results: list, competitors: int):
+    baseline = results[0]
+    print(f"Synthetic competition: {competitors} competitors")
+    print(f"{'format':<20} {'size':>10} {'vs json':>8} {'save ms':>9} {'load ms':>9}")
+    for r in results:
+        print(f"{r['format']:<20} {r['size'] / 1024:>8.0f}KB {r['size'] / baseline['size']:>7.0%} "
+              f"{r['save_time'] * 1000:>9.1f} {r['load_time'] * 1000:>9.1f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Competition data serialization tools")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    convert_cmd = commands.add_parser("convert", help="Convert a data file to another format")
+    convert_cmd.add_argument("source")
+    convert_cmd.add_argument("destination")
+    convert_cmd.add_argument("--format", default="binary+zlib", help=f"One of: {', '.join(available_formats())}")
+
+    bench_cmd = commands.add_parser("benchmark", help="Compare formats on synthetic data")
+    bench_cmd.add_argument("--competitors", type=int, default=500)
+
+    args = parser.parse_args(argv)
+    if args.command == "convert":
+        sizes = convert(args.source, args.destination, args.format)
+        print(f"[OK] {args.source} ({sizes['source_size']} bytes) -> "
+              f"{args.destination} ({sizes['destination_size']} bytes, {args.format})")
+    else:
+        _print_benchmark(benchmark(args.competitors), args.competitors)
+
+
+if __name__ == "__main__":
+    main()
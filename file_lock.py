@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+"""
+File Lock
+Cross-process reader/writer lock on a sidecar lock file.
+
+Uses fcntl.flock on POSIX (shared and exclusive modes) and msvcrt.locking
+on Windows, where only exclusive locks exist so shared() behaves like
+exclusive(). Locks are re-entrant per thread: a thread holding the exclusive
+lock may enter shared() or exclusive() again without blocking itself.
+"""
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+class FileLock:
+    """Shared/exclusive lock backed by a lock file"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+
+    def _lock_fd(self, fd: int, exclusive: bool):
+        """Block until the OS lock is held"""
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            return
+        os.lseek(fd, 0, os.SEEK_SET)
+        while True:
+            try:
+                msvcrt.locking(fd, msvcrt.LK_LOCK, 1)
+                return
+            except OSError:
+                # LK_LOCK gives up after ~10 seconds; keep waiting
+                time.sleep(0.05)
+
+    def _unlock_fd(self, fd: int):
+        """Release the OS lock"""
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+            return
+        os.lseek(fd, 0, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+
+    @contextmanager
+    def _acquire(self, exclusive: bool):
+        depth = getattr(self._local, 'depth', 0)
+        if depth:
+            if exclusive and not self._local.exclusive:
+                raise RuntimeError(f"Cannot upgrade a shared lock on {self.path} to exclusive")
+            self._local.depth += 1
+            try:
+                yield
+            finally:
+                self._local.depth -= 1
+            return
+
+        # A new descriptor per acquisition, so threads lock independently
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            self._lock_fd(fd, exclusive)
+            self._local.depth = 1
+            self._local.exclusive = exclusive
+            try:
+                yield
+            finally:
+                self._local.depth = 0
+                self._unlock_fd(fd)
+        finally:
+            os.close(fd)
+
+    def shared(self):
+        """Context manager for reading: many holders at once, excludes writers"""
+        return self._acquire(exclusive=False)
+
+    def exclusive(self):
+        """Context manager for writing: a single holder"""
+        return self._acquire(exclusive=True)
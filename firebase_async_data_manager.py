@@ -0,0 +1,169 @@
+# -*- coding: utf-8 -*-
+"""
+Async Firebase Data Manager
+FirebaseDataManager variant whose multi-document reads go through the
+asyncio Firestore client (firestore.AsyncClient) and run concurrently
+with asyncio.gather.
+
+The async client lives on an event loop in a background thread; the public
+methods stay synchronous (they submit a coroutine and wait for it), so
+DataManager and every page keep calling the same API. Writes, transactions
+and listeners use the regular client inherited from FirebaseDataManager.
+
+Concurrent reads:
+- get_problems probes up to five candidate documents in one round-trip
+  instead of one after another
+- get_competitor_data reads the competitor document, its presence document
+  and its submissions at the same time
+- get_competitors_data hydrates several competitors at once
+
+Select it with COMPETITION_FIREBASE_ASYNC=1. Compare latencies against the
+blocking implementation with:
+    python firebase_async_data_manager.py [competitor names...]
+"""
+import asyncio
+import itertools
+import sys
+import threading
+import time
+from typing import Dict, List, Optional
+
+from firebase_admin import firestore_async
+from firebase_data_manager import FirebaseDataManager
+
+
+class _EventLoopThread:
+    """Event loop running forever in a daemon thread"""
+
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self._thread.start()
+
+    def run(self, coro):
+        """Run a coroutine on the loop and wait for its result"""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result()
+
+
+class AsyncFirebaseDataManager(FirebaseDataManager):
+    """FirebaseDataManager with concurrent reads through the async Firestore client"""
+
+    _instance = None  # Separate singleton from FirebaseDataManager
+
+    def _initialize_firebase(self):
+        """Initialize the blocking client (base class) and the async client on its loop"""
+        if self.initialized:
+            return
+        super()._initialize_firebase()
+        self._loop = _EventLoopThread()
+        # The async client binds to the loop it is first used on, so create it there
+        self.async_db = self._loop.run(self._create_async_client())
+        self.async_competitors_ref = self.async_db.collection('competitors')
+        self.async_problems_ref = self.async_db.collection('problems')
+        self.async_presence_ref = self.async_db.collection('presence')
+        self.async_code_blobs_ref = self.async_db.collection('code_blobs')
+
+    @staticmethod
+    async def _create_async_client():
+        return firestore_async.client()
+
+    # ===== ASYNC PRIMITIVES =====
+
+    async def _get_documents(self, refs: list) -> list:
+        """Snapshots of several documents, read concurrently"""
+        return await asyncio.gather(*(ref.get() for ref in refs))
+
+    async def _get_competitor_async(self, name: str) -> Optional[dict]:
+        """Competitor document, presence and submissions, read concurrently"""
+        doc_ref = self.async_competitors_ref.document(name)
+        submissions_query = doc_ref.collection('submissions').order_by('submitted_at')
+        doc, presence, submission_docs = await asyncio.gather(
+            doc_ref.get(), self.async_presence_ref.document(name).get(), submissions_query.get())
+        if not doc.exists:
+            return None
+        submissions = [(submission.id, submission.to_dict()) for submission in submission_docs]
+        missing = self._missing_code(submissions)
+        if missing:
+            refs = [self.async_code_blobs_ref.document(digest) for digest in missing]
+            self._fill_code(submissions, await self._get_documents(refs))
+        stored = doc.to_dict()
+        # Before hydrating, which fills in submission_count for old documents
+        self._remember_best(name, stored.get('problems', {}), doc.update_time)
+        return self._attach_submissions(self._with_presence(stored, presence), submissions)
+
+    # ===== SYNC FACADE =====
+
+    def get_competitor_data(self, name: str) -> Optional[dict]:
+        """Get data for a specific competitor, including the full submission history"""
+        try:
+            competitor = self._loop.run(self._get_competitor_async(name))
+            if competitor is not None:
+                competitor.update(self._heartbeats.pending(name))
+            return competitor
+        except Exception as e:
+            print(f"Error getting competitor data: {e}")
+            return None
+
+    def get_competitors_data(self, names: List[str]) -> Dict[str, dict]:
+        """Full data (with submission history) for several competitors, read concurrently"""
+        async def read_all():
+            return await asyncio.gather(*(self._get_competitor_async(name) for name in names))
+
+        try:
+            competitors = {}
+            for name, competitor in zip(names, self._loop.run(read_all())):
+                if competitor is not None:
+                    competitors[name] = competitor
+            return competitors
+        except Exception as e:
+            print(f"Error getting competitors data: {e}")
+            return {}
+
+    def _load_problems(self, week: Optional[int], level: Optional[int], prefetched: dict = None) -> dict:
+        """Read every candidate problems document concurrently, then normalize as usual"""
+        if prefetched is None:
+            doc_names = self._problem_candidates(week, level)
+            refs = [self.async_problems_ref.document(doc_name) for doc_name in doc_names]
+            prefetched = dict(zip(doc_names, self._loop.run(self._get_documents(refs))))
+        return super()._load_problems(week, level, prefetched=prefetched)
+
+
+def benchmark(names: List[str] = None, iterations: int = 5) -> List[dict]:
+    """
+    Median latency of multi-document reads, blocking vs async implementation.
+    Uses the configured Firebase project; names default to the first five competitors.
+    """
+    sync_dm = FirebaseDataManager()
+    async_dm = AsyncFirebaseDataManager()
+    if not names:
+        names = [name for name, _ in itertools.islice(sync_dm.iter_competitors(page_size=5), 5)]
+
+    operations = [
+        ("get_problems (uncached, week 1, level 1)",
+         lambda dm: dm._load_problems(1, 1)),
+        ("get_competitor_data (one competitor)",
+         lambda dm: dm.get_competitor_data(names[0]) if names else None),
+        (f"full data for {len(names)} competitors",
+         lambda dm: (dm.get_competitors_data(names) if hasattr(dm, 'get_competitors_data')
+                     else {name: dm.get_competitor_data(name) for name in names})),
+    ]
+
+    results = []
+    for label, operation in operations:
+        row = {"operation": label}
+        for key, dm in (("sync_ms", sync_dm), ("async_ms", async_dm)):
+            operation(dm)  # Warm up connections
+            timings = []
+            for _ in range(iterations):
+                start = time.perf_counter()
+                operation(dm)
+                timings.append((time.perf_counter() - start) * 1000)
+            row[key] = sorted(timings)[len(timings) // 2]
+        results.append(row)
+    return results
+
+
+if __name__ == "__main__":
+    print(f"{'Operation':<45} {'Sync (ms)':>10} {'Async (ms)':>11}")
+    for row in benchmark(sys.argv[1:]):
+        print(f"{row['operation']:<45} {row['sync_ms']:>10.1f} {row['async_ms']:>11.1f}")
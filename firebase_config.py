@@ -4,6 +4,7 @@ Firebase Configuration
 Setup and credentials for Firebase Firestore connection
 """
 import os
+import sys
 import json
 from typing import Optional
 
@@ -19,7 +20,8 @@ class FirebaseConfig:
         Load Firebase credentials from JSON file or Streamlit secrets.
         
         Priority:
-        1. Streamlit secrets (for cloud deployment)
+        1. Streamlit secrets (for cloud deployment, only checked when running
+           under Streamlit - streamlit is never imported from here)
         2. Local firebase_credentials.json file
         
         The credentials file should contain your Firebase service account key.
@@ -40,13 +42,14 @@ class FirebaseConfig:
         }
         """
         # Try to load from Streamlit secrets first (for deployment)
-        try:
-            import streamlit as st
-            if hasattr(st, 'secrets') and 'firebase' in st.secrets:
-                # Convert Streamlit secrets to dict
-                return dict(st.secrets['firebase'])
-        except:
-            pass
+        st = sys.modules.get('streamlit')
+        if st is not None:
+            try:
+                if hasattr(st, 'secrets') and 'firebase' in st.secrets:
+                    # Convert Streamlit secrets to dict
+                    return dict(st.secrets['firebase'])
+            except:
+                pass
         
         # Fall back to local file
         if not os.path.exists(FirebaseConfig.CONFIG_FILE):
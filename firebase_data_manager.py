@@ -2,13 +2,42 @@
 """
 Firebase Data Manager
 Handles shared data storage using Firebase Firestore for multi-device competition system
+
+Layout:
+- competitors/{name}: profile plus a compact summary per problem
+  (submission_count, best_result without code, judge_approval)
+- competitors/{name}/submissions/{id}: one document per submission
+  (code_hash, test results, problem_id)
+- code_blobs/{sha256}: submitted code, one document per distinct program
+  (rewritten idempotently with each submission so a reset cannot orphan it);
+  resolved (and cached, blobs never change) when submissions are read
+
+Large code and test_results values are stored compressed (bytes fields) and
+decompressed only when a submission field is read (see payload_codec).
+- presence/{name}: current_problem and last_activity, kept out of the
+  competitor document so heartbeats do not rewrite (or re-send to listeners)
+  the problems map; read paths merge it back into the competitor data
+- competition/leaderboard_{0..N-1}: leaderboard entries, sharded by name and
+  kept up to date with Increment deltas on every write, so a leaderboard read
+  is N small document reads regardless of the number of competitors
+
+get_competitor_data() hydrates the full submission history; get_all_competitors()
+returns the compact documents only.
 """
+import copy
 import threading
+import zlib
 from datetime import datetime
-from typing import Dict, List, Optional
+from typing import Dict, Iterator, List, Optional, Tuple
 import firebase_admin
 from firebase_admin import credentials, firestore
+from google.api_core.exceptions import FailedPrecondition, NotFound
 from firebase_config import FirebaseConfig
+from firestore_batch import BatchWriter
+import code_blobs
+import payload_codec
+from write_behind import WriteBehindBuffer
+from data_manager import competitor_summary, submission_count
 
 
 class FirebaseDataManager:
@@ -17,6 +46,23 @@ class FirebaseDataManager:
     _instance = None
     _lock = threading.Lock()
     
+    # Number of competition/leaderboard_N documents the leaderboard is spread over
+    LEADERBOARD_SHARDS = 4
+    LEADERBOARD_COUNTERS = ('problems_solved', 'approved_problems', 'rejected_problems',
+                            'total_tests_passed', 'total_submissions')
+    # Seconds activity heartbeats (current_problem/last_activity) are buffered before writing
+    HEARTBEAT_INTERVAL = 10.0
+    # Documents per query page when iterating over competitors
+    PAGE_SIZE = 200
+    # Tries of a judge approval whose precondition failed because the competitor changed
+    APPROVAL_ATTEMPTS = 5
+    # Hot fields stored in presence/{name} instead of the competitor document
+    PRESENCE_FIELDS = ('current_problem', 'last_activity')
+    # Fields read for list views (select() field mask, everything else stays on the server)
+    SUMMARY_FIELDS = ['week', 'level', 'current_problem', 'last_activity', 'problems']
+    # Code blobs kept in memory (content-addressed, so never stale)
+    CODE_CACHE_SIZE = 2000
+    
     def __new__(cls):
         """Singleton pattern to ensure only one Firebase connection"""
         if cls._instance is None:
@@ -30,6 +76,23 @@ class FirebaseDataManager:
         if not hasattr(self, 'initialized'):
             self.initialized = False
             self.db = None
+            # Best passed_tests known per (name, problem_id), for the read-free submit path
+            self._known_best = {}
+            self._known_versions = {}  # name -> update_time of the document _known_best was read from
+            self._known_best_lock = threading.Lock()
+            self._mirror = None
+            self._mirror_lock = threading.Lock()
+            # Problem catalog cache: (week, level) -> (version, problems)
+            self._problem_cache = {}
+            self._problem_cache_lock = threading.Lock()
+            self._problem_version = 0
+            self._problem_stamp = None
+            self._problem_watch = None  # Metadata listener; False if it could not be started
+            self._problem_watch_ready = threading.Event()
+            self._heartbeats = WriteBehindBuffer(self._write_heartbeats, self.HEARTBEAT_INTERVAL)
+            # code_hash -> code of blobs read or written by this process
+            self._code_cache = {}
+            self._code_cache_lock = threading.Lock()
             self._initialize_firebase()
     
     def _initialize_firebase(self):
@@ -62,6 +125,8 @@ class FirebaseDataManager:
         self.competitors_ref = self.db.collection('competitors')
         self.competition_ref = self.db.collection('competition')
         self.problems_ref = self.db.collection('problems')
+        self.presence_ref = self.db.collection('presence')
+        self.code_blobs_ref = self.db.collection('code_blobs')
         
         # Initialize competition metadata if not exists
         self._initialize_competition_metadata()
@@ -107,11 +172,13 @@ class FirebaseDataManager:
             competitor_data = {
                 'name': name,
                 'joined_at': datetime.now().isoformat(),
-                'current_problem': 1,
                 'problems': {},
-                'last_activity': datetime.now().isoformat(),
                 'created_at': firestore.SERVER_TIMESTAMP
             }
+            presence = {
+                'current_problem': 1,
+                'last_activity': competitor_data['joined_at']
+            }
             
             # Add week and level if provided
             if week is not None:
@@ -119,149 +186,522 @@ class FirebaseDataManager:
             if level is not None:
                 competitor_data['level'] = level
             
-            doc_ref.set(competitor_data)
+            batch = self.db.batch()
+            batch.set(doc_ref, competitor_data)
+            batch.set(self.presence_ref.document(name), presence)
+            batch.set(self._leaderboard_shard(name), {'entries': {name: {
+                **{counter: 0 for counter in self.LEADERBOARD_COUNTERS},
+                **presence
+            }}}, merge=True)
+            batch.commit()
+            self._remember_best(name, {})
             return True
         except Exception as e:
             print(f"Error registering competitor: {e}")
             return False
     
     def update_competitor_problem(self, name: str, problem_id: int):
-        """Update which problem the competitor is currently viewing"""
-        try:
-            doc_ref = self.competitors_ref.document(name)
-            doc_ref.update({
-                'current_problem': problem_id,
-                'last_activity': datetime.now().isoformat()
-            })
-        except Exception as e:
-            print(f"Error updating competitor problem: {e}")
+        """
+        Update which problem the competitor is currently viewing. The update is
+        buffered and written at most every HEARTBEAT_INTERVAL seconds (sooner
+        when the competitor submits), together with other buffered competitors.
+        """
+        self._heartbeats.update(name, {
+            'current_problem': problem_id,
+            'last_activity': datetime.now().isoformat()
+        })
+    
+    def _write_heartbeats(self, updates: Dict[str, dict]):
+        """Write buffered heartbeat fields of several competitors (presence documents) in one batch"""
+        writer = self.batch_writer()
+        shard_entries = {}
+        for name, fields in updates.items():
+            writer.set(self.presence_ref.document(name), fields, merge=True)
+            shard_ref = self._leaderboard_shard(name)
+            shard_entries.setdefault(shard_ref.id, (shard_ref, {}))[1][name] = fields
+        for shard_ref, entries in shard_entries.values():
+            writer.set(shard_ref, {'entries': entries}, merge=True)
+        writer.flush()
+    
+    # ===== LEADERBOARD AGGREGATE =====
+    
+    def _leaderboard_shard(self, name: str):
+        """Leaderboard document holding a competitor's entry"""
+        shard = zlib.crc32(name.encode('utf-8')) % self.LEADERBOARD_SHARDS
+        return self.competition_ref.document(f'leaderboard_{shard}')
+    
+    @staticmethod
+    def _leaderboard_contribution(problem_data: Optional[dict]) -> dict:
+        """What one problem adds to a competitor's leaderboard counters"""
+        problem_data = problem_data or {}
+        best = problem_data.get('best_result') or {}
+        solved = bool(best.get('all_passed', False))
+        approval = problem_data.get('judge_approval')
+        return {
+            'problems_solved': int(solved),
+            'approved_problems': int(solved and approval == 'approved'),
+            'rejected_problems': int(solved and approval == 'rejected'),
+            'total_tests_passed': best.get('passed_tests', 0),
+            'total_submissions': submission_count(problem_data)
+        }
+    
+    def _leaderboard_delta(self, name: str, old_problem: Optional[dict], new_problem: dict,
+                           extra: dict = None) -> dict:
+        """merge=True payload applying the change of one problem to the leaderboard entry"""
+        old = self._leaderboard_contribution(old_problem)
+        new = self._leaderboard_contribution(new_problem)
+        entry = {counter: firestore.Increment(new[counter] - old[counter])
+                 for counter in self.LEADERBOARD_COUNTERS if new[counter] != old[counter]}
+        entry.update(extra or {})
+        return {'entries': {name: entry}}
+    
+    def _leaderboard_entry(self, competitor: dict) -> dict:
+        """Full leaderboard entry computed from a competitor document"""
+        entry = {counter: 0 for counter in self.LEADERBOARD_COUNTERS}
+        for problem_data in competitor.get('problems', {}).values():
+            for counter, value in self._leaderboard_contribution(problem_data).items():
+                entry[counter] += value
+        entry['current_problem'] = competitor.get('current_problem', 1)
+        entry['last_activity'] = competitor.get('last_activity', '')
+        return entry
+    
+    def rebuild_leaderboard(self) -> int:
+        """Recompute every leaderboard document from the competitor documents. Returns the entry count."""
+        shards = {i: {} for i in range(self.LEADERBOARD_SHARDS)}
+        for name, competitor in self.get_all_competitors().items():
+            shard = zlib.crc32(name.encode('utf-8')) % self.LEADERBOARD_SHARDS
+            shards[shard][name] = self._leaderboard_entry(competitor)
+        
+        batch = self.db.batch()
+        for shard, entries in shards.items():
+            batch.set(self.competition_ref.document(f'leaderboard_{shard}'), {'entries': entries})
+        batch.commit()
+        return sum(len(entries) for entries in shards.values())
+    
+    @staticmethod
+    def _compact_result(submission: dict, submission_id: str) -> dict:
+        """Best-result summary kept on the competitor document (no code or test output)"""
+        return {
+            'submission_id': submission_id,
+            'submitted_at': submission['submitted_at'],
+            'all_passed': submission['all_passed'],
+            'total_tests': submission['total_tests'],
+            'passed_tests': submission['passed_tests']
+        }
+    
+    def _remember_best(self, name: str, problems: dict, update_time=None):
+        """
+        Record the best passed_tests of each problem of a competitor as stored
+        at update_time (replaces older entries; nothing is recorded without one).
+        Problems without a stored submission_count (written before the
+        subcollection layout) are skipped, so their first submit goes through
+        the transaction that initializes the counter.
+        """
+        with self._known_best_lock:
+            for key in [key for key in self._known_best if key[0] == name]:
+                del self._known_best[key]
+            self._known_versions.pop(name, None)
+            if update_time is None:
+                return
+            self._known_versions[name] = update_time
+            for problem_id, problem_data in problems.items():
+                best = problem_data.get('best_result')
+                if best is not None and 'submission_count' in problem_data:
+                    self._known_best[(name, problem_id)] = best.get('passed_tests', 0)
     
     def submit_solution(self, name: str, problem_id: int, code: str, 
                        test_results: List[dict], all_passed: bool):
-        """Record a solution submission"""
+        """
+        Record a solution submission (stored in the competitor's submissions subcollection).
+        
+        If this process already knows a best result at least as good, the submission
+        is written with one atomic batch (one round-trip, submission_count via Increment).
+        Otherwise a transaction re-reads the competitor and updates the best result,
+        so concurrent submits never lose each other's data.
+        """
         try:
-            doc_ref = self.competitors_ref.document(name)
-            doc = doc_ref.get()
+            # Activity buffered for this competitor is written before the submission
+            self._heartbeats.flush(name)
             
-            if not doc.exists:
-                return False
-            
-            competitor_data = doc.to_dict()
+            doc_ref = self.competitors_ref.document(name)
+            problem_key = str(problem_id)
+            passed_tests = sum(1 for t in test_results if t.get('passed', False))
             
+            # The blob is written with every submission (an idempotent set): a process-local
+            # cache cannot tell whether another process has reset the code_blobs collection
+            digest = code_blobs.code_hash(code)
             submission = {
-                'code': code,
+                'problem_id': problem_key,
+                'code_hash': digest,
                 'timestamp': datetime.now().isoformat(),
                 'submitted_at': datetime.now().isoformat(),
-                'test_results': test_results,
+                'test_results': payload_codec.encode_value(test_results, binary=True),
                 'all_passed': all_passed,
                 'total_tests': len(test_results),
-                'tests_passed': sum(1 for t in test_results if t.get('passed', False)),
-                'passed_tests': sum(1 for t in test_results if t.get('passed', False))
+                'tests_passed': passed_tests,
+                'passed_tests': passed_tests
             }
+            submission_ref = doc_ref.collection('submissions').document()
             
-            # Initialize problem data if not exists
-            problems = competitor_data.get('problems', {})
-            problem_key = str(problem_id)
+            with self._known_best_lock:
+                known_best = self._known_best.get((name, problem_key))
+                known_version = self._known_versions.get(name)
             
-            if problem_key not in problems:
-                problems[problem_key] = {
-                    'submissions': [],
-                    'best_result': None,
-                    'judge_approval': 'pending',  # Initialize approval status
-                    'judge_approval_time': None
-                }
-            
-            # Add submission
-            problems[problem_key]['submissions'].append(submission)
-            
-            # Update best result if this is better
-            current_best = problems[problem_key]['best_result']
-            if current_best is None or submission['passed_tests'] > current_best.get('passed_tests', 0):
-                problems[problem_key]['best_result'] = submission
-            
-            # Update document
-            doc_ref.update({
-                'problems': problems,
-                'last_activity': datetime.now().isoformat()
-            })
+            if known_best is not None and passed_tests <= known_best:
+                # Fast path: cannot improve the best result, no read needed (only known
+                # for problems whose stored document already has submission_count).
+                # The precondition fails if the document changed since it was read,
+                # e.g. reset and re-registered by another process.
+                batch = self.db.batch()
+                batch.set(self.code_blobs_ref.document(digest), {'code': payload_codec.encode_value(code, binary=True)})
+                batch.create(submission_ref, submission)
+                batch.update(doc_ref, {
+                    f'problems.{problem_key}.submission_count': firestore.Increment(1)
+                }, option=self.db.write_option(last_update_time=known_version))
+                batch.set(self.presence_ref.document(name), {'last_activity': submission['submitted_at']}, merge=True)
+                batch.set(self._leaderboard_shard(name), {'entries': {name: {
+                    'total_submissions': firestore.Increment(1),
+                    'last_activity': submission['submitted_at']
+                }}}, merge=True)
+                try:
+                    write_results = batch.commit()
+                except FailedPrecondition:
+                    # Stale: forget what is known and go through the transaction
+                    self._remember_best(name, {})
+                else:
+                    with self._known_best_lock:
+                        if self._known_versions.get(name) == known_version:
+                            self._known_versions[name] = write_results[2].update_time
+                    self._cache_code(digest, code)
+                    return True
             
+            best = self._submit_transaction(self.db.transaction(), name, doc_ref, submission_ref, submission, code)
+            if best is None:
+                return False
+            self._cache_code(digest, code)
+            # The commit time of the transaction is not known: the next read records it again
+            self._remember_best(name, {})
             return True
+        except NotFound:
+            # Competitor document does not exist (the batch is atomic, nothing was written)
+            return False
         except Exception as e:
             print(f"Error submitting solution: {e}")
             return False
     
+    def _submit_transaction(self, transaction, name: str, doc_ref, submission_ref,
+                            submission: dict, code: str) -> Optional[int]:
+        """
+        Write a submission and update the best result atomically. Returns the new best passed_tests.
+        The code is (re)written to code_blobs in the same transaction.
+        """
+        
+        @firestore.transactional
+        def run(transaction):
+            snapshot = doc_ref.get(transaction=transaction)
+            if not snapshot.exists:
+                return None
+            
+            problem_key = submission['problem_id']
+            problem_data = (snapshot.to_dict().get('problems') or {}).get(problem_key)
+            
+            updates = {
+                f'problems.{problem_key}.submission_count': firestore.Increment(1)
+            }
+            if problem_data is None or 'judge_approval' not in problem_data:
+                # Initialize approval status
+                updates[f'problems.{problem_key}.judge_approval'] = 'pending'
+                updates[f'problems.{problem_key}.judge_approval_time'] = None
+            if problem_data is not None and 'submission_count' not in problem_data:
+                # Document written before the subcollection layout
+                updates[f'problems.{problem_key}.submission_count'] = submission_count(problem_data) + 1
+            
+            # Update best result if this is better
+            new_problem = dict(problem_data or {})
+            new_problem['submission_count'] = submission_count(new_problem) + 1
+            current_best = new_problem.get('best_result')
+            best = current_best.get('passed_tests', 0) if current_best else None
+            if current_best is None or submission['passed_tests'] > best:
+                new_problem['best_result'] = self._compact_result(submission, submission_ref.id)
+                updates[f'problems.{problem_key}.best_result'] = new_problem['best_result']
+                best = submission['passed_tests']
+            
+            transaction.set(self.code_blobs_ref.document(submission['code_hash']),
+                            {'code': payload_codec.encode_value(code, binary=True)})
+            transaction.create(submission_ref, submission)
+            transaction.update(doc_ref, updates)
+            transaction.set(self.presence_ref.document(name), {'last_activity': submission['submitted_at']}, merge=True)
+            transaction.set(self._leaderboard_shard(name), self._leaderboard_delta(
+                name, problem_data, new_problem, {'last_activity': submission['submitted_at']}
+            ), merge=True)
+            return best
+        
+        return run(transaction)
+    
+    def _load_submissions(self, doc_ref) -> List[tuple]:
+        """(submission_id, submission) pairs of a competitor, oldest first, with their code resolved"""
+        submissions = [(doc.id, doc.to_dict())
+                       for doc in doc_ref.collection('submissions').order_by('submitted_at').stream()]
+        missing = self._missing_code(submissions)
+        if missing:
+            refs = [self.code_blobs_ref.document(digest) for digest in missing]
+            self._fill_code(submissions, self.db.get_all(refs))
+        return submissions
+    
+    # ===== CODE BLOBS =====
+    
+    def _cache_code(self, digest: str, code: str):
+        """Remember a blob known to be stored (oldest entries are evicted first)"""
+        with self._code_cache_lock:
+            self._code_cache[digest] = code
+            while len(self._code_cache) > self.CODE_CACHE_SIZE:
+                del self._code_cache[next(iter(self._code_cache))]
+    
+    def _missing_code(self, submissions: List[tuple]) -> List[str]:
+        """Hashes referenced by submissions whose code is not cached"""
+        with self._code_cache_lock:
+            return list({
+                submission['code_hash'] for _, submission in submissions
+                if 'code' not in submission and submission.get('code_hash')
+                and submission['code_hash'] not in self._code_cache
+            })
+    
+    def _fill_code(self, submissions: List[tuple], blob_docs):
+        """Cache fetched blob snapshots and set the code of every submission referencing a blob"""
+        for doc in blob_docs:
+            if doc.exists:
+                self._cache_code(doc.id, doc.to_dict().get('code', ''))
+        with self._code_cache_lock:
+            for _, submission in submissions:
+                if 'code' not in submission and submission.get('code_hash'):
+                    submission['code'] = self._code_cache.get(submission['code_hash'], '')
+    
+    @staticmethod
+    def _attach_submissions(competitor: dict, submissions: List[tuple]) -> dict:
+        """Attach the submission history and full best results to a competitor document"""
+        problems = competitor.setdefault('problems', {})
+        by_id = {}
+        
+        for submission_id, submission in submissions:
+            submission = payload_codec.LazyRecord(submission)
+            problem_data = problems.get(submission.pop('problem_id', None))
+            if problem_data is None:
+                continue
+            problem_data.setdefault('submissions', []).append(submission)
+            by_id[submission_id] = submission
+        
+        for problem_data in problems.values():
+            # Documents written before the subcollection layout keep their embedded list
+            problem_data.setdefault('submissions', [])
+            problem_data.setdefault('submission_count', len(problem_data['submissions']))
+            best = problem_data.get('best_result')
+            if best and best.get('submission_id') in by_id:
+                problem_data['best_result'] = by_id[best['submission_id']]
+        return competitor
+    
+    def _hydrate_submissions(self, doc_ref, competitor: dict) -> dict:
+        """Load and attach the submission history of a competitor document"""
+        return self._attach_submissions(competitor, self._load_submissions(doc_ref))
+    
     def get_competitor_data(self, name: str) -> Optional[dict]:
-        """Get data for a specific competitor"""
+        """Get data for a specific competitor, including the full submission history"""
         try:
             doc_ref = self.competitors_ref.document(name)
-            doc = doc_ref.get()
+            presence_ref = self.presence_ref.document(name)
+            # One round-trip for both documents (get_all does not preserve order)
+            snapshots = {snapshot.reference.path: snapshot for snapshot in self.db.get_all([doc_ref, presence_ref])}
+            doc, presence = snapshots[doc_ref.path], snapshots[presence_ref.path]
             
             if doc.exists:
-                return doc.to_dict()
+                stored = doc.to_dict()
+                # Before hydrating, which fills in submission_count for old documents
+                self._remember_best(name, stored.get('problems', {}), doc.update_time)
+                competitor = self._hydrate_submissions(doc_ref, self._with_presence(stored, presence))
+                competitor.update(self._heartbeats.pending(name))
+                return competitor
             return None
         except Exception as e:
             print(f"Error getting competitor data: {e}")
             return None
     
-    def get_all_competitors(self) -> Dict[str, dict]:
-        """Get data for all competitors"""
+    # ===== PRESENCE =====
+    
+    def _with_presence(self, competitor: dict, presence) -> dict:
+        """Competitor data with the fields of its presence snapshot (or dict) merged in"""
+        if presence is not None and not isinstance(presence, dict):
+            presence = presence.to_dict() if presence.exists else None
+        if presence:
+            competitor.update({key: presence[key] for key in self.PRESENCE_FIELDS if key in presence})
+        return competitor
+    
+    def _presence_for(self, names: List[str]) -> Dict[str, dict]:
+        """Presence documents of some competitors (one batched read)"""
+        if not names:
+            return {}
+        refs = [self.presence_ref.document(name) for name in names]
+        return {doc.id: doc.to_dict() for doc in self.db.get_all(refs) if doc.exists}
+    
+    def get_presence(self) -> Dict[str, dict]:
+        """current_problem/last_activity of every competitor, from the small presence documents"""
         try:
-            competitors = {}
-            docs = self.competitors_ref.stream()
-            
-            for doc in docs:
-                competitors[doc.id] = doc.to_dict()
+            return {doc.id: doc.to_dict() for doc in self.presence_ref.stream()}
+        except Exception as e:
+            print(f"Error getting presence: {e}")
+            return {}
+    
+    def add_presence_listener(self, callback):
+        """
+        Add a real-time listener for presence updates only
+        callback: function(snapshot, changes, read_time)
+        """
+        try:
+            return self.presence_ref.on_snapshot(callback)
+        except Exception as e:
+            print(f"Error adding presence listener: {e}")
+            return None
+    
+    # ===== COMPETITOR QUERIES =====
+    
+    def _paginate(self, query, page_size: int = None) -> Iterator[list]:
+        """Pages (lists of document snapshots) of a query, ordered by document ID"""
+        page_size = page_size or self.PAGE_SIZE
+        query = query.order_by(firestore.FieldPath.document_id()).limit(page_size)
+        cursor = None
+        while True:
+            docs = list((query if cursor is None else query.start_after(cursor)).stream())
+            if docs:
+                yield docs
+            if len(docs) < page_size:
+                return
+            cursor = docs[-1]
+    
+    def get_competitor_page(self, page_size: int = None, start_after: str = None,
+                            summaries: bool = False) -> Tuple[Dict[str, dict], Optional[str]]:
+        """
+        One page of competitors in name order, starting after the competitor
+        named start_after. Returns (page, cursor for the next page or None).
+        With summaries=True the documents are read with the list-view field mask.
+        """
+        try:
+            page_size = page_size or self.PAGE_SIZE
+            query = self.competitors_ref.select(self.SUMMARY_FIELDS) if summaries else self.competitors_ref
+            query = query.order_by(firestore.FieldPath.document_id()).limit(page_size)
+            if start_after is not None:
+                query = query.start_after({firestore.FieldPath.document_id(): self.competitors_ref.document(start_after)})
             
-            return competitors
+            docs = list(query.stream())
+            page = dict(self._merge_page(docs, summaries))
+            next_cursor = list(page)[-1] if len(page) == page_size else None
+            return page, next_cursor
+        except Exception as e:
+            print(f"Error getting competitor page: {e}")
+            return {}, None
+    
+    def iter_competitors(self, page_size: int = None, summaries: bool = False) -> Iterator[Tuple[str, dict]]:
+        """(name, data) for every competitor, fetched one page at a time"""
+        query = self.competitors_ref.select(self.SUMMARY_FIELDS) if summaries else self.competitors_ref
+        for docs in self._paginate(query, page_size):
+            yield from self._merge_page(docs, summaries)
+    
+    def _merge_page(self, docs: list, summaries: bool) -> Iterator[Tuple[str, dict]]:
+        """(name, data) for a page of competitor snapshots, with their presence merged in"""
+        presence = self._presence_for([doc.id for doc in docs])
+        for doc in docs:
+            data = self._with_presence(doc.to_dict(), presence.get(doc.id))
+            yield doc.id, competitor_summary(dict(data, name=doc.id)) if summaries else data
+    
+    def get_all_competitors(self) -> Dict[str, dict]:
+        """
+        Get data for all competitors. Problems carry compact summaries
+        (submission_count, best_result without code); use get_competitor_data
+        for the submission history.
+        """
+        try:
+            return dict(self.iter_competitors())
         except Exception as e:
             print(f"Error getting all competitors: {e}")
             return {}
     
+    def get_competitor_summaries(self) -> Dict[str, dict]:
+        """Competitors projected for list views, read with a select() field mask"""
+        try:
+            presence = self.get_presence()
+            docs = self.competitors_ref.select(self.SUMMARY_FIELDS).stream()
+            return {
+                doc.id: competitor_summary(self._with_presence(dict(doc.to_dict(), name=doc.id), presence.get(doc.id)))
+                for doc in docs
+            }
+        except Exception as e:
+            print(f"Error getting competitor summaries: {e}")
+            return {}
+    
+    def import_competitor(self, name: str, competitor_data: dict, writer: BatchWriter = None):
+        """
+        Write a competitor in the single-document format used by the local
+        backends, moving each submission into the submissions subcollection.
+        With a writer the writes are only queued (the caller flushes it).
+        """
+        own_writer = writer is None
+        if own_writer:
+            writer = self.batch_writer()
+        
+        doc_ref = self.competitors_ref.document(name)
+        for existing in doc_ref.collection('submissions').select([]).stream():
+            writer.delete(existing.reference)
+        
+        problems = {}
+        blobs = set()
+        for problem_id, problem_data in competitor_data.get('problems', {}).items():
+            summary = {key: value for key, value in problem_data.items() if key not in ('submissions', 'best_result')}
+            summary.setdefault('judge_approval', 'pending')
+            summary['submission_count'] = len(problem_data.get('submissions', []))
+            summary['best_result'] = None
+            
+            best = problem_data.get('best_result')
+            for submission in problem_data.get('submissions', []):
+                submission_ref = doc_ref.collection('submissions').document()
+                stored = payload_codec.encode_record(
+                    {key: submission[key] for key in submission if key != 'code'}, binary=True)
+                stored['code_hash'] = submission.get('code_hash') or code_blobs.code_hash(submission.get('code'))
+                if stored['code_hash'] not in blobs:
+                    blobs.add(stored['code_hash'])
+                    writer.set(self.code_blobs_ref.document(stored['code_hash']),
+                               {'code': payload_codec.encode_value(submission.get('code') or '', binary=True)})
+                writer.set(submission_ref, dict(stored, problem_id=str(problem_id)))
+                if best is not None and summary['best_result'] is None and submission == best:
+                    summary['best_result'] = self._compact_result(submission, submission_ref.id)
+            problems[str(problem_id)] = summary
+        
+        cold = {key: value for key, value in competitor_data.items() if key not in self.PRESENCE_FIELDS}
+        writer.set(doc_ref, dict(cold, problems=problems))
+        writer.set(self.presence_ref.document(name), {
+            'current_problem': competitor_data.get('current_problem', 1),
+            'last_activity': competitor_data.get('last_activity', '')
+        })
+        entry = self._leaderboard_entry(dict(competitor_data, problems=problems))
+        writer.set(self._leaderboard_shard(name), {'entries': {name: entry}}, merge=True)
+        
+        if own_writer:
+            writer.flush()
+        self._remember_best(name, problems)
+    
     def get_leaderboard(self) -> List[dict]:
-        """Generate leaderboard data"""
+        """Generate leaderboard data from the leaderboard aggregate documents"""
         try:
-            competitors = self.get_all_competitors()
-            leaderboard = []
+            shard_refs = [self.competition_ref.document(f'leaderboard_{i}')
+                          for i in range(self.LEADERBOARD_SHARDS)]
+            shard_docs = [doc for doc in self.db.get_all(shard_refs) if doc.exists]
+            if not shard_docs:
+                # Data written before the aggregate existed
+                print("[INFO] Leaderboard aggregate missing, rebuilding from competitor documents")
+                self.rebuild_leaderboard()
+                shard_docs = [doc for doc in self.db.get_all(shard_refs) if doc.exists]
             
-            for name, competitor in competitors.items():
-                total_solved = 0
-                approved_problems = 0
-                total_tests_passed = 0
-                total_submissions = 0
-                
-                problems = competitor.get('problems', {})
-                rejected_problems = 0
-                
-                for problem_id, problem_data in problems.items():
-                    best_result = problem_data.get('best_result', {})
-                    judge_approval = problem_data.get('judge_approval')
-                    
-                    # Count as solved if all tests passed
-                    if best_result and best_result.get('all_passed', False):
-                        total_solved += 1
-                        # Count as approved only if judge approved
-                        if judge_approval == 'approved':
-                            approved_problems += 1
-                        elif judge_approval == 'rejected':
-                            rejected_problems += 1
-                    
-                    if best_result:
-                        total_tests_passed += best_result.get('passed_tests', 0)
-                    total_submissions += len(problem_data.get('submissions', []))
-                
-                leaderboard.append({
-                    'name': name,
-                    'problems_solved': total_solved,
-                    'approved_problems': approved_problems,  # Judge approved count
-                    'rejected_problems': rejected_problems,  # Judge rejected count
-                    'total_tests_passed': total_tests_passed,
-                    'total_submissions': total_submissions,
-                    'current_problem': competitor.get('current_problem', 1),
-                    'last_activity': competitor.get('last_activity', '')
-                })
+            entries = {}
+            for doc in shard_docs:
+                entries.update(doc.to_dict().get('entries', {}))
             
-            # Sort by approved problems (desc), then by problems solved (desc), then by total tests passed (desc)
-            leaderboard.sort(key=lambda x: (-x['approved_problems'], -x['problems_solved'], -x['total_tests_passed']))
+            leaderboard = self._compute_leaderboard(entries)
             
             # Debug: Print leaderboard data
             print(f"[DEBUG] Leaderboard generated with {len(leaderboard)} competitors")
@@ -274,30 +714,53 @@ class FirebaseDataManager:
             print(f"Error generating leaderboard: {e}")
             return []
     
+    @staticmethod
+    def _compute_leaderboard(entries: Dict[str, dict]) -> List[dict]:
+        """Sorted leaderboard rows from leaderboard entries keyed by name"""
+        leaderboard = []
+        for name in sorted(entries):
+            entry = entries[name]
+            leaderboard.append({
+                'name': name,
+                'problems_solved': entry.get('problems_solved', 0),
+                'approved_problems': entry.get('approved_problems', 0),  # Judge approved count
+                'rejected_problems': entry.get('rejected_problems', 0),  # Judge rejected count
+                'total_tests_passed': entry.get('total_tests_passed', 0),
+                'total_submissions': entry.get('total_submissions', 0),
+                'current_problem': entry.get('current_problem', 1),
+                'last_activity': entry.get('last_activity', '')
+            })
+        
+        # Sort by approved problems (desc), then by problems solved (desc), then by total tests passed (desc)
+        leaderboard.sort(key=lambda x: (-x['approved_problems'], -x['problems_solved'], -x['total_tests_passed']))
+        return leaderboard
+    
+    @staticmethod
+    def _compute_problem_statistics(competitors: Dict[str, dict]) -> dict:
+        """Per-problem attempt/solver/submission counts from competitor documents or summaries"""
+        stats = {}
+        for competitor in competitors.values():
+            problems = competitor.get('problems', {})
+            for problem_id, problem_data in problems.items():
+                if problem_id not in stats:
+                    stats[problem_id] = {
+                        'total_attempts': 0,
+                        'total_solvers': 0,
+                        'total_submissions': 0
+                    }
+                
+                stats[problem_id]['total_attempts'] += 1
+                stats[problem_id]['total_submissions'] += submission_count(problem_data)
+                
+                best_result = problem_data.get('best_result', {})
+                if best_result and best_result.get('all_passed', False):
+                    stats[problem_id]['total_solvers'] += 1
+        return stats
+    
     def get_problem_statistics(self) -> dict:
-        """Get statistics for each problem"""
+        """Get statistics for each problem (from the field-masked summaries, no submission history)"""
         try:
-            competitors = self.get_all_competitors()
-            stats = {}
-            
-            for name, competitor in competitors.items():
-                problems = competitor.get('problems', {})
-                for problem_id, problem_data in problems.items():
-                    if problem_id not in stats:
-                        stats[problem_id] = {
-                            'total_attempts': 0,
-                            'total_solvers': 0,
-                            'total_submissions': 0
-                        }
-                    
-                    stats[problem_id]['total_attempts'] += 1
-                    stats[problem_id]['total_submissions'] += len(problem_data.get('submissions', []))
-                    
-                    best_result = problem_data.get('best_result', {})
-                    if best_result and best_result.get('all_passed', False):
-                        stats[problem_id]['total_solvers'] += 1
-            
-            return stats
+            return self._compute_problem_statistics(self.get_competitor_summaries())
         except Exception as e:
             print(f"Error getting problem statistics: {e}")
             return {}
@@ -305,91 +768,124 @@ class FirebaseDataManager:
     def reset_competition(self):
         """Reset all competition data"""
         try:
-            # Delete all competitor documents
-            docs = self.competitors_ref.stream()
-            for doc in docs:
-                doc.reference.delete()
+            with self._known_best_lock:
+                self._known_best.clear()
+                self._known_versions.clear()
+            self._heartbeats.discard()
+            with self._code_cache_lock:
+                self._code_cache.clear()
+            
+            # Delete all competitor documents and their submissions in 500-write batches
+            # (document IDs only, and one collection-group query for every submission)
+            writer = self.batch_writer()
+            for docs in self._paginate(self.db.collection_group('submissions').select([])):
+                for submission in docs:
+                    if submission.reference.parent.parent.parent.id == self.competitors_ref.id:
+                        writer.delete(submission.reference)
+                if len(writer) >= BatchWriter.MAX_BATCH_SIZE * 8:
+                    writer.flush()
+            for collection_ref in (self.competitors_ref, self.presence_ref, self.code_blobs_ref):
+                for docs in self._paginate(collection_ref.select([])):
+                    for doc in docs:
+                        writer.delete(doc.reference)
+            
+            # Empty leaderboard
+            for i in range(self.LEADERBOARD_SHARDS):
+                writer.set(self.competition_ref.document(f'leaderboard_{i}'), {'entries': {}})
             
             # Reset competition metadata
             doc_ref = self.competition_ref.document('metadata')
-            doc_ref.set({
+            writer.set(doc_ref, {
                 'competition_started': False,
                 'start_time': None,
                 'created_at': firestore.SERVER_TIMESTAMP,
                 'problems_loaded': []
             })
+            writer.flush()
             
-            print("Competition data reset successfully")
+            print(f"Competition data reset successfully ({writer.committed} writes)")
         except Exception as e:
             print(f"Error resetting competition: {e}")
     
     def set_judge_approval(self, name: str, problem_id: int, status: str):
         """Set judge approval status for a problem (approved/rejected)"""
+        return self.set_judge_approvals([(name, problem_id, status)]) == 1
+    
+    def set_judge_approvals(self, approvals: List[Tuple[str, int, str]]) -> int:
+        """
+        Set several judge approvals, given as (name, problem_id, status), with one
+        read (get_all) and one atomic commit. Each competitor update is conditional
+        on the document's last_update_time, so a successful commit is the
+        confirmation; if a competitor changed since the read, the whole set is
+        re-read and retried. Returns the number of approvals applied.
+        """
         try:
-            problem_id_str = str(problem_id)
-            print(f"[DEBUG] Setting judge approval: name={name}, problem_id={problem_id} (str: {problem_id_str}), status={status}")
-            
-            doc_ref = self.competitors_ref.document(name)
-            
-            # Get current data and update it
-            doc = doc_ref.get()
-            if not doc.exists:
-                print(f"[ERROR] Competitor {name} not found in database")
-                return False
+            by_name = {}
+            for name, problem_id, status in approvals:
+                by_name.setdefault(name, {})[str(problem_id)] = status
+            refs = [self.competitors_ref.document(name) for name in by_name]
             
-            data = doc.to_dict()
-            problems = data.get('problems', {})
-            
-            print(f"[DEBUG] Available problems for {name}: {list(problems.keys())}")
-            
-            if problem_id_str not in problems:
-                print(f"[WARNING] Problem {problem_id_str} not found for {name}. Available problems: {list(problems.keys())}")
-                return False
-            
-            print(f"[DEBUG] Current problem data: {problems.get(problem_id_str, {}).keys()}")
-            
-            # Check if judge_approval field exists, if not we need to create it first
-            current_approval = problems.get(problem_id_str, {}).get('judge_approval')
-            if current_approval is None:
-                print(f"[INFO] judge_approval field doesn't exist, creating it...")
-            
-            # Update using Firestore field path notation for nested updates
-            # This ensures the update is properly written to Firestore
-            update_dict = {
-                f'problems.{problem_id_str}.judge_approval': status,
-                f'problems.{problem_id_str}.judge_approval_time': datetime.now().isoformat()
-            }
-            
-            print(f"[DEBUG] Attempting to update with: {update_dict}")
-            
-            # Perform the update
-            doc_ref.update(update_dict)
-            
-            print(f"[OK] Firestore update completed for {name} - Problem {problem_id}")
-            
-            # Verify the update by reading back
-            import time
-            time.sleep(0.5)  # Small delay to ensure Firestore has processed the update
+            for attempt in range(self.APPROVAL_ATTEMPTS):
+                approval_time = datetime.now().isoformat()
+                batch = self.db.batch()
+                shard_entries = {}
+                applied = 0
+                
+                for doc in self.db.get_all(refs):
+                    name = doc.id
+                    if not doc.exists:
+                        print(f"[ERROR] Competitor {name} not found in database")
+                        continue
+                    competitor = doc.to_dict()
+                    problems = competitor.get('problems', {})
+                    
+                    # Update using Firestore field path notation for nested updates
+                    update_dict = {}
+                    for problem_id_str, status in by_name[name].items():
+                        if problem_id_str not in problems:
+                            print(f"[WARNING] Problem {problem_id_str} not found for {name}. Available problems: {list(problems.keys())}")
+                            continue
+                        update_dict[f'problems.{problem_id_str}.judge_approval'] = status
+                        update_dict[f'problems.{problem_id_str}.judge_approval_time'] = approval_time
+                        problems[problem_id_str] = dict(problems[problem_id_str], judge_approval=status)
+                        applied += 1
+                    if not update_dict:
+                        continue
+                    
+                    batch.update(doc.reference, update_dict,
+                                 option=self.db.write_option(last_update_time=doc.update_time))
+                    # The precondition guarantees the counters are computed from the current document;
+                    # presence fields live in presence/{name} and are left as they are in the shard
+                    shard_ref = self._leaderboard_shard(name)
+                    entry = self._leaderboard_entry(competitor)
+                    for key in self.PRESENCE_FIELDS:
+                        entry.pop(key)
+                    shard_entries.setdefault(shard_ref.id, (shard_ref, {}))[1][name] = entry
+                
+                if not applied:
+                    return 0
+                for shard_ref, entries in shard_entries.values():
+                    batch.set(shard_ref, {'entries': entries}, merge=True)
+                
+                try:
+                    batch.commit()
+                except FailedPrecondition:
+                    print(f"[INFO] Competitor data changed during judge approval, retrying ({attempt + 1}/{self.APPROVAL_ATTEMPTS})")
+                    continue
+                
+                for name, statuses in by_name.items():
+                    for problem_id_str, status in statuses.items():
+                        print(f"[OK] Set judge approval for {name} - Problem {problem_id_str}: {status}")
+                return applied
             
-            verify_doc = doc_ref.get()
-            if verify_doc.exists:
-                verify_data = verify_doc.to_dict()
-                verify_status = verify_data.get('problems', {}).get(problem_id_str, {}).get('judge_approval')
-                print(f"[VERIFY] Read back judge_approval status: {verify_status}")
-                if verify_status == status:
-                    print(f"[SUCCESS] Verification passed! Status is now {verify_status}")
-                    return True
-                else:
-                    print(f"[ERROR] Verification failed! Expected {status}, got {verify_status}")
-                    print(f"[DEBUG] Full problem data after update: {verify_data.get('problems', {}).get(problem_id_str, {})}")
-                    return False
-            return True
+            print("[ERROR] Judge approval failed: competitor data kept changing")
+            return 0
         except Exception as e:
-            print(f"[ERROR] Exception in set_judge_approval: {e}")
+            print(f"[ERROR] Exception in set_judge_approvals: {e}")
             print(f"[ERROR] Exception type: {type(e).__name__}")
             import traceback
             traceback.print_exc()
-            return False
+            return 0
     
     def is_name_taken(self, name: str) -> bool:
         """Check if a competitor name is already taken"""
@@ -401,6 +897,24 @@ class FirebaseDataManager:
             print(f"Error checking name: {e}")
             return False
     
+    def get_competitors_by_week(self, week: int) -> List[str]:
+        """Names of competitors assigned to a week (filtered server-side, document IDs only)"""
+        try:
+            docs = self.competitors_ref.where('week', '==', week).select([]).stream()
+            return [doc.id for doc in docs]
+        except Exception as e:
+            print(f"Error querying competitors by week: {e}")
+            return []
+    
+    def get_competitors_by_level(self, level: int) -> List[str]:
+        """Names of competitors assigned to a level (filtered server-side, document IDs only)"""
+        try:
+            docs = self.competitors_ref.where('level', '==', level).select([]).stream()
+            return [doc.id for doc in docs]
+        except Exception as e:
+            print(f"Error querying competitors by level: {e}")
+            return []
+    
     def add_listener(self, callback):
         """
         Add a real-time listener for competitor updates
@@ -412,6 +926,18 @@ class FirebaseDataManager:
             print(f"Error adding listener: {e}")
             return None
     
+    def batch_writer(self, **kwargs) -> BatchWriter:
+        """Chunked, parallel, retrying writer for bulk operations (see firestore_batch)"""
+        return BatchWriter(self.db, **kwargs)
+    
+    def get_mirror(self):
+        """Process-wide in-memory mirror of the competitors collection (one listener, created on first use)"""
+        with self._mirror_lock:
+            if self._mirror is None:
+                from firestore_mirror import CompetitorsMirror
+                self._mirror = CompetitorsMirror(self)
+            return self._mirror
+    
     def fix_missing_judge_approval_fields(self):
         """
         Utility function to add judge_approval field to all existing problems
@@ -421,21 +947,25 @@ class FirebaseDataManager:
             print("[INFO] Scanning for problems missing judge_approval field...")
             competitors = self.get_all_competitors()
             fixed_count = 0
+            writer = self.batch_writer()
             
             for name, comp_data in competitors.items():
                 problems = comp_data.get('problems', {})
-                doc_ref = self.competitors_ref.document(name)
+                updates = {}
                 
                 for problem_id, problem_data in problems.items():
                     if 'judge_approval' not in problem_data:
                         print(f"[FIX] Adding judge_approval to {name} - Problem {problem_id}")
                         # Add the missing field
-                        doc_ref.update({
-                            f'problems.{problem_id}.judge_approval': 'pending',
-                            f'problems.{problem_id}.judge_approval_time': None
-                        })
+                        updates[f'problems.{problem_id}.judge_approval'] = 'pending'
+                        updates[f'problems.{problem_id}.judge_approval_time'] = None
                         fixed_count += 1
+                
+                if updates:
+                    # One update per competitor, committed in 500-write batches
+                    writer.update(self.competitors_ref.document(name), updates)
             
+            writer.flush()
             print(f"[SUCCESS] Fixed {fixed_count} problems with missing judge_approval fields")
             return fixed_count
         except Exception as e:
@@ -444,6 +974,54 @@ class FirebaseDataManager:
             traceback.print_exc()
             return 0
     
+    # ===== PROBLEM CATALOG CACHE =====
+    
+    def _set_problem_stamp(self, stamp):
+        """Invalidate the problem cache if last_problem_update changed"""
+        with self._problem_cache_lock:
+            if stamp != self._problem_stamp:
+                self._problem_stamp = stamp
+                self._problem_version += 1
+                self._problem_cache.clear()
+    
+    def _on_metadata_snapshot(self, doc_snapshots, changes, read_time):
+        """Listener on competition/metadata"""
+        for doc in doc_snapshots:
+            self._set_problem_stamp((doc.to_dict() or {}).get('last_problem_update') if doc.exists else None)
+        self._problem_watch_ready.set()
+    
+    def _current_problem_version(self) -> int:
+        """Version of the problem catalog, watching competition/metadata on first use"""
+        metadata_ref = self.competition_ref.document('metadata')
+        with self._problem_cache_lock:
+            start_watch = self._problem_watch is None
+            if start_watch:
+                self._problem_watch = False
+        if start_watch:
+            try:
+                self._problem_watch = metadata_ref.on_snapshot(self._on_metadata_snapshot)
+                self._problem_watch_ready.wait(5)
+            except Exception as e:
+                print(f"[WARNING] Could not watch problem updates, checking metadata on every read: {e}")
+        if self._problem_watch is False:
+            # No listener: one metadata read per call instead of the full catalog
+            doc = metadata_ref.get()
+            self._set_problem_stamp(doc.to_dict().get('last_problem_update') if doc.exists else None)
+        return self._problem_version
+    
+    def _invalidate_problem_cache(self):
+        """Drop this process's cached catalog without waiting for the listener"""
+        with self._problem_cache_lock:
+            self._problem_version += 1
+            self._problem_cache.clear()
+    
+    def _touch_problems(self):
+        """Record a problem change so every process drops its cached catalog"""
+        self.competition_ref.document('metadata').set({
+            'last_problem_update': firestore.SERVER_TIMESTAMP
+        }, merge=True)
+        self._invalidate_problem_cache()
+    
     # ===== PROBLEM MANAGEMENT METHODS =====
     
     def upload_problems(self, problems_data: dict, session_name: str = "session1", level: int = 1) -> bool:
@@ -498,6 +1076,7 @@ class FirebaseDataManager:
                 'problems_uploaded': True,
                 'last_problem_update': firestore.SERVER_TIMESTAMP
             })
+            self._invalidate_problem_cache()
             
             return True
         except Exception as e:
@@ -513,148 +1092,106 @@ class FirebaseDataManager:
         1. Direct: {"session1": [...], "session2": [...]}
         2. Nested: {"sessions": {"session1": {...}, "session2": {...}}}
         
+        Results are cached per (week, level) for the whole process and invalidated
+        when competition/metadata.last_problem_update changes (watched with a
+        listener), so repeated calls cost no round-trips.
+        
         Args:
             week: Week number (corresponds to session number)
             level: Level number to filter problems
         
         Returns:
-            dict: Dictionary of problems with problem_id as key
+            dict: Dictionary of problems with problem_id as key (a copy, safe to modify)
         """
         try:
-            problems = {}
-            problem_counter = 1  # Auto-generate numeric IDs
+            version = self._current_problem_version()
+            key = (week, level)
+            with self._problem_cache_lock:
+                cached = self._problem_cache.get(key)
+            if cached is not None and cached[0] == version:
+                return copy.deepcopy(cached[1])
             
-            print(f"[DEBUG] get_problems called with week={week}, level={level}")
+            problems = self._load_problems(week, level)
+            with self._problem_cache_lock:
+                if version == self._problem_version:
+                    self._problem_cache[key] = (version, problems)
+            return copy.deepcopy(problems)
+        except Exception as e:
+            print(f"[ERROR] Failed to retrieve problems: {e}")
+            import traceback
+            traceback.print_exc()
+            return {}
+    
+    @staticmethod
+    def _problem_candidates(week: Optional[int], level: Optional[int]) -> List[str]:
+        """Problems documents _load_problems may probe, in order"""
+        doc_names = ['Level1_AllProblems', 'all_problems', 'problems']
+        if week:
+            if level:
+                doc_names.append(f'level{level}_session{week}')
+            doc_names.append(f'session{week}')
+        return doc_names
+    
+    def _problem_doc(self, doc_name: str, prefetched: dict = None):
+        """Snapshot of a problems document, from prefetched snapshots if available"""
+        if prefetched is not None and doc_name in prefetched:
+            return prefetched[doc_name]
+        return self.problems_ref.document(doc_name).get()
+    
+    def _load_problems(self, week: Optional[int], level: Optional[int], prefetched: dict = None) -> dict:
+        """
+        Read and normalize problems from the problems collection (uncached).
+        prefetched maps document names to snapshots already read (see _problem_candidates).
+        """
+        problems = {}
+        problem_counter = 1  # Auto-generate numeric IDs
+        
+        print(f"[DEBUG] get_problems called with week={week}, level={level}")
+        
+        # First, try to fetch a document called "all_problems" or "Level1_AllProblems"
+        # This handles the case where all problems are in one document
+        for doc_name in ['Level1_AllProblems', 'all_problems', 'problems']:
+            doc = self._problem_doc(doc_name, prefetched)
             
-            # First, try to fetch a document called "all_problems" or "Level1_AllProblems"
-            # This handles the case where all problems are in one document
-            for doc_name in ['Level1_AllProblems', 'all_problems', 'problems']:
-                doc_ref = self.problems_ref.document(doc_name)
-                doc = doc_ref.get()
+            if doc.exists:
+                print(f"[DEBUG] Found document: {doc_name}")
+                data = doc.to_dict()
+                print(f"[DEBUG] Document keys: {list(data.keys())}")
                 
-                if doc.exists:
-                    print(f"[DEBUG] Found document: {doc_name}")
-                    data = doc.to_dict()
-                    print(f"[DEBUG] Document keys: {list(data.keys())}")
+                # Check if this has the nested "sessions" structure
+                if 'sessions' in data:
+                    print(f"[DEBUG] Processing nested 'sessions' structure")
+                    sessions_data = data.get('sessions', {})
                     
-                    # Check if this has the nested "sessions" structure
-                    if 'sessions' in data:
-                        print(f"[DEBUG] Processing nested 'sessions' structure")
-                        sessions_data = data.get('sessions', {})
-                        
-                        # Filter by week if specified
-                        if week:
-                            session_name = f'session{week}'
-                            if session_name in sessions_data:
-                                session_data = sessions_data[session_name]
-                                problems_list = session_data.get('problems', [])
-                                print(f"[DEBUG] Found {len(problems_list)} problems in {session_name}")
+                    # Filter by week if specified
+                    if week:
+                        session_name = f'session{week}'
+                        if session_name in sessions_data:
+                            session_data = sessions_data[session_name]
+                            problems_list = session_data.get('problems', [])
+                            print(f"[DEBUG] Found {len(problems_list)} problems in {session_name}")
+                            
+                            for problem in problems_list:
+                                if not isinstance(problem, dict):
+                                    continue
                                 
-                                for problem in problems_list:
-                                    if not isinstance(problem, dict):
-                                        continue
-                                    
-                                    problem_id = problem.get('id')
-                                    if not isinstance(problem_id, int):
-                                        problem_id = problem_counter
-                                        problem['id'] = problem_id
-                                    
-                                    problem_counter += 1
-                                    
-                                    if 'level' not in problem:
-                                        problem['level'] = level if level else 1
-                                    
-                                    if level is None or str(problem.get('level', '')) == str(level):
-                                        problems[problem_id] = problem
-                        else:
-                            # Get all sessions
-                            for session_key, session_data in sessions_data.items():
-                                problems_list = session_data.get('problems', [])
-                                print(f"[DEBUG] Processing {session_key} with {len(problems_list)} problems")
+                                problem_id = problem.get('id')
+                                if not isinstance(problem_id, int):
+                                    problem_id = problem_counter
+                                    problem['id'] = problem_id
                                 
-                                for problem in problems_list:
-                                    if not isinstance(problem, dict):
-                                        continue
-                                    
-                                    problem_id = problem.get('id')
-                                    if not isinstance(problem_id, int):
-                                        problem_id = problem_counter
-                                        problem['id'] = problem_id
-                                    
-                                    problem_counter += 1
-                                    
-                                    if 'level' not in problem:
-                                        problem['level'] = 1
-                                    
-                                    if level is None or str(problem.get('level', '')) == str(level):
-                                        problems[problem_id] = problem
-                        
-                        print(f"[DEBUG] Returning {len(problems)} problems after filtering")
-                        return problems
-            
-            print(f"[DEBUG] No all_problems document found, trying individual session documents")
-            
-            # Fallback: Try individual session documents
-            # Determine session to fetch
-            if week:
-                session_name = f'session{week}'
-                # Try level-specific document first, then fall back to non-level document
-                doc_names_to_try = []
-                if level:
-                    doc_names_to_try.append(f'level{level}_{session_name}')
-                doc_names_to_try.append(session_name)
-                
-                doc = None
-                for doc_name in doc_names_to_try:
-                    doc_ref = self.problems_ref.document(doc_name)
-                    doc = doc_ref.get()
-                    if doc.exists:
-                        print(f"[DEBUG] Found session document: {doc_name}")
-                        break
-                
-                if doc and doc.exists:
-                    data = doc.to_dict()
-                    problems_list = data.get('problems', [])
-                    print(f"[DEBUG] Found {len(problems_list)} problems in {session_name}")
-                    
-                    # Convert list to dict and filter by level if specified
-                    for problem in problems_list:
-                        # Skip if not a dict (data structure issue)
-                        if not isinstance(problem, dict):
-                            print(f"[WARNING] Skipping invalid problem data (not a dict): {type(problem)}")
-                            continue
-                        
-                        # Use existing ID or auto-generate
-                        problem_id = problem.get('id')
-                        if not isinstance(problem_id, int):
-                            # If ID is string or missing, generate numeric ID
-                            problem_id = problem_counter
-                            problem['id'] = problem_id
-                        
-                        problem_counter += 1
-                        
-                        # Add level if missing
-                        if 'level' not in problem:
-                            problem['level'] = level if level else 1
-                        
-                        # Filter by level if specified
-                        if level is None or str(problem.get('level', '')) == str(level):
-                            problems[problem_id] = problem
-                else:
-                    print(f"[DEBUG] No document found for {session_name}")
-            else:
-                # Fetch all sessions
-                docs = self.problems_ref.stream()
-                
-                for doc in docs:
-                    data = doc.to_dict()
-                    
-                    # Check if this is the nested "sessions" format
-                    if 'sessions' in data:
-                        sessions_data = data.get('sessions', {})
-                        # Iterate through all sessions
+                                problem_counter += 1
+                                
+                                if 'level' not in problem:
+                                    problem['level'] = level if level else 1
+                                
+                                if level is None or str(problem.get('level', '')) == str(level):
+                                    problems[problem_id] = problem
+                    else:
+                        # Get all sessions
                         for session_key, session_data in sessions_data.items():
                             problems_list = session_data.get('problems', [])
+                            print(f"[DEBUG] Processing {session_key} with {len(problems_list)} problems")
                             
                             for problem in problems_list:
                                 if not isinstance(problem, dict):
@@ -672,9 +1209,72 @@ class FirebaseDataManager:
                                 
                                 if level is None or str(problem.get('level', '')) == str(level):
                                     problems[problem_id] = problem
-                    else:
-                        # Direct format
-                        problems_list = data.get('problems', [])
+                    
+                    print(f"[DEBUG] Returning {len(problems)} problems after filtering")
+                    return problems
+        
+        print(f"[DEBUG] No all_problems document found, trying individual session documents")
+        
+        # Fallback: Try individual session documents
+        # Determine session to fetch
+        if week:
+            session_name = f'session{week}'
+            # Try level-specific document first, then fall back to non-level document
+            doc_names_to_try = []
+            if level:
+                doc_names_to_try.append(f'level{level}_{session_name}')
+            doc_names_to_try.append(session_name)
+            
+            doc = None
+            for doc_name in doc_names_to_try:
+                doc = self._problem_doc(doc_name, prefetched)
+                if doc.exists:
+                    print(f"[DEBUG] Found session document: {doc_name}")
+                    break
+            
+            if doc and doc.exists:
+                data = doc.to_dict()
+                problems_list = data.get('problems', [])
+                print(f"[DEBUG] Found {len(problems_list)} problems in {session_name}")
+                
+                # Convert list to dict and filter by level if specified
+                for problem in problems_list:
+                    # Skip if not a dict (data structure issue)
+                    if not isinstance(problem, dict):
+                        print(f"[WARNING] Skipping invalid problem data (not a dict): {type(problem)}")
+                        continue
+                    
+                    # Use existing ID or auto-generate
+                    problem_id = problem.get('id')
+                    if not isinstance(problem_id, int):
+                        # If ID is string or missing, generate numeric ID
+                        problem_id = problem_counter
+                        problem['id'] = problem_id
+                    
+                    problem_counter += 1
+                    
+                    # Add level if missing
+                    if 'level' not in problem:
+                        problem['level'] = level if level else 1
+                    
+                    # Filter by level if specified
+                    if level is None or str(problem.get('level', '')) == str(level):
+                        problems[problem_id] = problem
+            else:
+                print(f"[DEBUG] No document found for {session_name}")
+        else:
+            # Fetch all sessions
+            docs = self.problems_ref.stream()
+            
+            for doc in docs:
+                data = doc.to_dict()
+                
+                # Check if this is the nested "sessions" format
+                if 'sessions' in data:
+                    sessions_data = data.get('sessions', {})
+                    # Iterate through all sessions
+                    for session_key, session_data in sessions_data.items():
+                        problems_list = session_data.get('problems', [])
                         
                         for problem in problems_list:
                             if not isinstance(problem, dict):
@@ -692,13 +1292,28 @@ class FirebaseDataManager:
                             
                             if level is None or str(problem.get('level', '')) == str(level):
                                 problems[problem_id] = problem
-            
-            return problems
-        except Exception as e:
-            print(f"[ERROR] Failed to retrieve problems: {e}")
-            import traceback
-            traceback.print_exc()
-            return {}
+                else:
+                    # Direct format
+                    problems_list = data.get('problems', [])
+                    
+                    for problem in problems_list:
+                        if not isinstance(problem, dict):
+                            continue
+                        
+                        problem_id = problem.get('id')
+                        if not isinstance(problem_id, int):
+                            problem_id = problem_counter
+                            problem['id'] = problem_id
+                        
+                        problem_counter += 1
+                        
+                        if 'level' not in problem:
+                            problem['level'] = 1
+                        
+                        if level is None or str(problem.get('level', '')) == str(level):
+                            problems[problem_id] = problem
+        
+        return problems
     
     def get_problem_by_id(self, problem_id: int, week: Optional[int] = None) -> Optional[dict]:
         """
@@ -748,6 +1363,7 @@ class FirebaseDataManager:
                             'problems': problems_list,
                             'updated_at': firestore.SERVER_TIMESTAMP
                         })
+                        self._touch_problems()
                         return True
                 
                 print(f"[WARNING] Problem {problem_id} not found in {session_name}")
@@ -788,6 +1404,7 @@ class FirebaseDataManager:
                         'problems': updated_list,
                         'updated_at': firestore.SERVER_TIMESTAMP
                     })
+                    self._touch_problems()
                     print(f"[INFO] Deleted problem {problem_id} from {session_name}")
                     return True
                 else:
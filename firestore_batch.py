@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+"""
+Firestore Batch Writer
+Queues writes and commits them as WriteBatch chunks of at most 500
+operations, several chunks in parallel, retrying transient failures with
+exponential backoff.
+
+Used for the admin operations that touch every competitor (reset, data
+fixes, migration): one commit per 500 writes instead of one RPC per write.
+Chunks are committed independently, so the operations queued should be
+idempotent (set/delete/plain update) - a retried chunk is applied again.
+"""
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
+
+from google.api_core import exceptions as api_exceptions
+
+
+# Errors worth retrying: contention, throttling, timeouts, server hiccups
+RETRYABLE_ERRORS = (
+    api_exceptions.Aborted,
+    api_exceptions.DeadlineExceeded,
+    api_exceptions.InternalServerError,
+    api_exceptions.ResourceExhausted,
+    api_exceptions.ServiceUnavailable,
+)
+
+
+class BatchWriteError(Exception):
+    """Some chunks could not be committed after retrying"""
+
+    def __init__(self, failed_writes: int, errors: List[Exception]):
+        super().__init__(f"{failed_writes} writes failed: {errors[0]}")
+        self.failed_writes = failed_writes
+        self.errors = errors
+
+
+class BatchWriter:
+    """
+    Collects set/update/delete operations and commits them in chunks.
+
+        with BatchWriter(db) as writer:
+            for doc in docs:
+                writer.delete(doc.reference)
+    """
+
+    MAX_BATCH_SIZE = 500
+
+    def __init__(self, db, batch_size: int = MAX_BATCH_SIZE, max_workers: int = 8,
+                 max_retries: int = 5, base_delay: float = 0.5):
+        self.db = db
+        self.batch_size = min(batch_size, self.MAX_BATCH_SIZE)
+        self.max_workers = max_workers
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self._operations = []
+        self.committed = 0
+
+    def __len__(self):
+        return len(self._operations)
+
+    def set(self, doc_ref, data: dict, merge: bool = False):
+        """Queue a set"""
+        self._operations.append(('set', doc_ref, data, merge))
+
+    def update(self, doc_ref, data: dict):
+        """Queue an update (the document must exist)"""
+        self._operations.append(('update', doc_ref, data, None))
+
+    def delete(self, doc_ref):
+        """Queue a delete"""
+        self._operations.append(('delete', doc_ref, None, None))
+
+    def _commit_chunk(self, operations: list):
+        """Commit one chunk as a WriteBatch, retrying transient errors"""
+        for attempt in range(self.max_retries + 1):
+            batch = self.db.batch()
+            for kind, doc_ref, data, merge in operations:
+                if kind == 'set':
+                    batch.set(doc_ref, data, merge=merge)
+                elif kind == 'update':
+                    batch.update(doc_ref, data)
+                else:
+                    batch.delete(doc_ref)
+            try:
+                batch.commit()
+                return
+            except RETRYABLE_ERRORS as e:
+                if attempt == self.max_retries:
+                    raise
+                delay = self.base_delay * (2 ** attempt) * (0.5 + random.random())
+                print(f"[WARNING] Batch commit failed ({type(e).__name__}), retrying in {delay:.1f}s")
+                time.sleep(delay)
+
+    def flush(self) -> int:
+        """
+        Commit everything queued. Returns the number of writes committed;
+        raises BatchWriteError if some chunks still failed after retrying.
+        """
+        operations, self._operations = self._operations, []
+        chunks = [operations[i:i + self.batch_size] for i in range(0, len(operations), self.batch_size)]
+        if not chunks:
+            return 0
+
+        failed_writes = 0
+        errors = []
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(chunks))) as executor:
+            futures = [(chunk, executor.submit(self._commit_chunk, chunk)) for chunk in chunks]
+            for chunk, future in futures:
+                try:
+                    future.result()
+                    self.committed += len(chunk)
+                except Exception as e:
+                    failed_writes += len(chunk)
+                    errors.append(e)
+
+        if errors:
+            raise BatchWriteError(failed_writes, errors)
+        return len(operations)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.flush()
+        return False
@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+"""
+Firestore Mirror
+In-memory copy of the competitors and presence collections, kept current
+by one on_snapshot listener per collection and process.
+
+Dashboards poll get_all_competitors / get_leaderboard / get_problem_statistics
+every few seconds from every open session; with the mirror those are served
+from memory and the server only receives the stream of changed documents.
+Derived values are recomputed at most once per change, and full submission
+histories are cached per competitor until their submission counts change.
+Presence (current_problem/last_activity) has its own listener, so activity
+heartbeats only deliver the small presence documents.
+"""
+import copy
+import threading
+import time
+from typing import Dict, List, Optional
+
+from data_manager import competitor_summary, submission_count
+
+
+class CompetitorsMirror:
+    """Listener-fed mirror of the Firestore competitors collection"""
+
+    # Seconds a competitor written by this process is read from Firestore
+    # directly while waiting for the listener to deliver the change
+    STALE_SECONDS = 5.0
+
+    def __init__(self, manager, ready_timeout: float = 10.0):
+        self.manager = manager
+        self._docs = {}
+        self._presence = {}
+        self._version = 0
+        self._derived_cache = {}
+        self._submissions_cache = {}
+        self._stale = {}
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+        self._presence_ready = threading.Event()
+        self._watch = manager.add_listener(self._on_snapshot)
+        self._presence_watch = manager.add_presence_listener(self._on_presence_snapshot)
+        if self._watch is not None:
+            self._ready.wait(ready_timeout)
+        if self._presence_watch is not None:
+            self._presence_ready.wait(ready_timeout)
+
+    def _on_snapshot(self, snapshot, changes, read_time):
+        """Apply document changes delivered by the listener"""
+        with self._lock:
+            for change in changes:
+                name = change.document.id
+                if change.type.name == 'REMOVED':
+                    self._docs.pop(name, None)
+                    self._submissions_cache.pop(name, None)
+                    self.manager._remember_best(name, {})
+                else:
+                    self._docs[name] = change.document.to_dict()
+                    self.manager._remember_best(name, self._docs[name].get('problems', {}),
+                                                change.document.update_time)
+                self._stale.pop(name, None)
+            if changes:
+                self._version += 1
+                self._derived_cache = {}
+        self._ready.set()
+
+    def _on_presence_snapshot(self, snapshot, changes, read_time):
+        """Apply presence document changes delivered by the presence listener"""
+        with self._lock:
+            for change in changes:
+                if change.type.name == 'REMOVED':
+                    self._presence.pop(change.document.id, None)
+                else:
+                    self._presence[change.document.id] = change.document.to_dict()
+            if changes:
+                self._version += 1
+                self._derived_cache = {}
+        self._presence_ready.set()
+
+    def is_ready(self) -> bool:
+        """True once the initial snapshots have been received"""
+        return (self._watch is not None and self._ready.is_set()
+                and self._presence_watch is not None and self._presence_ready.is_set())
+
+    def mark_stale(self, name: str):
+        """Called before this process writes a competitor (read-your-writes)"""
+        with self._lock:
+            self._stale[name] = time.monotonic()
+
+    def _is_stale(self, name: str) -> bool:
+        marked = self._stale.get(name)
+        return marked is not None and time.monotonic() - marked < self.STALE_SECONDS
+
+    def _merged(self, name: str, competitor: dict) -> dict:
+        """Competitor document with its presence fields (caller holds the lock)"""
+        presence = self._presence.get(name)
+        return self.manager._with_presence(dict(competitor), presence) if presence else competitor
+
+    def _derived(self, key: str, compute):
+        """Memoize a value computed from the mirrored documents until the next change"""
+        with self._lock:
+            version = self._version
+            if key in self._derived_cache:
+                return self._derived_cache[key]
+            docs = {name: self._merged(name, competitor) for name, competitor in self._docs.items()}
+        value = compute(docs)
+        with self._lock:
+            if self._version == version:
+                self._derived_cache[key] = value
+        return value
+
+    def get_all_competitors(self) -> Dict[str, dict]:
+        """Compact competitor documents with presence (shared, treat as read-only)"""
+        return dict(self._derived('competitors', lambda docs: docs))
+
+    def get_presence(self) -> Dict[str, dict]:
+        """Mirrored presence documents (shared, treat as read-only)"""
+        with self._lock:
+            return dict(self._presence)
+
+    def get_competitor_data(self, name: str) -> Optional[dict]:
+        """
+        Competitor with full submission history, or None if the mirror cannot
+        answer (the caller then reads Firestore)
+        """
+        with self._lock:
+            if self._is_stale(name) or name not in self._docs:
+                return None
+            competitor = copy.deepcopy(self._merged(name, self._docs[name]))
+        counts = tuple(sorted((problem_id, submission_count(problem_data))
+                              for problem_id, problem_data in competitor.get('problems', {}).items()))
+        cached = self._submissions_cache.get(name)
+        if cached is None or cached[0] != counts:
+            doc_ref = self.manager.competitors_ref.document(name)
+            cached = (counts, self.manager._load_submissions(doc_ref))
+            self._submissions_cache[name] = cached
+        return self.manager._attach_submissions(competitor, copy.deepcopy(cached[1]))
+
+    def get_competitor_summaries(self) -> Dict[str, dict]:
+        """List-view projections of the mirrored documents (shared, treat as read-only)"""
+        return self._derived('summaries', lambda docs: {
+            name: competitor_summary(dict(competitor, name=name)) for name, competitor in docs.items()
+        })
+
+    def get_leaderboard(self) -> List[dict]:
+        """Leaderboard computed from the mirrored documents"""
+        leaderboard = self._derived('leaderboard', lambda docs: self.manager._compute_leaderboard({
+            name: self.manager._leaderboard_entry(competitor) for name, competitor in docs.items()
+        }))
+        return [dict(entry) for entry in leaderboard]
+
+    def get_problem_statistics(self) -> dict:
+        """Problem statistics computed from the mirrored documents"""
+        stats = self._derived('statistics', self.manager._compute_problem_statistics)
+        return {problem_id: dict(values) for problem_id, values in stats.items()}
+
+    def close(self):
+        """Detach the listeners"""
+        for watch in (self._watch, self._presence_watch):
+            if watch is not None:
+                watch.unsubscribe()
+        self._watch = self._presence_watch = None
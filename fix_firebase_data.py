@@ -24,6 +24,12 @@ def main():
         # Run the fix
         count = dm.backend.fix_missing_judge_approval_fields()
         
+        # Recompute the leaderboard aggregate documents from competitor data
+        print()
+        print("Rebuilding leaderboard aggregate...")
+        entries = dm.backend.rebuild_leaderboard()
+        print(f"Leaderboard rebuilt with {entries} competitors")
+        
         print()
         print("=" * 60)
         print(f"COMPLETE: Fixed {count} problems")
@@ -3,11 +3,13 @@
 Judge Dashboard
 Real-time monitoring of all competitors and their submissions
 """
+import startup_timing
 import tkinter as tk
 from tkinter import ttk, scrolledtext, messagebox
 import json
+from collections import Counter
 from datetime import datetime
-from data_manager import create_data_manager
+from data_manager import create_data_manager, submission_count
 
 
 class JudgeDashboard:
@@ -37,14 +39,18 @@ class JudgeDashboard:
         self.auto_refresh = True
         self.refresh_job = None
         
+        # Memory-mapped leaderboard snapshot (local backends), avoids re-parsing the data file
+        self.snapshot_reader = data_manager.get_snapshot_reader()
+        
         # Configure styles
         self.configure_styles()
         
         # Create widgets
         self.create_widgets()
         
-        # Start auto-refresh
-        self.refresh_data()
+        # Start auto-refresh once the window has been painted
+        self._first_refresh = True
+        self.root.after_idle(self.refresh_data)
     
     def configure_styles(self):
         """Configure ttk styles"""
@@ -492,17 +498,30 @@ class JudgeDashboard:
     
     def refresh_data(self):
         """Refresh all data from data manager"""
+        if not self.data_manager.is_ready():
+            # Firebase is still connecting in the background; keep the UI responsive
+            self.status_var.set("Connecting to database...")
+            self.refresh_job = self.root.after(100, self.refresh_data)
+            return
+        
         try:
             # Update statistics
-            competitors = self.data_manager.get_all_competitors()
-            leaderboard = self.data_manager.get_leaderboard()
+            snapshot = self.snapshot_reader.read() if self.snapshot_reader else None
+            if snapshot is not None:
+                competitors = snapshot['competitors']
+                leaderboard = snapshot['leaderboard']
+                presence = competitors
+            else:
+                competitors = self.data_manager.get_competitor_summaries()
+                leaderboard = self.data_manager.get_leaderboard()
+                presence = self.data_manager.get_presence()
             
             self.total_competitors_var.set(str(len(competitors)))
             
             # Count active competitors (activity in last 5 minutes)
             now = datetime.now()
             active_count = 0
-            for comp in competitors.values():
+            for comp in presence.values():
                 if comp.get('last_activity'):
                     try:
                         last_activity = datetime.fromisoformat(comp['last_activity'])
@@ -528,6 +547,9 @@ class JudgeDashboard:
             # Update last refresh time
             self.last_update_var.set(f"Last update: {datetime.now().strftime('%H:%M:%S')}")
             self.status_var.set(f"✓ Refreshed - {len(competitors)} competitors tracked")
+            if self._first_refresh:
+                self._first_refresh = False
+                startup_timing.mark("First data shown")
             
         except Exception as e:
             self.status_var.set(f"✗ Error: {str(e)}")
@@ -614,18 +636,15 @@ class JudgeDashboard:
     
     def filter_competitors(self, event=None):
         """Filter competitors based on search and pending filter"""
-        all_competitors = self.data_manager.get_all_competitors()
+        all_competitors = self.data_manager.get_competitor_summaries()
         leaderboard = []
         
+        # Problems solved but not reviewed, from the backend's pending index
+        pending_counts = Counter(name for name, _ in self.data_manager.get_pending_approvals())
+        
         # Build leaderboard with pending count
         for name, competitor_data in all_competitors.items():
-            # Count pending problems (solved but not reviewed)
-            pending_count = 0
-            for problem_id, problem_data in competitor_data.get('problems', {}).items():
-                best_result = problem_data.get('best_result', {})
-                judge_approval = problem_data.get('judge_approval')
-                if best_result and best_result.get('all_passed', False) and not judge_approval:
-                    pending_count += 1
+            pending_count = pending_counts.get(name, 0)
             
             # Apply pending filter
             if self.show_pending_only_var.get() and pending_count == 0:
@@ -641,7 +660,7 @@ class JudgeDashboard:
                              if p.get('best_result', {}).get('all_passed', False))
             
             # Count total submissions
-            total_subs = sum(len(p.get('submissions', [])) 
+            total_subs = sum(submission_count(p)
                            for p in competitor_data.get('problems', {}).values())
             
             leaderboard.append({
@@ -1062,6 +1081,7 @@ def main():
     root = tk.Tk()
     data_manager = create_data_manager()
     app = JudgeDashboard(root, data_manager)
+    root.after_idle(startup_timing.mark, "Dashboard window painted")
     root.mainloop()
 
 
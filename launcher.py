@@ -3,12 +3,13 @@
 Competition System Launcher
 Main entry point for the competition system - allows users to choose their role
 """
+import startup_timing
 import tkinter as tk
 from tkinter import ttk, messagebox
 import subprocess
 import sys
 import os
-from data_manager import create_data_manager
+from data_manager import configured_backend_type
 
 
 class CompetitionLauncher:
@@ -105,13 +106,18 @@ class CompetitionLauncher:
         self.create_footer(center_frame)
     
     def check_database_connection(self):
-        """Check and display database connection status"""
+        """Display the configured database backend (the roles connect to it themselves)"""
         try:
-            dm = create_data_manager()
-            backend_type = dm.get_backend_type()
+            backend_type = configured_backend_type()
             
             if backend_type == "firebase":
                 print("[OK] Using Firebase Firestore for multi-device synchronization")
+            elif backend_type == "sqlite":
+                print("[INFO] Using local SQLite storage (single device)")
+                print("  To enable multi-device support, configure Firebase credentials")
+            elif backend_type == "sharded":
+                print("[INFO] Using local sharded storage, one file per competitor (single device)")
+                print("  To enable multi-device support, configure Firebase credentials")
             else:
                 print("[INFO] Using local JSON storage (single device)")
                 print("  To enable multi-device support, configure Firebase credentials")
@@ -293,6 +299,7 @@ class CompetitionLauncher:
 def main():
     root = tk.Tk()
     app = CompetitionLauncher(root)
+    root.after_idle(startup_timing.mark, "Launcher window painted")
     root.mainloop()
 
 
@@ -2,13 +2,21 @@
 """
 Migrate competition data from JSON to Firebase
 Run this script to transfer existing competition data to Firebase Firestore
+
+Usage: python migrate_to_firebase.py [data_file]
+The data file may be in any data_serialization format (pretty JSON, compact
+JSON, msgpack, binary, optionally compressed); pending journal entries are
+included.
 """
-import json
+import os
 import sys
+from competition_data_manager import CompetitionDataManager
+from data_serialization import SerializationError
 from firebase_data_manager import FirebaseDataManager
+from firestore_batch import BatchWriteError
 
 
-def migrate():
+def migrate(data_file: str = 'competition_data.json'):
     """Migrate data from JSON to Firebase"""
     print("=" * 60)
     print("  MIGRATION: JSON → Firebase Firestore")
@@ -16,17 +24,17 @@ def migrate():
     print()
     
     # Load JSON data
-    print("📂 Loading competition_data.json...")
-    try:
-        with open('competition_data.json', 'r') as f:
-            data = json.load(f)
-        print(f"   ✓ Loaded {len(data.get('competitors', {}))} competitors")
-    except FileNotFoundError:
-        print("   ✗ Error: competition_data.json not found")
+    print(f"📂 Loading {data_file}...")
+    if not os.path.exists(data_file):
+        print(f"   ✗ Error: {data_file} not found")
         print("   → Make sure the file exists in the current directory")
         return False
-    except json.JSONDecodeError as e:
-        print(f"   ✗ Error: Invalid JSON format - {e}")
+    try:
+        # Snapshot plus any journal entries not yet compacted
+        data = CompetitionDataManager(data_file, compact_interval=0).load_data()
+        print(f"   ✓ Loaded {len(data.get('competitors', {}))} competitors")
+    except SerializationError as e:
+        print(f"   ✗ Error: Invalid data file - {e}")
         return False
     
     # Initialize Firebase
@@ -71,13 +79,14 @@ def migrate():
     migrated_count = 0
     failed_count = 0
     
+    # Writes are queued and committed in 500-write batches, several at a time
+    writer = firebase.batch_writer()
     for name, competitor_data in competitors.items():
         try:
             print(f"   → {name}...", end=' ')
             
-            # Write directly to Firestore
-            doc_ref = firebase.competitors_ref.document(name)
-            doc_ref.set(competitor_data)
+            # Submissions go to the competitor's submissions subcollection
+            firebase.import_competitor(name, competitor_data, writer=writer)
             
             migrated_count += 1
             print("✓")
@@ -86,6 +95,14 @@ def migrate():
             failed_count += 1
             print(f"✗ ({e})")
     
+    print(f"   → Committing {len(writer)} writes...", end=' ')
+    try:
+        writer.flush()
+        print("✓")
+    except BatchWriteError as e:
+        print(f"✗ ({e})")
+        print(f"   ⚠ {e.failed_writes} writes failed - run the migration again to retry")
+    
     # Summary
     print("\n" + "=" * 60)
     print("  MIGRATION SUMMARY")
@@ -119,7 +136,7 @@ def migrate():
     print("Next steps:")
     print("  1. Open Firebase Console to verify data")
     print("  2. Run 'python launcher.py' to test")
-    print("  3. Original data preserved in competition_data.json")
+    print(f"  3. Original data preserved in {data_file}")
     print()
     
     return True
@@ -127,6 +144,6 @@ def migrate():
 
 if __name__ == "__main__":
     print()
-    success = migrate()
+    success = migrate(*sys.argv[1:2])
     print()
     sys.exit(0 if success else 1)
@@ -14,6 +14,7 @@ import contextlib
 # Add parent directory to path for imports
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from data_manager import create_data_manager
+from solution_profiler import profile_solution, render_streamlit_report, describe_test_case
 
 # Check if running in single-dashboard mode and hide sidebar navigation
 DASHBOARD_MODE = os.environ.get('DASHBOARD_MODE', None)
@@ -105,7 +106,7 @@ st.markdown("""
 # Initialize data manager
 @st.cache_resource
 def get_data_manager():
-    return create_data_manager()
+    return create_data_manager(use_mirror=True)
 
 data_manager = get_data_manager()
 
@@ -124,6 +125,8 @@ if 'user_week' not in st.session_state:
     st.session_state.user_week = None
 if 'user_level' not in st.session_state:
     st.session_state.user_level = None
+if 'profile_report' not in st.session_state:
+    st.session_state.profile_report = None
 
 # Function to load problems
 def load_problems(week=None, level=None):
@@ -533,6 +536,7 @@ else:
             if st.button("← Back to Problems", use_container_width=True):
                 st.session_state.current_problem = None
                 st.session_state.test_results = None
+                st.session_state.profile_report = None
                 st.rerun()
         
         with nav_col2:
@@ -549,6 +553,7 @@ else:
                     else:
                         st.session_state.code = problems[prev_problem_id].get('starter_code', '')
                     st.session_state.test_results = None
+                    st.session_state.profile_report = None
                     st.rerun()
         
         with nav_col4:
@@ -565,6 +570,7 @@ else:
                     else:
                         st.session_state.code = problems[next_problem_id].get('starter_code', '')
                     st.session_state.test_results = None
+                    st.session_state.profile_report = None
                     st.rerun()
         
         st.markdown(f"## Problem {problem_id}: {problem.get('title', 'Unknown')}")
@@ -621,8 +627,19 @@ else:
             )
             st.session_state.code = code
             
+            # Test case used by the Profile action
+            test_cases = problem.get('test_cases', [])
+            profile_test_idx = None
+            if test_cases:
+                profile_test_idx = st.selectbox(
+                    "Test case to profile:",
+                    range(len(test_cases)),
+                    format_func=lambda idx: describe_test_case(test_cases[idx], idx),
+                    key=f"profile_test_{problem_id}"
+                )
+            
             # Action buttons
-            btn_col1, btn_col2, btn_col3 = st.columns(3)
+            btn_col1, btn_col_profile, btn_col2, btn_col3 = st.columns(4)
             
             with btn_col1:
                 if st.button("▶️ Run Tests", type="primary", use_container_width=True):
@@ -635,6 +652,20 @@ else:
                     else:
                         st.error("Please write some code first!")
             
+            with btn_col_profile:
+                if st.button("⏱️ Profile", use_container_width=True,
+                             help="Run the selected test case under a profiler to see where time and memory go"):
+                    if not code.strip():
+                        st.error("Please write some code first!")
+                    elif profile_test_idx is None:
+                        st.error("This problem has no test cases to profile")
+                    else:
+                        with st.spinner("Profiling..."):
+                            st.session_state.profile_report = profile_solution(code, test_cases[profile_test_idx])
+                            st.session_state.profile_report['test_label'] = describe_test_case(
+                                test_cases[profile_test_idx], profile_test_idx)
+                            st.rerun()
+            
             with btn_col2:
                 if st.button("📤 Submit Solution", type="secondary", use_container_width=True):
                     if code.strip():
@@ -669,6 +700,7 @@ else:
                 if st.button("🔄 Reset Code", use_container_width=True):
                     st.session_state.code = problem.get('starter_code', '')
                     st.session_state.test_results = None
+                    st.session_state.profile_report = None
                     st.rerun()
         
         with col2:
@@ -701,6 +733,12 @@ else:
             else:
                 st.info("Click 'Run Tests' to see results here")
             
+            # Profile report
+            if st.session_state.profile_report:
+                report = st.session_state.profile_report
+                with st.expander(f"⏱️ Profile - {report.get('test_label', '')}", expanded=True):
+                    render_streamlit_report(report)
+            
             # Submission history
             st.markdown("### 📜 Your Submissions")
             # Reload fresh data to show latest submissions
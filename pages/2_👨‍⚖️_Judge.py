@@ -4,6 +4,7 @@ Monitor and review competitor submissions in real-time
 """
 import streamlit as st
 import pandas as pd
+from collections import Counter
 from datetime import datetime
 import json
 import sys
@@ -11,7 +12,8 @@ import os
 
 # Add parent directory to path for imports
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from data_manager import create_data_manager
+from data_manager import create_data_manager, submission_count
+from solution_profiler import describe_test_case, profile_solution, render_streamlit_report
 
 # Page configuration
 st.set_page_config(
@@ -86,7 +88,7 @@ st.markdown("""
 # Initialize data manager
 @st.cache_resource
 def get_data_manager():
-    return create_data_manager()
+    return create_data_manager(use_mirror=True)
 
 data_manager = get_data_manager()
 
@@ -124,6 +126,8 @@ with st.sidebar:
     
     show_pending_only = st.checkbox("Show only pending reviews", value=False)
     search_query = st.text_input("🔍 Search competitor", "")
+    page_size = st.selectbox("Competitors per page", options=[25, 50, 100, 200], index=1,
+                             help="The competitor table is loaded one page at a time")
     
     st.markdown("---")
     if st.button("📊 Export Report", use_container_width=True):
@@ -161,29 +165,17 @@ if auto_refresh:
         st.rerun()
 
 # Get data
-competitors = data_manager.get_all_competitors()
 leaderboard = data_manager.get_leaderboard()
 
-# Calculate statistics
-total_competitors = len(competitors)
-total_submissions = sum(
-    len(comp.get('problems', {}).get(pid, {}).get('submissions', []))
-    for comp in competitors.values()
-    for pid in comp.get('problems', {})
-)
-problems_solved = sum(
-    1 for comp in competitors.values()
-    for pid, pdata in comp.get('problems', {}).items()
-    if pdata.get('best_result', {}).get('all_passed', False)
-)
+# Calculate statistics (from the leaderboard, which covers every competitor)
+total_competitors = len(leaderboard)
+total_submissions = sum(entry['total_submissions'] for entry in leaderboard)
+problems_solved = sum(entry['problems_solved'] for entry in leaderboard)
 
-# Count pending reviews
-pending_count = sum(
-    1 for comp in competitors.values()
-    for pid, pdata in comp.get('problems', {}).items()
-    if pdata.get('best_result', {}).get('all_passed', False) and 
-    pdata.get('judge_approval') not in ['approved', 'rejected']
-)
+# Count pending reviews (secondary index, no scan of every problem)
+pending_approvals = data_manager.get_pending_approvals()
+pending_count = len(pending_approvals)
+pending_by_competitor = Counter(name for name, _ in pending_approvals)
 
 # Statistics Cards
 col1, col2, col3, col4 = st.columns(4)
@@ -237,6 +229,58 @@ with left_col:
     if week_filter != "All Weeks":
         selected_week = int(week_filter.split()[-1])  # Extract number from "Week X"
     
+    # Level and week filters come from the backend's secondary indexes
+    filtered_names = None
+    if selected_level is not None:
+        filtered_names = set(data_manager.get_competitors_by_level(selected_level))
+    if selected_week is not None:
+        week_names = set(data_manager.get_competitors_by_week(selected_week))
+        filtered_names = week_names if filtered_names is None else filtered_names & week_names
+    
+    def matches_filters(name: str) -> bool:
+        """Check a competitor against the level/week, pending and search filters"""
+        if filtered_names is not None and name not in filtered_names:
+            return False
+        if show_pending_only and pending_by_competitor.get(name, 0) == 0:
+            return False
+        if search_query and search_query.lower() not in name.lower():
+            return False
+        return True
+    
+    def load_filtered_page(start_after):
+        """
+        One page of matching competitors, reading backend pages (in name order)
+        until it is full. Returns (page, cursor for the next page or None).
+        """
+        page = {}
+        cursor = start_after
+        while True:
+            batch, batch_cursor = data_manager.get_competitor_page(page_size=page_size, start_after=cursor)
+            names = list(batch)
+            for index, name in enumerate(names):
+                if not matches_filters(name):
+                    continue
+                page[name] = batch[name]
+                if len(page) == page_size:
+                    more = index + 1 < len(names) or batch_cursor is not None
+                    return page, name if more else None
+            if batch_cursor is None:
+                return page, None
+            cursor = batch_cursor
+    
+    # Load one page of competitors (list-view summaries, in name order). With a
+    # search or filter active the page spans all competitors, not just one backend page.
+    # Paging restarts whenever the search, a filter or the page size changes.
+    page_key = (level_filter, week_filter, show_pending_only, search_query, page_size)
+    if st.session_state.get('judge_page_key') != page_key:
+        st.session_state.judge_page_key = page_key
+        st.session_state.judge_page_cursors = [None]
+    page_cursors = st.session_state.judge_page_cursors
+    if filtered_names is not None or show_pending_only or search_query:
+        competitors, next_cursor = load_filtered_page(page_cursors[-1])
+    else:
+        competitors, next_cursor = data_manager.get_competitor_page(page_size=page_size, start_after=page_cursors[-1])
+    
     # Prepare competitor data for table
     competitor_data = []
     for name, data in competitors.items():
@@ -244,20 +288,10 @@ with left_col:
         comp_week = data.get('week')
         comp_level = data.get('level')
         
-        # Apply level and week filters
-        if selected_level is not None and comp_level != selected_level:
-            continue
-        if selected_week is not None and comp_week != selected_week:
-            continue
-        
         problems = data.get('problems', {})
         
         # Count pending reviews
-        pending_reviews = sum(
-            1 for pid, pdata in problems.items()
-            if pdata.get('best_result', {}).get('all_passed', False) and 
-            pdata.get('judge_approval') not in ['approved', 'rejected']
-        )
+        pending_reviews = pending_by_competitor.get(name, 0)
         
         # Get current problem
         current_problem = data.get('current_problem', '-')
@@ -269,17 +303,11 @@ with left_col:
         )
         
         # Total submissions
-        submissions = sum(len(pdata.get('submissions', [])) for pdata in problems.values())
+        submissions = sum(submission_count(pdata) for pdata in problems.values())
         
         # Status
         status = "Active" if current_problem != '-' else "Idle"
         
-        # Apply other filters
-        if show_pending_only and pending_reviews == 0:
-            continue
-        if search_query and search_query.lower() not in name.lower():
-            continue
-        
         competitor_data.append({
             'Name': name,
             'Level': comp_level if comp_level is not None else '-',
@@ -314,6 +342,19 @@ with left_col:
     else:
         st.info("No competitors found matching your filters")
         st.session_state.selected_competitor = None
+    
+    # Page navigation
+    nav_prev, nav_label, nav_next = st.columns([1, 2, 1])
+    with nav_prev:
+        if st.button("◀ Previous", use_container_width=True, disabled=len(page_cursors) == 1):
+            page_cursors.pop()
+            st.rerun()
+    with nav_label:
+        st.caption(f"Page {len(page_cursors)} · {len(competitors)} competitors on this page")
+    with nav_next:
+        if st.button("Next ▶", use_container_width=True, disabled=next_cursor is None):
+            page_cursors.append(next_cursor)
+            st.rerun()
 
 with right_col:
     if st.session_state.get('selected_competitor'):
@@ -346,6 +387,23 @@ with right_col:
                             "Rejected Only", "Solved (All Passed)"]
             problem_filter = st.radio("Filter:", filter_options, horizontal=True, key="problem_filter")
             
+            # Approve every pending solution of this competitor in one round-trip
+            pending_ids = [
+                pid for pid, pdata in sorted(problems.items())
+                if (pdata.get('best_result') or {}).get('all_passed', False) and
+                pdata.get('judge_approval') not in ('approved', 'rejected')
+            ]
+            if len(pending_ids) > 1:
+                if st.button(f"✅ Approve all pending ({len(pending_ids)})", key=f"approve_all_{competitor_name}"):
+                    applied = data_manager.set_judge_approvals(
+                        [(competitor_name, int(pid), 'approved') for pid in pending_ids]
+                    )
+                    if applied == len(pending_ids):
+                        st.success(f"✅ Approved {applied} solutions")
+                    else:
+                        st.error(f"❌ Approved {applied} of {len(pending_ids)} solutions. Check the terminal/console for details.")
+                    st.rerun()
+            
             if problems:
                 for problem_id, problem_data in sorted(problems.items()):
                     best_result = problem_data.get('best_result', {})
@@ -496,6 +554,30 @@ with right_col:
                                 st.write(f"**Got:** `{result.get('output', 'N/A')}`")
                     else:
                         st.info("No test results available")
+                    
+                    # Profile the submission on one of its test cases
+                    profile_cases = [
+                        {'input': r.get('input', ''), 'output': r.get('expected', '')}
+                        for r in test_results if 'input' in r
+                    ]
+                    if most_recent.get('code') and profile_cases:
+                        st.markdown("**Performance Profile:**")
+                        prof_col1, prof_col2 = st.columns([3, 1])
+                        with prof_col1:
+                            profile_idx = st.selectbox(
+                                "Test case to profile:",
+                                range(len(profile_cases)),
+                                format_func=lambda idx: describe_test_case(profile_cases[idx], idx),
+                                key=f"profile_case_{competitor_name}_{selected_problem}"
+                            )
+                        with prof_col2:
+                            st.markdown("<br>", unsafe_allow_html=True)
+                            run_profile = st.button("⏱️ Profile", use_container_width=True,
+                                                    key=f"profile_{competitor_name}_{selected_problem}")
+                        if run_profile:
+                            with st.spinner("Profiling..."):
+                                report = profile_solution(most_recent['code'], profile_cases[profile_idx])
+                            render_streamlit_report(report)
             else:
                 st.info("No problems attempted yet")
     else:
@@ -10,7 +10,7 @@ import os
 
 # Add parent directory to path for imports
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from data_manager import create_data_manager
+from data_manager import create_data_manager, submission_count
 
 # Page configuration
 st.set_page_config(
@@ -112,7 +112,7 @@ st.markdown("""
 # Initialize data manager
 @st.cache_resource
 def get_data_manager():
-    return create_data_manager()
+    return create_data_manager(use_mirror=True)
 
 data_manager = get_data_manager()
 
@@ -137,15 +137,15 @@ st.markdown("---")
 
 # Get leaderboard data
 leaderboard = data_manager.get_leaderboard()
-competitors = data_manager.get_all_competitors()
+competitors = data_manager.get_competitor_summaries()
 
 # Statistics
 total_competitors = len(competitors)
 total_problems_solved = sum(entry.get('problems_solved', 0) for entry in leaderboard)
 total_submissions = sum(
-    len(comp.get('problems', {}).get(pid, {}).get('submissions', []))
+    submission_count(pdata)
     for comp in competitors.values()
-    for pid in comp.get('problems', {})
+    for pdata in comp.get('problems', {}).values()
 )
 
 # Stats row
@@ -176,7 +176,18 @@ with col3:
     """, unsafe_allow_html=True)
 
 with col4:
-    active_count = sum(1 for c in competitors.values() if c.get('current_problem'))
+    # Activity in the last 5 minutes, from the small presence documents
+    now = datetime.now()
+    active_count = 0
+    for presence in data_manager.get_presence().values():
+        last_activity = presence.get('last_activity')
+        if not last_activity:
+            continue
+        try:
+            if (now - datetime.fromisoformat(last_activity)).total_seconds() < 300:
+                active_count += 1
+        except (ValueError, TypeError):
+            pass
     st.markdown(f"""
     <div class="stat-card-spectator" style="background: linear-gradient(135deg, #f093fb 0%, #f5576c 100%);">
         <div style="font-size: 2.5rem; font-weight: 700;">{active_count}</div>
@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+"""
+Payload Codec
+Transparent compression of the large submission fields (code and
+test_results, which repeat every test input and expected output).
+
+When a submission is stored, each payload field larger than
+COMPRESS_THRESHOLD bytes is replaced by a small map
+
+    {"$codec": "zlib" | "zstd", "format": "text" | "json", "data": ...}
+
+with data as bytes (Firestore) or base64 text (JSON files). zstd is used
+when the zstandard package is installed, zlib otherwise; either is decoded.
+
+Stored submissions are read as LazyRecord dicts: the compressed value stays
+in the record and is only decompressed when a consumer reads the field
+(record["code"], record.get("test_results")). items(), values() and dict()
+copies see the stored form, which is what the backends write back.
+"""
+import base64
+import json
+import zlib
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+# Serialized size (bytes) above which a payload field is compressed
+COMPRESS_THRESHOLD = 1024
+
+# Submission fields the codec applies to
+PAYLOAD_FIELDS = ("code", "test_results")
+
+CODEC_KEY = "$codec"
+
+
+def is_encoded(value) -> bool:
+    """True for a compressed payload map"""
+    return isinstance(value, dict) and CODEC_KEY in value
+
+
+def encode_value(value, binary: bool = False):
+    """
+    Compressed form of a value if it is larger than the threshold and
+    compression pays off, otherwise the value itself. binary=True keeps the
+    compressed data as bytes (Firestore), else it is base64 text (JSON).
+    """
+    if value is None or is_encoded(value):
+        return value
+    fmt = "text" if isinstance(value, str) else "json"
+    raw = (value if fmt == "text" else json.dumps(value, ensure_ascii=False, separators=(",", ":"))).encode("utf-8")
+    if len(raw) <= COMPRESS_THRESHOLD:
+        return value
+
+    if zstandard is not None:
+        codec, data = "zstd", zstandard.ZstdCompressor(level=3).compress(raw)
+    else:
+        codec, data = "zlib", zlib.compress(raw, 6)
+    if len(data) >= len(raw):
+        return value
+    return {CODEC_KEY: codec, "format": fmt, "data": data if binary else base64.b64encode(data).decode("ascii")}
+
+
+def decode_value(value):
+    """Original value of a (possibly) compressed payload"""
+    if not is_encoded(value):
+        return value
+    data = value["data"]
+    if isinstance(data, str):
+        data = base64.b64decode(data)
+    if value[CODEC_KEY] == "zstd":
+        if zstandard is None:
+            raise ValueError("Payload is zstd-compressed but zstandard is not installed")
+        raw = zstandard.ZstdDecompressor().decompress(data)
+    else:
+        raw = zlib.decompress(data)
+    text = raw.decode("utf-8")
+    return text if value["format"] == "text" else json.loads(text)
+
+
+class LazyRecord(dict):
+    """Stored submission that decompresses payload fields when they are read"""
+
+    def __getitem__(self, key):
+        return decode_value(dict.__getitem__(self, key))
+
+    def get(self, key, default=None):
+        return decode_value(dict.get(self, key, default))
+
+
+def encode_record(record: dict, binary: bool = False) -> LazyRecord:
+    """Copy of a submission with its payload fields compressed (already compressed ones are kept)"""
+    stored = LazyRecord(record)
+    for field in PAYLOAD_FIELDS:
+        if field in stored:
+            dict.__setitem__(stored, field, encode_value(dict.__getitem__(stored, field), binary))
+    return stored
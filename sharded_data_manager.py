@@ -0,0 +1,418 @@
+# -*- coding: utf-8 -*-
+"""
+Sharded Data Manager
+Local competition storage split into one file per competitor.
+
+Directory layout:
+- metadata.json: competition_started, start_time, problems_loaded
+- index.json: lightweight summary per competitor (no code or test results)
+  plus secondary indexes by week, by level and of problems awaiting review
+- competitors/<name>.json: full competitor document with submission history
+
+A submit or judge approval rewrites one competitor file plus the small index,
+and the leaderboard and problem statistics are computed from the index alone.
+Every file is replaced atomically (temp file + rename) under an exclusive
+file lock; readers take the lock shared. Files are compact JSON by default,
+or any data_serialization format selected with the serialization argument
+or COMPETITION_DATA_FORMAT.
+"""
+import copy
+import hashlib
+import os
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, List, Optional
+from urllib.parse import quote
+
+import data_serialization
+from data_manager import competitor_summary
+from file_lock import FileLock
+
+
+def _read_file(path: str):
+    """Parse a data file in any supported format, None if it does not exist"""
+    try:
+        return data_serialization.load_file(path)
+    except FileNotFoundError:
+        return None
+
+
+def shard_filename(name: str) -> str:
+    """
+    File name for a competitor shard. The hash suffix keeps names distinct
+    on case-insensitive file systems ("Ali" and "ali").
+    """
+    digest = hashlib.sha1(name.encode('utf-8')).hexdigest()[:10]
+    return f"{quote(name, safe='')[:64]}-{digest}.json"
+
+
+class ShardedDataManager:
+    """Manages competition data as a directory of per-competitor files"""
+
+    def __init__(self, data_dir="competition_data", serialization: str = None):
+        self.data_dir = data_dir
+        self.serialization = serialization or data_serialization.default_format("json-compact")
+        data_serialization.parse_format(self.serialization)
+        self.competitors_dir = os.path.join(data_dir, "competitors")
+        self.metadata_file = os.path.join(data_dir, "metadata.json")
+        self.index_file = os.path.join(data_dir, "index.json")
+        self.lock = threading.RLock()
+        self.file_lock = None
+
+        # Parsed files keyed by path, revalidated by file signature
+        self._cache = {}
+
+        self.initialize_data()
+
+    @staticmethod
+    def _initial_metadata() -> dict:
+        """Empty competition metadata"""
+        return {
+            "competition_started": False,
+            "start_time": None,
+            "problems_loaded": []
+        }
+
+    def initialize_data(self):
+        """Create the directory layout if it doesn't exist"""
+        os.makedirs(self.competitors_dir, exist_ok=True)
+        self.file_lock = FileLock(os.path.join(self.data_dir, ".lock"))
+        with self._writing():
+            if not os.path.exists(self.metadata_file):
+                self._store(self.metadata_file, self._initial_metadata())
+            if not os.path.exists(self.index_file):
+                self._store(self.index_file, self._empty_index())
+
+    @contextmanager
+    def _reading(self):
+        """Hold the thread lock and the shared file lock"""
+        with self.lock, self.file_lock.shared():
+            yield
+
+    @contextmanager
+    def _writing(self):
+        """Hold the thread lock and the exclusive file lock"""
+        with self.lock, self.file_lock.exclusive():
+            yield
+
+    @staticmethod
+    def _file_signature(path: str):
+        """Identify a file version by inode, size and modification time"""
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            return None
+        return (st.st_ino, st.st_size, st.st_mtime_ns)
+
+    def _cached(self, path: str):
+        """Parsed file contents, re-read only when the file changed (read-only result)"""
+        signature = self._file_signature(path)
+        cached = self._cache.get(path)
+        if cached is not None and cached[0] == signature:
+            return cached[1]
+        data = _read_file(path)
+        self._cache[path] = (signature, data)
+        return data
+
+    def _store(self, path: str, data):
+        """Write a file and keep the written object as the cached copy"""
+        data_serialization.dump_file(path, data, self.serialization)
+        self._cache[path] = (self._file_signature(path), data)
+
+    def _shard_path(self, name: str) -> str:
+        """Path of a competitor's shard"""
+        return os.path.join(self.competitors_dir, shard_filename(name))
+
+    @staticmethod
+    def _summarize(competitor: dict) -> dict:
+        """Index entry for a competitor: everything the leaderboard needs, no code"""
+        summary = {
+            "name": competitor["name"],
+            "joined_at": competitor.get("joined_at"),
+            "current_problem": competitor.get("current_problem", 1),
+            "last_activity": competitor.get("last_activity", ""),
+            "problems": {}
+        }
+        for key in ("week", "level"):
+            if key in competitor:
+                summary[key] = competitor[key]
+        list_view = competitor_summary(competitor)["problems"]
+        for problem_id, problem_data in competitor.get("problems", {}).items():
+            best = problem_data.get("best_result") or {}
+            summary["problems"][problem_id] = {
+                "submission_count": len(problem_data.get("submissions", [])),
+                "best_passed_tests": best.get("passed_tests", 0),
+                "best_all_passed": best.get("all_passed", False),
+                "judge_approval": problem_data.get("judge_approval"),
+                # As returned by get_competitor_summaries (None if there is no best result)
+                "best_result": list_view[problem_id].get("best_result")
+            }
+        return summary
+
+    @staticmethod
+    def _empty_index() -> dict:
+        """Index with no competitors"""
+        return {"competitors": {}, "by_week": {}, "by_level": {}, "pending": []}
+
+    @staticmethod
+    def _update_secondary_indexes(index: dict, name: str, old: Optional[dict], new: dict):
+        """Move a competitor's entries in the week/level/pending indexes from old to new summary"""
+        for key, field in (("by_week", "week"), ("by_level", "level")):
+            if old is not None and old.get(field) == new.get(field):
+                continue
+            if old is not None and old.get(field) is not None:
+                names = index[key].get(str(old[field]), [])
+                if name in names:
+                    names.remove(name)
+                if not names:
+                    index[key].pop(str(old[field]), None)
+            if new.get(field) is not None:
+                index[key].setdefault(str(new[field]), []).append(name)
+
+        index["pending"] = [entry for entry in index["pending"] if entry[0] != name]
+        for problem_id, problem in new["problems"].items():
+            if problem["best_all_passed"] and problem["judge_approval"] not in ("approved", "rejected"):
+                index["pending"].append([name, problem_id])
+
+    def _save_competitor(self, competitor: dict):
+        """Write a competitor shard and its index entries (caller holds the write lock)"""
+        name = competitor["name"]
+        self._store(self._shard_path(name), competitor)
+        index = _read_file(self.index_file) or self._empty_index()
+        summary = self._summarize(competitor)
+        self._update_secondary_indexes(index, name, index["competitors"].get(name), summary)
+        index["competitors"][name] = summary
+        self._store(self.index_file, index)
+
+    def _index(self) -> dict:
+        """Current index (read-only)"""
+        with self._reading():
+            return self._cached(self.index_file) or self._empty_index()
+
+    def start_competition(self):
+        """Mark competition as started"""
+        with self._writing():
+            metadata = _read_file(self.metadata_file) or self._initial_metadata()
+            metadata["competition_started"] = True
+            metadata["start_time"] = datetime.now().isoformat()
+            self._store(self.metadata_file, metadata)
+
+    def register_competitor(self, name: str, week: int = None, level: int = None) -> bool:
+        """Register a new competitor"""
+        with self._writing():
+            if os.path.exists(self._shard_path(name)):
+                return False  # Competitor already exists
+
+            competitor = {
+                "name": name,
+                "joined_at": datetime.now().isoformat(),
+                "current_problem": 1,
+                "problems": {},
+                "last_activity": datetime.now().isoformat()
+            }
+
+            # Add week and level if provided
+            if week is not None:
+                competitor["week"] = week
+            if level is not None:
+                competitor["level"] = level
+
+            self._save_competitor(competitor)
+        return True
+
+    def update_competitor_problem(self, name: str, problem_id: int):
+        """Update which problem the competitor is currently viewing"""
+        with self._writing():
+            competitor = _read_file(self._shard_path(name))
+            if competitor is not None:
+                competitor["current_problem"] = problem_id
+                competitor["last_activity"] = datetime.now().isoformat()
+                self._save_competitor(competitor)
+
+    def submit_solution(self, name: str, problem_id: int, code: str,
+                       test_results: List[dict], all_passed: bool):
+        """Record a solution submission (rewrites only this competitor's shard)"""
+        submission = {
+            "code": code,
+            "submitted_at": datetime.now().isoformat(),
+            "test_results": test_results,
+            "all_passed": all_passed,
+            "total_tests": len(test_results),
+            "passed_tests": sum(1 for t in test_results if t.get("passed", False))
+        }
+
+        with self._writing():
+            competitor = _read_file(self._shard_path(name))
+            if competitor is None:
+                return False
+
+            problem_key = str(problem_id)
+            problem_data = competitor["problems"].setdefault(problem_key, {
+                "submissions": [],
+                "best_result": None
+            })
+            problem_data["submissions"].append(submission)
+
+            # Update best result if this is better
+            current_best = problem_data["best_result"]
+            if current_best is None or submission["passed_tests"] > current_best.get("passed_tests", 0):
+                problem_data["best_result"] = submission
+
+            competitor["last_activity"] = submission["submitted_at"]
+            self._save_competitor(competitor)
+        return True
+
+    def get_competitor_data(self, name: str) -> Optional[dict]:
+        """Get data for a specific competitor (shared cached copy - do not modify)"""
+        with self._reading():
+            return self._cached(self._shard_path(name))
+
+    def get_all_competitors(self) -> Dict[str, dict]:
+        """Get data for all competitors (reads every shard)"""
+        with self._reading():
+            competitors = {}
+            for name in self._cached(self.index_file)["competitors"]:
+                competitor = self._cached(self._shard_path(name))
+                if competitor is not None:
+                    competitors[name] = competitor
+            return competitors
+
+    def get_competitor_summaries(self) -> Dict[str, dict]:
+        """
+        Competitors without submission code/test output (see competitor_summary),
+        from the summary index
+        """
+        summaries = {}
+        for name, summary in self._index()["competitors"].items():
+            if any("best_result" not in problem for problem in summary["problems"].values()):
+                # Index entry written before it kept best_result: project the shard instead
+                competitor = self.get_competitor_data(name)
+                if competitor is not None:
+                    summaries[name] = competitor_summary(competitor)
+                continue
+            projected = {key: summary[key] for key in ("name", "week", "level", "current_problem", "last_activity")
+                         if key in summary}
+            projected["problems"] = {}
+            for problem_id, problem in summary["problems"].items():
+                projected["problems"][problem_id] = {
+                    "submission_count": problem["submission_count"],
+                    "judge_approval": problem["judge_approval"]
+                }
+                if problem["best_result"]:
+                    projected["problems"][problem_id]["best_result"] = dict(problem["best_result"])
+            summaries[name] = projected
+        return summaries
+
+    def get_leaderboard(self) -> List[dict]:
+        """Generate leaderboard data from the summary index"""
+        leaderboard = []
+
+        for name, summary in self._index()["competitors"].items():
+            problems = summary["problems"].values()
+            solved = [p for p in problems if p["best_all_passed"]]
+
+            leaderboard.append({
+                "name": name,
+                "problems_solved": len(solved),
+                "approved_problems": sum(1 for p in solved if p["judge_approval"] == 'approved'),  # Judge approved count
+                "rejected_problems": sum(1 for p in solved if p["judge_approval"] == 'rejected'),  # Judge rejected count
+                "total_tests_passed": sum(p["best_passed_tests"] for p in problems),
+                "total_submissions": sum(p["submission_count"] for p in problems),
+                "current_problem": summary.get("current_problem", 1),
+                "last_activity": summary.get("last_activity", "")
+            })
+
+        # Sort by approved problems (desc), then by problems solved (desc), then by total tests passed (desc)
+        leaderboard.sort(key=lambda x: (-x["approved_problems"], -x["problems_solved"], -x["total_tests_passed"]))
+        return leaderboard
+
+    def get_problem_statistics(self) -> dict:
+        """Get statistics for each problem from the summary index"""
+        stats = {}
+
+        for summary in self._index()["competitors"].values():
+            for problem_id, problem in summary["problems"].items():
+                problem_stats = stats.setdefault(problem_id, {
+                    "total_attempts": 0,
+                    "total_solvers": 0,
+                    "total_submissions": 0
+                })
+                problem_stats["total_attempts"] += 1
+                problem_stats["total_submissions"] += problem["submission_count"]
+                if problem["best_all_passed"]:
+                    problem_stats["total_solvers"] += 1
+
+        return stats
+
+    def get_competitors_by_week(self, week: int) -> List[str]:
+        """Names of competitors assigned to a week"""
+        return list(self._index()["by_week"].get(str(week), []))
+
+    def get_competitors_by_level(self, level: int) -> List[str]:
+        """Names of competitors assigned to a level"""
+        return list(self._index()["by_level"].get(str(level), []))
+
+    def get_pending_approvals(self) -> List[tuple]:
+        """(name, problem_id) pairs that passed all tests and await judge review"""
+        return [tuple(entry) for entry in self._index()["pending"]]
+
+    def load_data(self) -> dict:
+        """Assemble the whole competition as a single document (same shape as the JSON backend)"""
+        with self._reading():
+            data = dict(self._cached(self.metadata_file) or self._initial_metadata())
+            data["competitors"] = copy.deepcopy(self.get_all_competitors())
+            return data
+
+    def save_data(self, data: dict):
+        """Replace the whole competition with a single document (e.g. imported from the JSON backend)"""
+        with self._writing():
+            for filename in os.listdir(self.competitors_dir):
+                os.remove(os.path.join(self.competitors_dir, filename))
+            self._cache.clear()
+
+            metadata = {key: value for key, value in data.items() if key != "competitors"}
+            self._store(self.metadata_file, metadata)
+
+            index = self._empty_index()
+            for name, competitor in data.get("competitors", {}).items():
+                self._store(self._shard_path(name), competitor)
+                summary = self._summarize(competitor)
+                self._update_secondary_indexes(index, name, None, summary)
+                index["competitors"][name] = summary
+            self._store(self.index_file, index)
+
+    def reset_competition(self):
+        """Reset all competition data"""
+        self.save_data(dict(self._initial_metadata(), competitors={}))
+
+    def set_judge_approval(self, name: str, problem_id: int, status: str):
+        """Set judge approval status for a problem (approved/rejected)"""
+        try:
+            with self._writing():
+                competitor = _read_file(self._shard_path(name))
+                if competitor is None:
+                    print(f"[ERROR] Competitor {name} not found")
+                    return False
+
+                problem_id_str = str(problem_id)
+                problems = competitor.get("problems", {})
+                if problem_id_str not in problems:
+                    print(f"[WARNING] Problem {problem_id_str} not found for {name}. Available: {list(problems.keys())}")
+                    return False
+
+                problems[problem_id_str]["judge_approval"] = status
+                problems[problem_id_str]["judge_approval_time"] = datetime.now().isoformat()
+                self._save_competitor(competitor)
+
+            print(f"[OK] Set judge approval for {name} - Problem {problem_id}: {status}")
+            return True
+        except Exception as e:
+            print(f"[ERROR] Failed to set judge approval: {e}")
+            import traceback
+            traceback.print_exc()
+            return False
+
+    def is_name_taken(self, name: str) -> bool:
+        """Check if a competitor name is already taken"""
+        return name in self._index()["competitors"]
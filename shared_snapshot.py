@@ -0,0 +1,278 @@
+# -*- coding: utf-8 -*-
+"""
+Shared Snapshot
+Read-only leaderboard/summary snapshot in a memory-mapped file, for the
+judge and spectator dashboards of a single-host (local backend) install.
+
+The process that performs writes runs a SnapshotPublisher, which republishes
+the leaderboard, problem statistics and per-competitor summaries after every
+write. Dashboards map the file with a SnapshotReader and only decode the
+payload when the version in the header changes.
+
+The snapshot file sits next to the backend's data (see snapshot_path), and
+its header records the signature of the data files it was built from. A
+reader whose data files no longer match (written by a process without a
+publisher, compacted, or a snapshot left over from another install) gets
+None and queries the backend instead.
+
+File layout (little-endian):
+    magic     8 bytes  b"OJTSNAP2"
+    version   uint64   seqlock counter, odd while a publish is in progress
+    length    uint64   payload length in bytes (0 = no snapshot available)
+    capacity  uint64   payload bytes the file can hold
+    source    uint64   signature of the data files the payload was built from
+    payload   compact JSON
+"""
+import hashlib
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+from datetime import datetime
+from typing import List, Optional
+
+from file_lock import FileLock
+
+
+# Suffix appended to the backend's data file (or directory) to name its snapshot
+SNAPSHOT_SUFFIX = ".snapshot.mmap"
+
+MAGIC = b"OJTSNAP2"
+_HEADER = struct.Struct("<8sQQQQ")
+_VERSION = struct.Struct("<Q")
+_VERSION_OFFSET = 8
+INITIAL_CAPACITY = 1 << 20
+
+
+def source_files(backend) -> List[str]:
+    """Data files of a local backend; any change to them makes a snapshot stale"""
+    if hasattr(backend, "journal_file"):
+        return [backend.data_file, backend.journal_file]
+    if hasattr(backend, "db_file"):
+        return [backend.db_file, backend.db_file + "-wal"]
+    if hasattr(backend, "index_file"):
+        return [backend.index_file, backend.metadata_file]
+    return []
+
+
+def snapshot_path(backend) -> str:
+    """Snapshot file of a local backend, next to its data file or directory"""
+    source = getattr(backend, "data_file", None) or getattr(backend, "db_file", None) or backend.data_dir
+    return os.path.abspath(source).rstrip(os.sep) + SNAPSHOT_SUFFIX
+
+
+def source_signature(backend) -> int:
+    """Signature of the backend's data files (inode, size and modification time of each)"""
+    stats = []
+    for path in source_files(backend):
+        try:
+            st = os.stat(path)
+            stats.append((path, st.st_ino, st.st_size, st.st_mtime_ns))
+        except OSError:
+            stats.append((path, None))
+    digest = hashlib.blake2b(repr(stats).encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "little")
+
+
+def build_snapshot(backend) -> dict:
+    """Collect the data the dashboards poll from a backend"""
+    competitors = {}
+    list_view = getattr(backend, "get_competitor_summaries", backend.get_all_competitors)
+    for name, competitor in list_view().items():
+        pending = []
+        for problem_id, problem_data in competitor.get("problems", {}).items():
+            best_result = problem_data.get("best_result") or {}
+            if best_result.get("all_passed", False) and problem_data.get("judge_approval") not in ("approved", "rejected"):
+                pending.append(problem_id)
+        competitors[name] = {
+            "current_problem": competitor.get("current_problem", 1),
+            "last_activity": competitor.get("last_activity", ""),
+            "week": competitor.get("week"),
+            "level": competitor.get("level"),
+            "pending": pending
+        }
+    return {
+        "published_at": datetime.now().isoformat(),
+        "leaderboard": backend.get_leaderboard(),
+        "statistics": backend.get_problem_statistics(),
+        "competitors": competitors
+    }
+
+
+class SnapshotPublisher:
+    """
+    Publishes snapshots from a background thread. mark_dirty() is cheap and
+    may be called after every write; publishes are coalesced so there is at
+    most one per min_interval seconds. The data files are also checked every
+    check_interval seconds, so changes made without mark_dirty() (journal
+    compaction, other processes) are republished too.
+    """
+
+    def __init__(self, backend, path: str = None, min_interval: float = 0.5,
+                 check_interval: float = 2.0):
+        self.backend = backend
+        self.path = path or snapshot_path(backend)
+        self.min_interval = min_interval
+        self.check_interval = check_interval
+        self.file_lock = FileLock(self.path + ".lock")
+        self.publish_lock = threading.Lock()
+        self._published_source = None
+        self._dirty = threading.Event()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._publish_loop, daemon=True)
+        self._dirty.set()
+        self._thread.start()
+
+    def mark_dirty(self):
+        """Request a publish after a write"""
+        self._dirty.set()
+
+    def _publish_loop(self):
+        while not self._stop.is_set():
+            dirty = self._dirty.wait(self.check_interval)
+            if self._stop.is_set():
+                return
+            self._dirty.clear()
+            if not dirty and source_signature(self.backend) == self._published_source:
+                continue
+            try:
+                self.publish()
+            except Exception as e:
+                print(f"[WARNING] Failed to publish shared snapshot: {e}")
+            self._stop.wait(self.min_interval)
+
+    def close(self):
+        """Stop the background thread and publish the final state synchronously"""
+        self._stop.set()
+        self._dirty.set()
+        self._thread.join(timeout=5)
+        try:
+            self.publish()
+        except Exception as e:
+            print(f"[WARNING] Failed to publish final shared snapshot: {e}")
+
+    def publish(self, snapshot: dict = None):
+        """Write a snapshot into the shared file (seqlock protocol)"""
+        with self.publish_lock:
+            # Taken before reading, so writes during the build make the snapshot stale
+            source = source_signature(self.backend)
+            if snapshot is None:
+                snapshot = build_snapshot(self.backend)
+            self._write(json.dumps(snapshot, ensure_ascii=False, separators=(",", ":")).encode("utf-8"), source)
+            self._published_source = source
+
+    def _write(self, payload: bytes, source: int):
+        """Store a payload and its source signature in the shared file"""
+        # Publishers in different processes take turns; readers never block
+        with self.file_lock.exclusive():
+            fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                size = os.fstat(fd).st_size
+                capacity = max(size - _HEADER.size, 0)
+                if len(payload) > capacity:
+                    new_capacity = max(capacity, INITIAL_CAPACITY)
+                    while new_capacity < len(payload):
+                        new_capacity *= 2
+                    try:
+                        os.ftruncate(fd, _HEADER.size + new_capacity)
+                        size, capacity = _HEADER.size + new_capacity, new_capacity
+                    except OSError as e:
+                        # Windows refuses to resize a file other processes have mapped;
+                        # publish "unavailable" so readers fall back to the backend
+                        print(f"[WARNING] Shared snapshot too large to publish ({len(payload)} bytes): {e}")
+                        payload = b""
+
+                with mmap.mmap(fd, size) as mm:
+                    magic, version, _length, _capacity, _source = _HEADER.unpack_from(mm, 0)
+                    if magic != MAGIC:
+                        version = 0
+                    version += version % 2  # Recover from a publisher that died mid-write
+                    _HEADER.pack_into(mm, 0, MAGIC, version + 1, 0, capacity, 0)
+                    mm[_HEADER.size:_HEADER.size + len(payload)] = payload
+                    _HEADER.pack_into(mm, 0, MAGIC, version + 2, len(payload), capacity, source)
+            finally:
+                os.close(fd)
+
+
+class SnapshotReader:
+    """
+    Maps the shared snapshot of a backend and decodes it only when the
+    version changes. Snapshots not built from the backend's current data
+    files are not returned.
+    """
+
+    def __init__(self, backend, path: str = None):
+        self.backend = backend
+        self.path = path or snapshot_path(backend)
+        self._file = None
+        self._mm = None
+        self._mapped_signature = None
+        self._version = None
+        self._snapshot = None
+
+    def _map(self) -> bool:
+        """(Re)map the file if it appeared, was recreated or grew"""
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return False
+        if st.st_size < _HEADER.size:
+            return False
+        signature = (st.st_ino, st.st_size)
+        if self._mm is None or signature != self._mapped_signature:
+            self.close()
+            self._file = open(self.path, "rb")
+            self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            self._mapped_signature = signature
+            self._version = None
+        return self._mm[:len(MAGIC)] == MAGIC
+
+    def read(self) -> Optional[dict]:
+        """
+        Latest published snapshot, or None if none is available (the caller
+        should then query the data manager). The result is shared between
+        calls and must be treated as read-only.
+        """
+        if not self._map():
+            return None
+        current_source = source_signature(self.backend)
+
+        for _ in range(100):
+            _magic, version, length, _capacity, source = _HEADER.unpack_from(self._mm, 0)
+            if version % 2:
+                time.sleep(0.001)  # Publish in progress
+                continue
+            if source != current_source:
+                return None  # Stale: the data changed since this snapshot was built
+            if version == self._version:
+                return self._snapshot
+            if length == 0:
+                return None
+            if _HEADER.size + length > len(self._mm):
+                # The publisher grew the file
+                if not self._map():
+                    return None
+                continue
+            payload = self._mm[_HEADER.size:_HEADER.size + length]
+            if _VERSION.unpack_from(self._mm, _VERSION_OFFSET)[0] != version:
+                continue  # Overwritten while copying
+            self._snapshot = json.loads(payload.decode("utf-8"))
+            self._version = version
+            return self._snapshot
+        return None
+
+    @property
+    def version(self) -> Optional[int]:
+        """Version of the last snapshot returned by read()"""
+        return self._version
+
+    def close(self):
+        """Unmap the file"""
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
@@ -0,0 +1,333 @@
+# -*- coding: utf-8 -*-
+"""
+Solution Profiler
+Runs a competitor's solution on one test case under cProfile and tracemalloc
+and reports the slowest functions and the biggest allocation sites.
+
+cProfile and tracemalloc are process-wide, and the solution is untrusted, so
+profiling runs one at a time in a dedicated worker process that is killed
+when it exceeds PROFILE_TIMEOUT.
+"""
+import atexit
+import cProfile
+import io
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from typing import List
+
+from code_executor import ProcessPool, TaskTimeout, preload_libraries, run_single_test
+
+# Frames from the harness itself are hidden from the report
+_HARNESS_FILES = (
+    os.path.abspath(__file__),
+    os.path.abspath(sys.modules['code_executor'].__file__),
+    cProfile.__file__,
+    tracemalloc.__file__,
+)
+
+TRACEMALLOC_FRAMES = 10
+
+# Seconds a profiling run (both passes) may take before its worker is killed
+PROFILE_TIMEOUT = 30
+
+# Single worker process: runs are isolated from the app and serialized
+_profile_pool = None
+_profile_pool_lock = threading.Lock()
+
+
+def _is_harness_file(filename: str) -> bool:
+    """Check if a frame belongs to the profiling harness"""
+    if filename.startswith('~') or filename == '<built-in>':
+        return False
+    return os.path.abspath(filename) in _HARNESS_FILES or 'contextlib' in filename
+
+
+def _source_line(code_lines: List[str], filename: str, lineno: int) -> str:
+    """Get the source text for a line of the solution"""
+    if filename == '<solution>' and 0 < lineno <= len(code_lines):
+        return code_lines[lineno - 1].strip()
+    return ''
+
+
+def _format_location(filename: str, lineno: int) -> str:
+    """Shorten a file location for display"""
+    if filename == '<solution>':
+        return f"solution:{lineno}"
+    if filename == '~':
+        return 'built-in'
+    return f"{os.path.basename(filename)}:{lineno}"
+
+
+def _reachable_from_solution(stats: dict) -> list:
+    """Profile entries for solution code and everything it called"""
+    reachable = {key for key in stats if key[0] == '<solution>'}
+    changed = True
+    while changed:
+        changed = False
+        for key, (_cc, _nc, _tt, _ct, callers) in stats.items():
+            if key not in reachable and any(caller in reachable for caller in callers):
+                reachable.add(key)
+                changed = True
+    return list(reachable)
+
+
+def _trace_allocations(code: str, test_case: dict, libraries: dict):
+    """
+    Run the solution under tracemalloc.
+    A snapshot is taken whenever a solution frame returns at a new memory
+    high-water mark, so short-lived temporaries still show up in the report.
+    """
+    best = {'peak': -1, 'snapshot': None}
+
+    def local_trace(frame, event, arg):
+        if event == 'return':
+            current = tracemalloc.get_traced_memory()[0]
+            if current > best['peak']:
+                best['peak'] = current
+                best['snapshot'] = tracemalloc.take_snapshot()
+        return local_trace
+
+    def global_trace(frame, event, arg):
+        if frame.f_code.co_filename == '<solution>':
+            frame.f_trace_lines = False
+            return local_trace
+        return None
+
+    saved_trace = sys.gettrace()
+    tracemalloc.start(TRACEMALLOC_FRAMES)
+    sys.settrace(global_trace)
+    try:
+        run_single_test(code, test_case, 1, libraries)
+    finally:
+        sys.settrace(saved_trace)
+        if best['snapshot'] is None:
+            best['snapshot'] = tracemalloc.take_snapshot()
+        peak_memory = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    snapshot = best['snapshot'].filter_traces([
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+        tracemalloc.Filter(False, '<frozen importlib._bootstrap_external>'),
+    ])
+    return snapshot, peak_memory
+
+
+def _profile_in_process(code: str, test_case: dict, top_n: int, redirect_stdin: bool) -> dict:
+    """Profile a solution in the current process (runs inside the profiling worker)"""
+    # Import libraries first so their import cost is not attributed to the solution
+    libraries = preload_libraries()
+    code_lines = code.splitlines()
+
+    saved_stdin = sys.stdin
+    try:
+        # Pass 1: timings under cProfile
+        if redirect_stdin:
+            sys.stdin = io.StringIO(str(test_case.get('input', '')))
+        profiler = cProfile.Profile()
+        start = time.perf_counter()
+        result = profiler.runcall(run_single_test, code, test_case, 1, libraries)
+        wall_time = time.perf_counter() - start
+
+        # Pass 2: allocations under tracemalloc, snapshotted at the memory high-water mark
+        if redirect_stdin:
+            sys.stdin = io.StringIO(str(test_case.get('input', '')))
+        snapshot, peak_memory = _trace_allocations(code, test_case, libraries)
+    finally:
+        sys.stdin = saved_stdin
+
+    # Top functions by cumulative time, limited to what the solution called
+    stats = pstats.Stats(profiler).stats
+    reachable = _reachable_from_solution(stats)
+    functions = []
+    for key in reachable:
+        filename, lineno, func_name = key
+        _cc, ncalls, tottime, cumtime, _callers = stats[key]
+        functions.append({
+            'function': func_name,
+            'location': _format_location(filename, lineno),
+            'calls': ncalls,
+            'total_time': tottime,
+            'cumulative_time': cumtime,
+            'source': _source_line(code_lines, filename, lineno)
+        })
+    functions.sort(key=lambda f: f['cumulative_time'], reverse=True)
+
+    # Top allocation sites
+    allocations = []
+    for stat in snapshot.statistics('lineno'):
+        frame = stat.traceback[0]
+        if _is_harness_file(frame.filename) or (frame.filename == '<solution>' and frame.lineno == 0):
+            continue
+        allocations.append({
+            'location': _format_location(frame.filename, frame.lineno),
+            'size': stat.size,
+            'count': stat.count,
+            'source': _source_line(code_lines, frame.filename, frame.lineno)
+        })
+        if len(allocations) >= top_n:
+            break
+
+    return {
+        'result': result,
+        'wall_time': wall_time,
+        'peak_memory': peak_memory,
+        'functions': functions[:top_n],
+        'allocations': allocations[:top_n]
+    }
+
+
+def _get_profile_pool() -> ProcessPool:
+    """Get the profiling worker pool, starting it on first use"""
+    global _profile_pool
+    if _profile_pool is None:
+        with _profile_pool_lock:
+            if _profile_pool is None:
+                _profile_pool = ProcessPool(1)
+                atexit.register(_profile_pool.shutdown)
+    return _profile_pool
+
+
+def _failed_report(test_case: dict, error: str, output: str, wall_time: float = 0) -> dict:
+    """Report for a profiling run that produced no profile"""
+    return {
+        'result': {
+            'test_num': 1,
+            'passed': False,
+            'input': str(test_case.get('input', '')),
+            'expected': str(test_case.get('output', '')),
+            'output': output,
+            'error': error
+        },
+        'wall_time': wall_time,
+        'peak_memory': 0,
+        'functions': [],
+        'allocations': []
+    }
+
+
+def profile_solution(code: str, test_case: dict, top_n: int = 15,
+                     redirect_stdin: bool = False, timeout: float = PROFILE_TIMEOUT) -> dict:
+    """
+    Profile a solution on a single test case in the profiling worker process.
+
+    Args:
+        code: Competitor's source code
+        test_case: Dict with 'input' and 'output'
+        top_n: Number of functions and allocation sites to report
+        redirect_stdin: Also feed the test input through sys.stdin
+            (for programs that read sys.stdin directly, as in the desktop app)
+        timeout: Seconds before the run is abandoned and its worker killed
+
+    Returns:
+        dict with the test 'result', 'wall_time' (seconds), 'peak_memory' (bytes),
+        'functions' (by cumulative time) and 'allocations' (by size)
+    """
+    deadline = time.monotonic() + timeout
+    future = _get_profile_pool().submit_call(_profile_in_process, (code, test_case, top_n, redirect_stdin), deadline)
+    try:
+        return future.result()
+    except TaskTimeout:
+        print(f"[WARNING] Profiling stopped after {timeout}s")
+        return _failed_report(test_case, 'Timeout', f"Error: Profiling timeout ({timeout}s)", timeout)
+    except RuntimeError as e:
+        print(f"[ERROR] Profiling failed: {e}")
+        return _failed_report(test_case, str(e), f"Error: {e}")
+
+
+def _format_size(size: int) -> str:
+    """Human-readable byte count"""
+    for unit in ('B', 'KiB', 'MiB'):
+        if abs(size) < 1024:
+            return f"{size:.0f} {unit}" if unit == 'B' else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GiB"
+
+
+def format_report(report: dict) -> str:
+    """Render a profile report as plain text"""
+    result = report['result']
+    lines = [
+        f"Test result: {'PASSED' if result['passed'] else 'FAILED'}",
+        f"Wall time:   {report['wall_time'] * 1000:.1f} ms (profiled)",
+        f"Peak memory: {_format_size(report['peak_memory'])}",
+    ]
+    if result.get('error'):
+        lines.append(f"Error:       {result['error']}")
+
+    lines.append("")
+    lines.append("Top functions by cumulative time")
+    lines.append(f"{'cumulative':>11} {'own':>10} {'calls':>8}  function")
+    for func in report['functions']:
+        lines.append(
+            f"{func['cumulative_time'] * 1000:9.2f}ms {func['total_time'] * 1000:8.2f}ms "
+            f"{func['calls']:>8}  {func['function']} ({func['location']})"
+        )
+        if func['source']:
+            lines.append(f"{'':>31}  {func['source']}")
+
+    lines.append("")
+    lines.append("Top allocation sites")
+    lines.append(f"{'size':>11} {'blocks':>8}  location")
+    for alloc in report['allocations']:
+        lines.append(f"{_format_size(alloc['size']):>11} {alloc['count']:>8}  {alloc['location']}")
+        if alloc['source']:
+            lines.append(f"{'':>21}  {alloc['source']}")
+
+    return "\n".join(lines)
+
+
+def render_streamlit_report(report: dict):
+    """Show a profile report as two tables on a Streamlit page"""
+    import pandas as pd
+    import streamlit as st
+
+    result = report['result']
+    status = "✅ Passed" if result['passed'] else "❌ Failed"
+    st.markdown(
+        f"**{status}** · **Time:** {report['wall_time'] * 1000:.1f} ms · "
+        f"**Peak memory:** {report['peak_memory'] / 1024:.1f} KiB"
+    )
+    if result.get('error'):
+        st.error(f"Error: {result['error']}")
+
+    st.markdown("**Slowest functions (cumulative time)**")
+    if report['functions']:
+        st.dataframe(pd.DataFrame([{
+            'Function': f['function'],
+            'Location': f['location'],
+            'Calls': f['calls'],
+            'Cumulative (ms)': round(f['cumulative_time'] * 1000, 2),
+            'Own (ms)': round(f['total_time'] * 1000, 2),
+            'Code': f['source']
+        } for f in report['functions']]), use_container_width=True, hide_index=True)
+
+    st.markdown("**Biggest allocation sites**")
+    if report['allocations']:
+        st.dataframe(pd.DataFrame([{
+            'Location': a['location'],
+            'Size (KiB)': round(a['size'] / 1024, 1),
+            'Blocks': a['count'],
+            'Code': a['source']
+        } for a in report['allocations']]), use_container_width=True, hide_index=True)
+
+
+def describe_test_case(test_case: dict, index: int, max_length: int = 40) -> str:
+    """Short label for picking a test case to profile"""
+    text = str(test_case.get('input', '')).replace('\n', ' ')
+    if len(text) > max_length:
+        text = text[:max_length - 3] + '...'
+    return f"Test {index + 1}: {text}"
+
+
+if __name__ == "__main__":
+    sample = (
+        "def solution(n):\n"
+        "    values = [i * i for i in range(int(n))]\n"
+        "    return sum(values)\n"
+    )
+    print(format_report(profile_solution(sample, {'input': '200000', 'output': str(sum(i * i for i in range(200000)))})))
@@ -3,6 +3,7 @@
 Spectator Dashboard
 Public-facing leaderboard and competition status display
 """
+import startup_timing
 import tkinter as tk
 from tkinter import ttk, messagebox
 from datetime import datetime
@@ -13,6 +14,8 @@ class SpectatorDashboard:
     def __init__(self, root, data_manager):
         self.root = root
         self.data_manager = data_manager
+        # Memory-mapped leaderboard snapshot (local backends), avoids re-parsing the data file
+        self.snapshot_reader = data_manager.get_snapshot_reader()
         self.root.title("Spectator View - Live Competition")
         # Start maximized to fit window
         self.root.state('zoomed')
@@ -41,8 +44,9 @@ class SpectatorDashboard:
         # Create widgets
         self.create_widgets()
         
-        # Start auto-refresh
-        self.refresh_data()
+        # Start auto-refresh once the window has been painted
+        self._first_refresh = True
+        self.root.after_idle(self.refresh_data)
     
     def configure_styles(self):
         """Configure ttk styles"""
@@ -342,8 +346,21 @@ class SpectatorDashboard:
     
     def refresh_data(self):
         """Refresh all data"""
+        if not self.data_manager.is_ready():
+            # Firebase is still connecting in the background; keep the UI responsive
+            self.last_update_var.set("Connecting to database...")
+            self.refresh_job = self.root.after(100, self.refresh_data)
+            return
+        
         try:
-            leaderboard = self.data_manager.get_leaderboard()
+            snapshot = self.snapshot_reader.read() if self.snapshot_reader else None
+            if snapshot is not None:
+                # Copy so the shared snapshot stays read-only
+                leaderboard = [dict(entry) for entry in snapshot['leaderboard']]
+                stats = snapshot['statistics']
+            else:
+                leaderboard = self.data_manager.get_leaderboard()
+                stats = None
             
             # Update podium (top 3)
             self.update_podium(leaderboard)
@@ -352,7 +369,7 @@ class SpectatorDashboard:
             self.update_leaderboard(leaderboard)
             
             # Update problem statistics
-            self.update_problem_statistics()
+            self.update_problem_statistics(stats)
             
             # Update footer
             self.competitor_count_var.set(f"{len(leaderboard)} competitor{'s' if len(leaderboard) != 1 else ''}")
@@ -363,6 +380,9 @@ class SpectatorDashboard:
             
             # Animate refresh indicator
             self.animate_refresh_indicator()
+            if self._first_refresh:
+                self._first_refresh = False
+                startup_timing.mark("First data shown")
             
         except Exception as e:
             self.last_update_var.set(f"Error: {str(e)}")
@@ -477,9 +497,10 @@ class SpectatorDashboard:
         self.leaderboard_tree.tag_configure("rank2", background='#f0f0f0')
         self.leaderboard_tree.tag_configure("rank3", background='#ffe4cc')
     
-    def update_problem_statistics(self):
+    def update_problem_statistics(self, stats=None):
         """Update problem statistics"""
-        stats = self.data_manager.get_problem_statistics()
+        if stats is None:
+            stats = self.data_manager.get_problem_statistics()
         
         # Cache existing stat items to avoid full recreation (performance optimization)
         if not hasattr(self, '_stat_items_cache'):
@@ -555,6 +576,7 @@ def main():
     root = tk.Tk()
     data_manager = create_data_manager()
     app = SpectatorDashboard(root, data_manager)
+    root.after_idle(startup_timing.mark, "Dashboard window painted")
     root.mainloop()
 
 
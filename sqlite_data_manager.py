@@ -0,0 +1,414 @@
+# -*- coding: utf-8 -*-
+"""
+SQLite Data Manager
+Local competition storage in a normalized SQLite database for single-host deployments.
+Each operation touches only the rows it needs instead of rewriting the whole data file.
+Submitted code is stored once per distinct program in code_blobs and referenced
+from submissions by code_hash (rows written before that keep their inline code).
+"""
+import json
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import code_blobs
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS competition (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+
+CREATE TABLE IF NOT EXISTS competitors (
+    name TEXT PRIMARY KEY,
+    joined_at TEXT,
+    current_problem INTEGER DEFAULT 1,
+    last_activity TEXT,
+    week INTEGER,
+    level INTEGER
+);
+
+CREATE TABLE IF NOT EXISTS submissions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL REFERENCES competitors(name) ON DELETE CASCADE,
+    problem_id TEXT NOT NULL,
+    code TEXT,
+    code_hash TEXT REFERENCES code_blobs(hash),
+    submitted_at TEXT,
+    test_results TEXT,
+    all_passed INTEGER NOT NULL DEFAULT 0,
+    total_tests INTEGER NOT NULL DEFAULT 0,
+    passed_tests INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS code_blobs (
+    hash TEXT PRIMARY KEY,
+    code TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS problem_progress (
+    name TEXT NOT NULL REFERENCES competitors(name) ON DELETE CASCADE,
+    problem_id TEXT NOT NULL,
+    best_submission_id INTEGER REFERENCES submissions(id),
+    best_passed_tests INTEGER NOT NULL DEFAULT 0,
+    submission_count INTEGER NOT NULL DEFAULT 0,
+    judge_approval TEXT DEFAULT 'pending',
+    judge_approval_time TEXT,
+    PRIMARY KEY (name, problem_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_submissions_name_problem ON submissions(name, problem_id);
+CREATE INDEX IF NOT EXISTS idx_progress_approval ON problem_progress(judge_approval);
+CREATE INDEX IF NOT EXISTS idx_competitors_week ON competitors(week);
+CREATE INDEX IF NOT EXISTS idx_competitors_level ON competitors(level);
+"""
+
+
+class SqliteDataManager:
+    """Manages competition data in a local SQLite database (WAL mode)"""
+
+    def __init__(self, db_file="competition_data.db"):
+        self.db_file = db_file
+        self._local = threading.local()
+        self.initialize_data()
+
+    def _connection(self) -> sqlite3.Connection:
+        """Get this thread's connection (sqlite3 connections are not shared across threads)"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_file, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA foreign_keys=ON")
+            self._local.conn = conn
+        return conn
+
+    def _transaction(self):
+        """Context manager for a write transaction"""
+        return _Transaction(self._connection())
+
+    def initialize_data(self):
+        """Create tables and competition metadata if they don't exist"""
+        conn = self._connection()
+        conn.executescript(SCHEMA)
+        # Databases created before code blobs have no code_hash column
+        columns = {row["name"] for row in conn.execute("PRAGMA table_info(submissions)")}
+        if "code_hash" not in columns:
+            conn.execute("ALTER TABLE submissions ADD COLUMN code_hash TEXT REFERENCES code_blobs(hash)")
+        with self._transaction() as cur:
+            for key, value in (("competition_started", False), ("start_time", None), ("problems_loaded", [])):
+                cur.execute("INSERT OR IGNORE INTO competition (key, value) VALUES (?, ?)",
+                            (key, json.dumps(value)))
+
+    def _get_meta(self, key: str):
+        """Read a competition metadata value"""
+        row = self._connection().execute("SELECT value FROM competition WHERE key = ?", (key,)).fetchone()
+        return json.loads(row["value"]) if row else None
+
+    def start_competition(self):
+        """Mark competition as started"""
+        with self._transaction() as cur:
+            cur.execute("UPDATE competition SET value = ? WHERE key = 'competition_started'", (json.dumps(True),))
+            cur.execute("UPDATE competition SET value = ? WHERE key = 'start_time'",
+                        (json.dumps(datetime.now().isoformat()),))
+
+    def register_competitor(self, name: str, week: int = None, level: int = None) -> bool:
+        """Register a new competitor"""
+        now = datetime.now().isoformat()
+        with self._transaction() as cur:
+            cur.execute(
+                "INSERT OR IGNORE INTO competitors (name, joined_at, current_problem, last_activity, week, level) "
+                "VALUES (?, ?, 1, ?, ?, ?)",
+                (name, now, now, week, level)
+            )
+            return cur.rowcount == 1
+
+    def update_competitor_problem(self, name: str, problem_id: int):
+        """Update which problem the competitor is currently viewing"""
+        with self._transaction() as cur:
+            cur.execute("UPDATE competitors SET current_problem = ?, last_activity = ? WHERE name = ?",
+                        (problem_id, datetime.now().isoformat(), name))
+
+    def submit_solution(self, name: str, problem_id: int, code: str,
+                       test_results: List[dict], all_passed: bool):
+        """Record a solution submission"""
+        now = datetime.now().isoformat()
+        passed_tests = sum(1 for t in test_results if t.get("passed", False))
+        problem_key = str(problem_id)
+        digest = code_blobs.code_hash(code)
+
+        with self._transaction() as cur:
+            if cur.execute("SELECT 1 FROM competitors WHERE name = ?", (name,)).fetchone() is None:
+                return False
+
+            cur.execute("INSERT OR IGNORE INTO code_blobs (hash, code) VALUES (?, ?)", (digest, code or ""))
+            cur.execute(
+                "INSERT INTO submissions (name, problem_id, code_hash, submitted_at, test_results, "
+                "all_passed, total_tests, passed_tests) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (name, problem_key, digest, now, json.dumps(test_results, ensure_ascii=False),
+                 int(bool(all_passed)), len(test_results), passed_tests)
+            )
+            submission_id = cur.lastrowid
+
+            # Keep the best result (most tests passed, first one wins ties)
+            cur.execute(
+                "INSERT INTO problem_progress (name, problem_id, best_submission_id, best_passed_tests, submission_count) "
+                "VALUES (?, ?, ?, ?, 1) "
+                "ON CONFLICT (name, problem_id) DO UPDATE SET "
+                "  submission_count = problem_progress.submission_count + 1, "
+                "  best_submission_id = CASE WHEN problem_progress.best_submission_id IS NULL "
+                "      OR excluded.best_passed_tests > problem_progress.best_passed_tests "
+                "      THEN excluded.best_submission_id ELSE problem_progress.best_submission_id END, "
+                "  best_passed_tests = MAX(problem_progress.best_passed_tests, excluded.best_passed_tests)",
+                (name, problem_key, submission_id, passed_tests)
+            )
+
+            cur.execute("UPDATE competitors SET last_activity = ? WHERE name = ?", (now, name))
+        return True
+
+    @staticmethod
+    def _submission_from_row(row: sqlite3.Row, blobs: Dict[str, str]) -> dict:
+        """Convert a submissions row to the submission dict used by all backends"""
+        code = row["code"] if row["code"] is not None else blobs.get(row["code_hash"], "")
+        return {
+            "code": code,
+            "code_hash": row["code_hash"] or code_blobs.code_hash(code),
+            "submitted_at": row["submitted_at"],
+            "test_results": json.loads(row["test_results"]) if row["test_results"] else [],
+            "all_passed": bool(row["all_passed"]),
+            "total_tests": row["total_tests"],
+            "passed_tests": row["passed_tests"]
+        }
+
+    @staticmethod
+    def _competitor_from_row(row: sqlite3.Row) -> dict:
+        """Convert a competitors row to the competitor dict used by all backends"""
+        competitor = {
+            "name": row["name"],
+            "joined_at": row["joined_at"],
+            "current_problem": row["current_problem"],
+            "problems": {},
+            "last_activity": row["last_activity"]
+        }
+        if row["week"] is not None:
+            competitor["week"] = row["week"]
+        if row["level"] is not None:
+            competitor["level"] = row["level"]
+        return competitor
+
+    def _load_competitors(self, name: Optional[str] = None) -> Dict[str, dict]:
+        """Assemble full competitor documents (optionally for a single competitor)"""
+        conn = self._connection()
+        where = " WHERE name = ?" if name is not None else ""
+        params = (name,) if name is not None else ()
+
+        competitors = {}
+        for row in conn.execute(f"SELECT * FROM competitors{where} ORDER BY rowid", params):
+            competitors[row["name"]] = self._competitor_from_row(row)
+
+        best_ids = {}
+        for row in conn.execute(f"SELECT * FROM problem_progress{where}", params):
+            competitor = competitors.get(row["name"])
+            if competitor is None:
+                continue
+            competitor["problems"][row["problem_id"]] = {
+                "submissions": [],
+                "best_result": None,
+                "judge_approval": row["judge_approval"],
+                "judge_approval_time": row["judge_approval_time"]
+            }
+            best_ids[row["best_submission_id"]] = (row["name"], row["problem_id"])
+
+        # Each distinct program is read once, however often it was submitted
+        blobs = {
+            row["hash"]: row["code"] for row in conn.execute(
+                f"SELECT hash, code FROM code_blobs WHERE hash IN (SELECT code_hash FROM submissions{where})", params)
+        }
+        for row in conn.execute(f"SELECT * FROM submissions{where} ORDER BY id", params):
+            competitor = competitors.get(row["name"])
+            if competitor is None or row["problem_id"] not in competitor["problems"]:
+                continue
+            problem = competitor["problems"][row["problem_id"]]
+            submission = self._submission_from_row(row, blobs)
+            problem["submissions"].append(submission)
+            if row["id"] in best_ids:
+                problem["best_result"] = submission
+
+        return competitors
+
+    def get_competitor_data(self, name: str) -> Optional[dict]:
+        """Get data for a specific competitor"""
+        return self._load_competitors(name).get(name)
+
+    def get_all_competitors(self) -> Dict[str, dict]:
+        """Get data for all competitors"""
+        return self._load_competitors()
+
+    def get_competitor_summaries(self) -> Dict[str, dict]:
+        """Competitors without submission code/test output (never reads those columns)"""
+        conn = self._connection()
+        summaries = {}
+        for row in conn.execute("SELECT * FROM competitors ORDER BY rowid"):
+            summary = self._competitor_from_row(row)
+            del summary["joined_at"]
+            summaries[row["name"]] = summary
+
+        rows = conn.execute("""
+            SELECT p.name, p.problem_id, p.submission_count, p.judge_approval,
+                   b.id AS best_id, b.all_passed, b.passed_tests, b.total_tests
+            FROM problem_progress p
+            LEFT JOIN submissions b ON b.id = p.best_submission_id
+        """)
+        for row in rows:
+            summary = summaries.get(row["name"])
+            if summary is None:
+                continue
+            problem = {
+                "submission_count": row["submission_count"],
+                "judge_approval": row["judge_approval"]
+            }
+            if row["best_id"] is not None:
+                problem["best_result"] = {
+                    "all_passed": bool(row["all_passed"]),
+                    "passed_tests": row["passed_tests"],
+                    "total_tests": row["total_tests"]
+                }
+            summary["problems"][row["problem_id"]] = problem
+        return summaries
+
+    def get_leaderboard(self) -> List[dict]:
+        """Generate leaderboard data"""
+        rows = self._connection().execute("""
+            SELECT c.name, c.current_problem, c.last_activity,
+                   COALESCE(SUM(b.all_passed), 0) AS problems_solved,
+                   COALESCE(SUM(CASE WHEN b.all_passed = 1 AND p.judge_approval = 'approved' THEN 1 ELSE 0 END), 0)
+                       AS approved_problems,
+                   COALESCE(SUM(CASE WHEN b.all_passed = 1 AND p.judge_approval = 'rejected' THEN 1 ELSE 0 END), 0)
+                       AS rejected_problems,
+                   COALESCE(SUM(b.passed_tests), 0) AS total_tests_passed,
+                   COALESCE(SUM(p.submission_count), 0) AS total_submissions
+            FROM competitors c
+            LEFT JOIN problem_progress p ON p.name = c.name
+            LEFT JOIN submissions b ON b.id = p.best_submission_id
+            GROUP BY c.name
+            ORDER BY approved_problems DESC, problems_solved DESC, total_tests_passed DESC, c.rowid
+        """).fetchall()
+
+        return [{
+            "name": row["name"],
+            "problems_solved": row["problems_solved"],
+            "approved_problems": row["approved_problems"],  # Judge approved count
+            "rejected_problems": row["rejected_problems"],  # Judge rejected count
+            "total_tests_passed": row["total_tests_passed"],
+            "total_submissions": row["total_submissions"],
+            "current_problem": row["current_problem"] if row["current_problem"] is not None else 1,
+            "last_activity": row["last_activity"] or ""
+        } for row in rows]
+
+    def get_problem_statistics(self) -> dict:
+        """Get statistics for each problem"""
+        rows = self._connection().execute("""
+            SELECT p.problem_id,
+                   COUNT(*) AS total_attempts,
+                   COALESCE(SUM(b.all_passed), 0) AS total_solvers,
+                   COALESCE(SUM(p.submission_count), 0) AS total_submissions
+            FROM problem_progress p
+            LEFT JOIN submissions b ON b.id = p.best_submission_id
+            GROUP BY p.problem_id
+        """).fetchall()
+
+        return {
+            row["problem_id"]: {
+                "total_attempts": row["total_attempts"],
+                "total_solvers": row["total_solvers"],
+                "total_submissions": row["total_submissions"]
+            }
+            for row in rows
+        }
+
+    def get_competitors_by_week(self, week: int) -> List[str]:
+        """Names of competitors assigned to a week"""
+        rows = self._connection().execute("SELECT name FROM competitors WHERE week = ? ORDER BY rowid", (week,))
+        return [row["name"] for row in rows]
+
+    def get_competitors_by_level(self, level: int) -> List[str]:
+        """Names of competitors assigned to a level"""
+        rows = self._connection().execute("SELECT name FROM competitors WHERE level = ? ORDER BY rowid", (level,))
+        return [row["name"] for row in rows]
+
+    def get_pending_approvals(self) -> List[tuple]:
+        """(name, problem_id) pairs that passed all tests and await judge review"""
+        rows = self._connection().execute("""
+            SELECT p.name, p.problem_id
+            FROM problem_progress p
+            JOIN submissions b ON b.id = p.best_submission_id
+            WHERE b.all_passed = 1
+              AND (p.judge_approval IS NULL OR p.judge_approval NOT IN ('approved', 'rejected'))
+            ORDER BY p.name, p.problem_id
+        """)
+        return [(row["name"], row["problem_id"]) for row in rows]
+
+    def reset_competition(self):
+        """Reset all competition data"""
+        with self._transaction() as cur:
+            cur.execute("DELETE FROM problem_progress")
+            cur.execute("DELETE FROM submissions")
+            cur.execute("DELETE FROM code_blobs")
+            cur.execute("DELETE FROM competitors")
+            cur.execute("DELETE FROM competition")
+        self.initialize_data()
+
+    def set_judge_approval(self, name: str, problem_id: int, status: str):
+        """Set judge approval status for a problem (approved/rejected)"""
+        try:
+            with self._transaction() as cur:
+                cur.execute(
+                    "UPDATE problem_progress SET judge_approval = ?, judge_approval_time = ? "
+                    "WHERE name = ? AND problem_id = ?",
+                    (status, datetime.now().isoformat(), name, str(problem_id))
+                )
+                updated = cur.rowcount == 1
+
+            if not updated:
+                if not self.is_name_taken(name):
+                    print(f"[ERROR] Competitor {name} not found")
+                else:
+                    print(f"[WARNING] Problem {problem_id} not found for {name}")
+                return False
+
+            print(f"[OK] Set judge approval for {name} - Problem {problem_id}: {status}")
+            return True
+        except Exception as e:
+            print(f"[ERROR] Failed to set judge approval: {e}")
+            import traceback
+            traceback.print_exc()
+            return False
+
+    def is_name_taken(self, name: str) -> bool:
+        """Check if a competitor name is already taken"""
+        row = self._connection().execute("SELECT 1 FROM competitors WHERE name = ?", (name,)).fetchone()
+        return row is not None
+
+
+class _Transaction:
+    """BEGIN IMMEDIATE ... COMMIT/ROLLBACK around a block, yielding a cursor"""
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+        self.cursor = None
+
+    def __enter__(self) -> sqlite3.Cursor:
+        self.cursor = self.conn.cursor()
+        self.cursor.execute("BEGIN IMMEDIATE")
+        return self.cursor
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.conn.execute("COMMIT")
+        else:
+            self.conn.execute("ROLLBACK")
+        self.cursor.close()
+        return False
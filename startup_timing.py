@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+"""
+Startup Timing
+Milestones of application startup (backend selected, window painted,
+Firebase connected, first data shown), in milliseconds since this module
+was first imported. The entry points import it first, so that is roughly
+process start.
+
+Set COMPETITION_STARTUP_TIMING=1 to print the report, e.g.:
+    COMPETITION_STARTUP_TIMING=1 python launcher.py
+"""
+import os
+import threading
+import time
+from typing import List, Tuple
+
+# Environment variable enabling the printed report
+STARTUP_TIMING_ENV = "COMPETITION_STARTUP_TIMING"
+
+_START = time.perf_counter()
+_marks = []
+_lock = threading.Lock()
+
+
+def mark(label: str):
+    """Record a milestone (printed right away when the report is enabled)"""
+    elapsed = (time.perf_counter() - _START) * 1000
+    with _lock:
+        _marks.append((label, elapsed))
+    if os.environ.get(STARTUP_TIMING_ENV) == "1":
+        print(f"[TIMING] {elapsed:8.1f} ms  {label}")
+
+
+def marks() -> List[Tuple[str, float]]:
+    """(label, ms since start) of every milestone so far"""
+    with _lock:
+        return list(_marks)
+
+
+def report() -> str:
+    """Milestones as a printable table"""
+    lines = ["Startup timing (ms since start):"]
+    lines += [f"  {elapsed:8.1f}  {label}" for label, elapsed in marks()]
+    return "\n".join(lines)
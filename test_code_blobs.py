@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+"""
+Test content-addressed code storage in the local backends
+Resubmitted code is stored once and read back on every submission
+"""
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+
+from competition_data_manager import CompetitionDataManager
+from sqlite_data_manager import SqliteDataManager
+
+CODE = "def solve(n):\n    return sum(range(n))\n" * 20
+
+
+def _submit_twice(dm):
+    dm.register_competitor("Alice")
+    dm.submit_solution("Alice", 1, CODE, [{"passed": True}], True)
+    dm.submit_solution("Alice", 1, CODE, [{"passed": True}], True)
+
+
+def test_json_backend_stores_code_once():
+    """The snapshot holds one blob, submissions and the best result reference it"""
+    temp_dir = tempfile.mkdtemp()
+    try:
+        data_file = os.path.join(temp_dir, "competition_data.json")
+        dm = CompetitionDataManager(data_file, compact_interval=0)
+        _submit_twice(dm)
+        dm.compact()
+
+        with open(data_file, encoding="utf-8") as f:
+            raw = f.read()
+        assert raw.count("return sum(range(n))") == 20
+        stored = json.loads(raw)
+        assert len(stored["code_blobs"]) == 1
+
+        reader = CompetitionDataManager(data_file, compact_interval=0)
+        problem = reader.get_competitor_data("Alice")["problems"]["1"]
+        assert [s["code"] for s in problem["submissions"]] == [CODE, CODE]
+        assert problem["best_result"]["code"] == CODE
+
+        # Snapshots written before code blobs (inline code) still load
+        stored = json.loads(raw)
+        problem = stored["competitors"]["Alice"]["problems"]["1"]
+        for submission in problem["submissions"] + [problem["best_result"]]:
+            submission["code"] = stored["code_blobs"][submission.pop("code_hash")]
+        del stored["code_blobs"]
+        with open(data_file, "w", encoding="utf-8") as f:
+            json.dump(stored, f)
+        legacy = CompetitionDataManager(data_file, compact_interval=0)
+        assert legacy.get_competitor_data("Alice")["problems"]["1"]["best_result"]["code"] == CODE
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+def test_sqlite_backend_stores_code_once():
+    """One code_blobs row for repeated submissions of the same code"""
+    temp_dir = tempfile.mkdtemp()
+    try:
+        db_file = os.path.join(temp_dir, "competition_data.db")
+        dm = SqliteDataManager(db_file)
+        _submit_twice(dm)
+
+        conn = sqlite3.connect(db_file)
+        assert conn.execute("SELECT COUNT(*) FROM code_blobs").fetchone()[0] == 1
+        assert conn.execute("SELECT COUNT(*) FROM submissions WHERE code IS NULL").fetchone()[0] == 2
+        conn.close()
+
+        problem = dm.get_competitor_data("Alice")["problems"]["1"]
+        assert [s["code"] for s in problem["submissions"]] == [CODE, CODE]
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    test_json_backend_stores_code_once()
+    test_sqlite_backend_stores_code_once()
+    print("✅ Submitted code is stored once")
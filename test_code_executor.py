@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+"""
+Test that a submission stuck in an infinite loop does not block later ones
+"""
+from code_executor import CodeExecutor
+from solution_profiler import profile_solution
+
+TESTS = [{'input': '3', 'output': '9'}, {'input': '4', 'output': '16'}]
+
+
+def test_timed_out_workers_are_replaced():
+    """Infinite loops time out, then a valid submission still passes"""
+    executor = CodeExecutor(workers=2, engine='process')
+    try:
+        stuck = executor.run_code_with_tests("while True:\n    pass\n", TESTS, timeout=1)
+        assert [r['error'] for r in stuck] == ['Timeout', 'Timeout']
+
+        results = executor.run_code_with_tests("n = int(input())\nprint(n * n)\n", TESTS, timeout=10)
+        assert all(r['passed'] for r in results), results
+    finally:
+        executor.shutdown()
+    assert not any(process.process.is_alive() for process in executor.pool.processes)
+
+
+
+def test_profiling_times_out():
+    """A runaway solution stops the profiler at its timeout, and the next run still works"""
+    report = profile_solution("while True:\n    pass\n", TESTS[0], timeout=1)
+    assert report['result']['error'] == 'Timeout'
+
+    report = profile_solution("n = int(input())\nprint(n * n)\n", TESTS[0])
+    assert report['result']['passed'], report['result']
+    assert report['functions']
+
+
+if __name__ == "__main__":
+    test_timed_out_workers_are_replaced()
+    test_profiling_times_out()
+    print("✅ Timed-out workers are replaced")
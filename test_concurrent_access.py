@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+"""
+Test concurrent access to the JSON backend from several processes
+(the launcher runs competitor, judge and spectator as separate processes)
+"""
+import multiprocessing
+import os
+import shutil
+import tempfile
+
+from competition_data_manager import CompetitionDataManager
+
+SUBMISSIONS_PER_WRITER = 20
+
+
+def _writer(data_file, name):
+    dm = CompetitionDataManager(data_file, compact_interval=0.05)
+    dm.register_competitor(name)
+    for i in range(SUBMISSIONS_PER_WRITER):
+        dm.submit_solution(name, 1, f"print({i})", [{"passed": True}], True)
+        if i % 5 == 0:
+            dm.update_competitor_problem(name, i)
+    dm.close()
+
+
+def _reader(data_file, rounds):
+    dm = CompetitionDataManager(data_file, compact_interval=0)
+    for _ in range(rounds):
+        dm.get_leaderboard()
+        dm.get_all_competitors()
+
+
+def test_parallel_processes_keep_every_write():
+    """Writers in separate processes never lose or tear each other's updates"""
+    temp_dir = tempfile.mkdtemp()
+    try:
+        data_file = os.path.join(temp_dir, "competition_data.json")
+        CompetitionDataManager(data_file, compact_interval=0)
+
+        names = [f"Competitor {i}" for i in range(4)]
+        processes = [multiprocessing.Process(target=_writer, args=(data_file, name)) for name in names]
+        processes += [multiprocessing.Process(target=_reader, args=(data_file, 50)) for _ in range(2)]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join(60)
+            assert process.exitcode == 0
+
+        competitors = CompetitionDataManager(data_file, compact_interval=0).get_all_competitors()
+        assert sorted(competitors) == names
+        for name in names:
+            submissions = competitors[name]["problems"]["1"]["submissions"]
+            assert len(submissions) == SUBMISSIONS_PER_WRITER
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    test_parallel_processes_keep_every_write()
+    print("✅ Concurrent writers kept every update")
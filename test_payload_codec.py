@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+"""
+Test transparent compression of large submission payloads
+"""
+import json
+import os
+import shutil
+import tempfile
+
+import payload_codec
+from competition_data_manager import CompetitionDataManager
+
+
+def _long_results(cases=20):
+    """test_results of a harder problem: long inputs repeated in every case"""
+    return [{"test": f"Test {i}", "input": " ".join(str(n) for n in range(300)),
+             "expected": "44850", "output": "44850", "passed": True} for i in range(cases)]
+
+
+def test_large_payloads_are_compressed_and_decoded_on_access():
+    """Large fields are stored compressed, small ones as-is, and read back unchanged"""
+    results = _long_results()
+    record = payload_codec.encode_record({"code": "print(1)", "test_results": results})
+    assert dict.__getitem__(record, "code") == "print(1)"
+    assert payload_codec.is_encoded(dict.__getitem__(record, "test_results"))
+    assert record["test_results"] == results and record.get("test_results") == results
+
+    temp_dir = tempfile.mkdtemp()
+    try:
+        data_file = os.path.join(temp_dir, "competition_data.json")
+        dm = CompetitionDataManager(data_file, compact_interval=0)
+        dm.register_competitor("Alice")
+        dm.submit_solution("Alice", 1, "print(1)", results, True)
+        dm.compact()
+
+        with open(data_file, encoding="utf-8") as f:
+            raw = f.read()
+        assert "$codec" in raw
+        assert len(raw) < len(json.dumps(results)) / 4
+
+        reader = CompetitionDataManager(data_file, compact_interval=0)
+        submission = reader.get_competitor_data("Alice")["problems"]["1"]["submissions"][0]
+        assert submission["test_results"] == results
+        assert submission["code"] == "print(1)"
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    test_large_payloads_are_compressed_and_decoded_on_access()
+    print("✅ Large payloads are compressed transparently")
@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+"""
+Test the sharded directory backend against the JSON backend
+"""
+import os
+import shutil
+import tempfile
+
+from competition_data_manager import CompetitionDataManager
+from sharded_data_manager import ShardedDataManager
+from test_sqlite_data_manager import _populate, _strip_volatile
+
+
+def test_sharded_matches_json_backend():
+    """Sharded and JSON backends should agree on every read"""
+    temp_dir = tempfile.mkdtemp()
+    try:
+        json_dm = CompetitionDataManager(os.path.join(temp_dir, "competition_data.json"))
+        sharded_dm = ShardedDataManager(os.path.join(temp_dir, "competition_data"))
+
+        _populate(json_dm)
+        _populate(sharded_dm)
+
+        assert _strip_volatile(sharded_dm.get_leaderboard()) == _strip_volatile(json_dm.get_leaderboard())
+        assert sharded_dm.get_problem_statistics() == json_dm.get_problem_statistics()
+        assert set(sharded_dm.get_all_competitors()) == {"Alice", "Bob", "Carol"}
+        # Same list-view shape as competitor_summary (timestamps aside)
+        summaries = [{name: dict(summary, last_activity=None) for name, summary in dm.get_competitor_summaries().items()}
+                     for dm in (sharded_dm, json_dm)]
+        assert summaries[0] == summaries[1]
+
+        # One file per competitor
+        shards = os.listdir(os.path.join(temp_dir, "competition_data", "competitors"))
+        assert len(shards) == 3
+
+        alice = sharded_dm.get_competitor_data("Alice")
+        problem = alice["problems"]["1"]
+        assert [s["code"] for s in problem["submissions"]] == ["print(1)", "print(2)", "print(3)"]
+        assert problem["best_result"]["code"] == "print(2)"
+        assert problem["judge_approval"] == "approved"
+
+        # A second instance (another process) sees the same data
+        other = ShardedDataManager(os.path.join(temp_dir, "competition_data"))
+        assert other.get_leaderboard() == sharded_dm.get_leaderboard()
+
+        assert sharded_dm.is_name_taken("Carol")
+        assert not sharded_dm.register_competitor("Carol")
+        assert not sharded_dm.submit_solution("Nobody", 1, "", [], False)
+        assert not sharded_dm.set_judge_approval("Carol", 1, "approved")
+
+        # Round trip through the single-document format
+        sharded_dm.save_data(json_dm.load_data())
+        assert _strip_volatile(sharded_dm.get_leaderboard()) == _strip_volatile(json_dm.get_leaderboard())
+
+        sharded_dm.reset_competition()
+        assert other.get_all_competitors() == {}
+        assert other.get_leaderboard() == []
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    test_sharded_matches_json_backend()
+    print("✅ Sharded backend matches JSON backend")
@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+"""
+Test the memory-mapped dashboard snapshot
+"""
+import os
+import shutil
+import tempfile
+
+from competition_data_manager import CompetitionDataManager
+from data_manager import DataManager
+from shared_snapshot import SnapshotPublisher, SnapshotReader, build_snapshot, snapshot_path
+
+
+def test_reader_sees_published_versions():
+    """Readers decode a snapshot once per published version"""
+    temp_dir = tempfile.mkdtemp()
+    try:
+        dm = CompetitionDataManager(os.path.join(temp_dir, "competition_data.json"), compact_interval=0)
+        path = os.path.join(temp_dir, "snapshot.mmap")
+        publisher = SnapshotPublisher(dm, path, min_interval=60)
+        reader = SnapshotReader(dm, path)
+
+        dm.register_competitor("Alice")
+        dm.submit_solution("Alice", 1, "print(1)", [{"passed": True}], True)
+        publisher.publish()
+
+        snapshot = reader.read()
+        assert snapshot["leaderboard"][0]["name"] == "Alice"
+        assert snapshot["competitors"]["Alice"]["pending"] == ["1"]
+        assert snapshot["statistics"]["1"]["total_solvers"] == 1
+        assert reader.read() is snapshot  # Unchanged version, no re-parse
+
+        # Payloads larger than the initial capacity grow the file
+        big = build_snapshot(dm)
+        big["padding"] = "x" * (3 << 20)
+        publisher.publish(big)
+        assert len(reader.read()["padding"]) == 3 << 20
+        reader.close()
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+def test_stale_snapshots_are_not_returned():
+    """A snapshot is ignored once the data changes, until the next publish"""
+    temp_dir = tempfile.mkdtemp()
+    cwd = os.getcwd()
+    try:
+        os.chdir(temp_dir)
+        manager = DataManager(local_backend="json")
+        manager.register_competitor("Alice")
+        manager.close()  # Publishes synchronously
+        assert os.path.exists(snapshot_path(manager.backend))
+
+        reader = manager.get_snapshot_reader()
+        assert list(reader.read()["competitors"]) == ["Alice"]
+
+        # Written by a process without a publisher
+        other = CompetitionDataManager("competition_data.json", compact_interval=0)
+        other.register_competitor("Bob")
+        assert reader.read() is None
+
+        # A snapshot built for another data file is never used
+        SnapshotPublisher(other, snapshot_path(manager.backend), min_interval=60).close()
+        assert list(reader.read()["competitors"]) == ["Alice", "Bob"]
+        assert SnapshotReader(CompetitionDataManager("other.json", compact_interval=0),
+                              snapshot_path(manager.backend)).read() is None
+        reader.close()
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    test_reader_sees_published_versions()
+    test_stale_snapshots_are_not_returned()
+    print("✅ Shared snapshot readers see every published version")
@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+"""
+Test the SQLite backend against the JSON backend
+Both should return the same competitor, leaderboard and statistics data
+"""
+import os
+import shutil
+import tempfile
+
+from competition_data_manager import CompetitionDataManager
+from sqlite_data_manager import SqliteDataManager
+
+
+def _populate(dm):
+    """Run the same sequence of operations on a backend"""
+    dm.register_competitor("Alice")
+    dm.register_competitor("Bob")
+    dm.register_competitor("Carol")
+    dm.update_competitor_problem("Bob", 3)
+
+    failing = [{"test": "Test 1", "passed": True}, {"test": "Test 2", "passed": False}]
+    passing = [{"test": "Test 1", "passed": True}, {"test": "Test 2", "passed": True}]
+
+    dm.submit_solution("Alice", 1, "print(1)", failing, False)
+    dm.submit_solution("Alice", 1, "print(2)", passing, True)
+    dm.submit_solution("Alice", 1, "print(3)", passing, True)
+    dm.submit_solution("Alice", 2, "print('a')", passing, True)
+    dm.submit_solution("Bob", 1, "print('b')", passing, True)
+    dm.submit_solution("Carol", 2, "print('c')", failing, False)
+
+    dm.set_judge_approval("Alice", 1, "approved")
+    dm.set_judge_approval("Bob", 1, "rejected")
+
+
+def _strip_volatile(leaderboard):
+    """Drop timestamp fields that differ between runs"""
+    return [{k: v for k, v in entry.items() if k != "last_activity"} for entry in leaderboard]
+
+
+def test_sqlite_matches_json_backend():
+    """SQLite and JSON backends should agree on every read"""
+    temp_dir = tempfile.mkdtemp()
+    try:
+        json_dm = CompetitionDataManager(os.path.join(temp_dir, "competition_data.json"))
+        sqlite_dm = SqliteDataManager(os.path.join(temp_dir, "competition_data.db"))
+
+        _populate(json_dm)
+        _populate(sqlite_dm)
+
+        assert _strip_volatile(sqlite_dm.get_leaderboard()) == _strip_volatile(json_dm.get_leaderboard())
+        assert sqlite_dm.get_problem_statistics() == json_dm.get_problem_statistics()
+
+        alice = sqlite_dm.get_competitor_data("Alice")
+        expected = json_dm.get_competitor_data("Alice")
+        assert set(alice["problems"]) == set(expected["problems"])
+        problem = alice["problems"]["1"]
+        assert [s["code"] for s in problem["submissions"]] == ["print(1)", "print(2)", "print(3)"]
+        assert problem["best_result"]["code"] == "print(2)"
+        assert problem["judge_approval"] == "approved"
+
+        assert sqlite_dm.is_name_taken("Carol")
+        assert not sqlite_dm.register_competitor("Carol")
+        assert not sqlite_dm.submit_solution("Nobody", 1, "", [], False)
+        assert not sqlite_dm.set_judge_approval("Carol", 1, "approved")
+
+        sqlite_dm.reset_competition()
+        assert sqlite_dm.get_all_competitors() == {}
+        assert sqlite_dm.get_leaderboard() == []
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+def test_secondary_indexes_agree():
+    """Week/level/pending indexes give the same answers on every local backend"""
+    from sharded_data_manager import ShardedDataManager
+
+    temp_dir = tempfile.mkdtemp()
+    try:
+        backends = [
+            CompetitionDataManager(os.path.join(temp_dir, "competition_data.json")),
+            SqliteDataManager(os.path.join(temp_dir, "competition_data.db")),
+            ShardedDataManager(os.path.join(temp_dir, "competition_data")),
+        ]
+        for dm in backends:
+            _populate(dm)
+            dm.register_competitor("Dan", week=2, level=1)
+            dm.register_competitor("Erin", week=2, level=2)
+            dm.submit_solution("Dan", 4, "print(4)", [{"passed": True}], True)
+
+            assert dm.get_competitors_by_week(2) == ["Dan", "Erin"]
+            assert dm.get_competitors_by_level(2) == ["Erin"]
+            assert dm.get_competitors_by_week(3) == []
+            assert sorted(dm.get_pending_approvals()) == [("Alice", "2"), ("Dan", "4")]
+
+            dm.set_judge_approval("Dan", 4, "approved")
+            assert sorted(dm.get_pending_approvals()) == [("Alice", "2")]
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+def test_competitor_summaries_agree():
+    """Every local backend projects the same list-view summaries, without code"""
+    from sharded_data_manager import ShardedDataManager
+
+    def comparable(summaries):
+        return {
+            name: {
+                "current_problem": summary.get("current_problem"),
+                "problems": {
+                    problem_id: (problem["submission_count"], problem["judge_approval"] or "pending",
+                                 (problem.get("best_result") or {}).get("all_passed"),
+                                 (problem.get("best_result") or {}).get("passed_tests"))
+                    for problem_id, problem in summary["problems"].items()
+                }
+            }
+            for name, summary in summaries.items()
+        }
+
+    temp_dir = tempfile.mkdtemp()
+    try:
+        backends = [
+            CompetitionDataManager(os.path.join(temp_dir, "competition_data.json")),
+            SqliteDataManager(os.path.join(temp_dir, "competition_data.db")),
+            ShardedDataManager(os.path.join(temp_dir, "competition_data")),
+        ]
+        results = []
+        for dm in backends:
+            _populate(dm)
+            summaries = dm.get_competitor_summaries()
+            assert "code" not in str(summaries) and "submissions" not in str(summaries)
+            results.append(comparable(summaries))
+
+        assert results[0] == results[1] == results[2]
+        assert results[0]["Alice"]["problems"]["1"] == (3, "approved", True, 2)
+        assert results[0]["Bob"]["current_problem"] == 3
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    test_sqlite_matches_json_backend()
+    test_secondary_indexes_agree()
+    test_competitor_summaries_agree()
+    print("✅ SQLite backend matches JSON backend")
@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+"""
+Test that creating a data manager does not block on Firebase
+Runs in a subprocess with invalid Firebase credentials in an empty directory
+"""
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+SCRIPT = """
+import sys
+import data_manager
+
+dm = data_manager.create_data_manager()
+print(dm.get_backend_type(), 'streamlit' in sys.modules)
+print(type(dm.backend).__name__, dm.get_backend_type(), dm.is_ready())
+"""
+
+
+def test_firebase_connects_in_background_and_falls_back():
+    """The Firebase backend is selected at once and connects (here: fails) on first use"""
+    temp_dir = tempfile.mkdtemp()
+    try:
+        with open(os.path.join(temp_dir, "firebase_credentials.json"), "w", encoding="utf-8") as f:
+            json.dump({"type": "service_account", "project_id": "invalid"}, f)
+
+        repo_dir = os.path.dirname(os.path.abspath(__file__))
+        env = dict(os.environ, PYTHONPATH=repo_dir + os.pathsep + os.environ.get("PYTHONPATH", ""))
+        result = subprocess.run([sys.executable, "-c", SCRIPT], cwd=temp_dir, env=env,
+                                capture_output=True, text=True, timeout=60)
+        assert result.returncode == 0, result.stderr
+        lines = [line for line in result.stdout.splitlines() if not line.startswith(("[", " "))]
+        # The failed connection may already have fallen back when the type is printed
+        assert lines[0] in ("firebase False", "json False")
+        assert lines[1] == "CompetitionDataManager json True"
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    test_firebase_connects_in_background_and_falls_back()
+    print("✅ Firebase connects in the background")
@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+"""
+Test the write-behind buffer used for activity heartbeats
+"""
+import time
+
+from write_behind import WriteBehindBuffer
+
+
+def test_heartbeats_are_coalesced():
+    """Many updates become one write per flush, with the latest values"""
+    writes = []
+    buffer = WriteBehindBuffer(writes.append, interval=0.2)
+
+    for problem_id in range(1, 51):
+        buffer.update("Alice", {"current_problem": problem_id, "last_activity": str(problem_id)})
+    buffer.update("Bob", {"current_problem": 7})
+    assert buffer.pending("Alice")["current_problem"] == 50
+    assert writes == []
+
+    # Flushing one competitor (e.g. before a submit) leaves the others buffered
+    buffer.flush("Bob")
+    assert writes == [{"Bob": {"current_problem": 7}}]
+
+    # The background thread writes the rest in one call
+    time.sleep(0.5)
+    assert writes[1] == {"Alice": {"current_problem": 50, "last_activity": "50"}}
+    assert len(writes) == 2
+
+    buffer.update("Carol", {"current_problem": 2})
+    buffer.close()
+    assert writes[-1] == {"Carol": {"current_problem": 2}}
+
+
+if __name__ == "__main__":
+    test_heartbeats_are_coalesced()
+    print("✅ Heartbeats are coalesced")
@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+"""
+Write-Behind Buffer
+Coalesces frequent field updates (activity heartbeats) per key and writes
+them in one call at most every `interval` seconds, so the number of writes
+does not grow with how often callers report activity.
+
+Heartbeats are best-effort: a failed flush is reported and dropped, the
+next heartbeat carries the current values anyway.
+"""
+import atexit
+import threading
+from typing import Callable, Dict, Optional
+
+
+class WriteBehindBuffer:
+    """
+    Pending updates, keyed (e.g. by competitor name), flushed by a background
+    thread every `interval` seconds, on flush() and at interpreter exit.
+    write receives {key: fields} with the latest value of every field.
+    """
+
+    def __init__(self, write: Callable[[Dict[str, dict]], None], interval: float = 10.0):
+        self.write = write
+        self.interval = interval
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        atexit.register(self.close)
+
+    def update(self, key: str, fields: dict):
+        """Record new values; later values of the same field replace earlier ones"""
+        with self._lock:
+            self._pending.setdefault(key, {}).update(fields)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._flush_loop, daemon=True)
+                self._thread.start()
+
+    def pending(self, key: str) -> dict:
+        """Values recorded for a key and not written yet"""
+        with self._lock:
+            return dict(self._pending.get(key, {}))
+
+    def discard(self, key: Optional[str] = None):
+        """Drop pending values (of one key, or all)"""
+        with self._lock:
+            if key is None:
+                self._pending.clear()
+            else:
+                self._pending.pop(key, None)
+
+    def flush(self, key: Optional[str] = None):
+        """Write pending values now (of one key, e.g. before a submit, or all)"""
+        with self._flush_lock:
+            with self._lock:
+                if key is None:
+                    updates, self._pending = self._pending, {}
+                elif key in self._pending:
+                    updates = {key: self._pending.pop(key)}
+                else:
+                    updates = {}
+            if not updates:
+                return
+            try:
+                self.write(updates)
+            except Exception as e:
+                print(f"[WARNING] Dropped {len(updates)} buffered activity update(s): {e}")
+
+    def _flush_loop(self):
+        while not self._stop.wait(self.interval):
+            self.flush()
+
+    def close(self):
+        """Stop the background thread and write what is pending"""
+        self._stop.set()
+        self.flush()